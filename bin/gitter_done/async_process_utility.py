@@ -0,0 +1,287 @@
+"""Run many external commands concurrently on an asyncio event loop.
+
+Commands are grouped per tool, the program name without its extension, and
+each tool runs at most as many commands at once as its concurrency limit.
+Commands go through the transcript of external_process_utility, and share
+its timeouts and retries. They return the same (bool, result) pairs as
+external_process_utility.run_command.
+
+Attributes:
+    DEFAULT_TOOL (str): The key of the limit of tools without their own.
+
+"""
+import asyncio
+import logging
+import shlex
+import subprocess
+import time
+
+from . import config
+from . import external_process_utility
+from . import process_group_utility
+from . import transcript_utility
+
+# ============================================================================
+# Global Variables.
+DEFAULT_TOOL = 'default'
+# ============================================================================
+
+
+# ============================================================================
+class AsyncCommandExecutor:
+    """
+    Run external commands concurrently, within per tool concurrency limits.
+
+    The executor must be used from within a single event loop.
+
+    Attributes:
+        limits (dict): The maximum number of concurrent commands of each tool,
+            and of the DEFAULT_TOOL.
+
+    """
+
+    def __init__(self, limits: dict = None):
+        """
+        Initialize the executor.
+
+        Args:
+            limits (dict, optional): The concurrency limit of each tool.
+                Defaults to the limits of the config.
+
+        """
+        self.limits = dict(config.get_command_concurrency()
+                           if limits is None else limits)
+        self._semaphores = {}
+
+    def _get_semaphore(self, program: str):
+        tool = external_process_utility.get_tool(program)
+        if tool not in self.limits:
+            tool = DEFAULT_TOOL
+        if tool not in self._semaphores:
+            self._semaphores[tool] = asyncio.Semaphore(
+                self.limits.get(tool, 1))
+        return self._semaphores[tool]
+
+    async def run(self,  # pylint: disable=too-many-arguments
+                  arguments: list,
+                  input_text: str = None,
+                  cwd: str = None,
+                  env: dict = None,
+                  on_line=None,
+                  command_class: str = None,
+                  idempotent: bool = False):
+        """
+        Run a command from its argument list, without a shell.
+
+        Cancelling the task kills the command. Commands failing with a
+        transient p4 error are retried after a jittered backoff, without
+        holding on to their tool's concurrency slot while waiting.
+
+        Args:
+            arguments (list): The program followed by its arguments.
+            input_text (str, optional): Text to feed to the command's stdin.
+            cwd (str, optional): The directory to run the command from.
+            env (dict, optional): The environment of the command.
+            on_line (function, optional): Called with the command, the name
+                of the stream ('stdout' or 'stderr') and every line as soon as
+                it is read.
+            command_class (str, optional): The class of the command, setting
+                its timeout. Defaults to the class
+                external_process_utility.get_command_class gives it.
+            idempotent (bool, optional): Whether the command only reads, so
+                its result can be served from the query cache.
+
+        Returns:
+            bool: Value determining wether the command failed.
+            string: The command's output if any, or a
+                subprocess.CalledProcessError if it failed.
+
+        """
+        if idempotent:
+            command_results = external_process_utility.get_cached_query(
+                arguments, cwd)
+            if command_results is not None:
+                return command_results
+
+        timeout = external_process_utility.get_command_timeout(arguments,
+                                                               command_class)
+        attempt = 1
+        while True:
+            command_results = await self._run_once(
+                arguments, input_text, cwd, env, on_line, timeout)
+            if command_results[0] or \
+                    attempt >= config.get_p4_retry_policy()['attempts'] or \
+                    not external_process_utility.is_transient_failure(
+                        arguments, command_results[1]):
+                external_process_utility.update_query_cache(
+                    arguments, cwd, idempotent, command_results)
+                return command_results
+
+            delay = external_process_utility.get_retry_delay(attempt)
+            logging.warning("Retrying in %.1f seconds after a transient "
+                            "error: %s", delay, shlex.join(arguments))
+            transcript = external_process_utility.get_transcript()
+            if transcript is None or \
+                    transcript.mode != transcript_utility.MODE_REPLAY:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _run_once(  # pylint: disable=too-many-arguments
+            self, arguments, input_text, cwd, env, on_line, timeout):
+        command = shlex.join(arguments)
+        transcript = external_process_utility.get_transcript()
+        if transcript is not None and \
+                transcript.mode == transcript_utility.MODE_REPLAY:
+            start = time.perf_counter()
+            command_results = transcript.replay(command, input_text)
+            external_process_utility.record_timing(
+                command, arguments, start, None, command_results)
+            return command_results
+
+        async with self._get_semaphore(arguments[0]):
+            logging.info("Triggering external command: %s", command)
+            # Timed once it got its slot, leaving the time it queued out.
+            start = time.perf_counter()
+            try:
+                exit_code, output = await asyncio.wait_for(
+                    self._run_process(arguments, command, input_text, cwd,
+                                      env, on_line),
+                    timeout)
+            # Caught first, as it is an OSError from python 3.11 on.
+            except asyncio.TimeoutError:
+                logging.error("Killed a command running for over %s seconds:"
+                              " %s", timeout, command)
+                exit_code = external_process_utility.TIMEOUT_EXIT_CODE
+                output = f'Timed out after {timeout} seconds.'.encode()
+            except OSError as ex:
+                exit_code, output = 127, str(ex).encode()
+
+        result = output.decode(encoding="utf-8", errors="ignore")
+        if transcript is not None:
+            transcript.record(command,
+                              input_text,
+                              exit_code,
+                              result.rstrip() if not exit_code else result,
+                              time.perf_counter() - start)
+        if exit_code:
+            command_results = False, subprocess.CalledProcessError(
+                exit_code, command, output=output)
+        else:
+            logging.debug("Command Response:\n%s", result.rstrip())
+            command_results = True, result.rstrip()
+        # The CPU time of the children can't be told apart while they run
+        # concurrently.
+        external_process_utility.record_timing(command, arguments, start,
+                                               None, command_results)
+        return command_results
+
+    async def _run_process(  # pylint: disable=too-many-arguments
+            self, arguments, command, input_text, cwd, env, on_line):
+        process = await asyncio.create_subprocess_exec(
+            *arguments,
+            stdin=subprocess.DEVNULL if input_text is None
+            else subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            close_fds=True,
+            **process_group_utility.get_process_group_options())
+        # Both streams land in one output, in the order they arrive, the way
+        # stderr=subprocess.STDOUT merges them.
+        output = []
+        try:
+            await asyncio.gather(
+                _feed(process.stdin, input_text),
+                _read_lines(process.stdout, 'stdout', command, output,
+                            on_line),
+                _read_lines(process.stderr, 'stderr', command, output,
+                            on_line))
+            return await process.wait(), b''.join(output)
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                await _stop(process)
+            raise
+
+    async def run_all(self, commands: list, **kwargs):
+        """
+        Run commands concurrently and gather their results.
+
+        Args:
+            commands (list): The argument list of every command.
+            **kwargs: The keyword arguments of run, shared by the commands.
+
+        Returns:
+            list: The (bool, result) pair of every command, in order.
+
+        """
+        return await asyncio.gather(*[self.run(x, **kwargs)
+                                      for x in commands])
+
+
+async def _feed(stream: asyncio.StreamWriter, input_text: str):
+    if stream is None:
+        return
+    try:
+        stream.write(input_text.encode(encoding="utf-8"))
+        await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # The command exited without reading all of its input.
+        pass
+    stream.close()
+
+
+async def _read_lines(stream: asyncio.StreamReader,
+                      name: str,
+                      command: str,
+                      output: list,
+                      on_line):
+    # Read in chunks, as a single line, e.g. of a -z listing, may be longer
+    # than the StreamReader limit.
+    splitter = external_process_utility.LineSplitter()
+    while True:
+        chunk = await stream.read(external_process_utility.CHUNK_SIZE)
+        if not chunk:
+            break
+        output.append(chunk)
+        if on_line is not None:
+            for line in splitter.split(chunk):
+                on_line(command, name, line.rstrip())
+    if on_line is not None:
+        for line in splitter.flush():
+            on_line(command, name, line.rstrip())
+
+
+async def _stop(process):
+    # The grace period is waited on the loop rather than blocking it, unlike
+    # in process_group_utility.stop_process_group.
+    process_group_utility.terminate_process_group(process)
+    try:
+        await asyncio.wait_for(process.wait(),
+                               process_group_utility.KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        pass
+    process_group_utility.kill_process_group(process)
+    await process.wait()
+
+
+def run_commands(commands: list, limits: dict = None, **kwargs):
+    """
+    Run commands concurrently from synchronous code.
+
+    Args:
+        commands (list): The argument list of every command.
+        limits (dict, optional): The concurrency limit of each tool. Defaults
+            to the limits of the config.
+        **kwargs: The keyword arguments of AsyncCommandExecutor.run, shared by
+            the commands.
+
+    Returns:
+        list: The (bool, result) pair of every command, in order.
+
+    """
+    if not commands:
+        return []
+    executor = AsyncCommandExecutor(limits)
+    return asyncio.run(executor.run_all(commands, **kwargs))
+# ============================================================================
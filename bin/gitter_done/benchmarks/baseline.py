@@ -0,0 +1,107 @@
+"""A module storing benchmark results and comparing runs against them."""
+import json
+import logging
+import os
+
+from .. import console_utility
+
+BASELINE_DIRECTORY = os.path.join(os.path.dirname(__file__), 'baselines')
+
+
+def get_baseline_path(name: str):
+    """
+    Get the path to the checked-in baseline of a benchmark.
+
+    Args:
+        name (str): The name of the benchmark.
+
+    Returns:
+        str: The path to its baseline.
+
+    """
+    return os.path.join(BASELINE_DIRECTORY, name + '.json')
+
+
+def load_baseline(path: str):
+    """
+    Load a stored baseline.
+
+    Args:
+        path (str): Path to the baseline.
+
+    Returns:
+        dict: The metrics of each case, keyed by the case as a string. Empty
+            if there is no baseline.
+
+    """
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        logging.warning("No baseline found at '%s'.", path)
+        return {}
+
+
+def save_baseline(results: dict, path: str):
+    """
+    Store results as the new baseline.
+
+    Args:
+        results (dict): The metrics of each case, keyed by the case.
+        path (str): Path to the baseline.
+
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump({str(case): metrics for case, metrics in results.items()},
+                  file,
+                  indent=4,
+                  sort_keys=True)
+        file.write('\n')
+
+
+def print_comparison(results: dict,
+                     baseline: dict,
+                     metrics: dict,
+                     threshold: float):
+    """
+    Print the results next to the baseline and flag the regressions.
+
+    Args:
+        results (dict): The metrics of each case, keyed by the case.
+        baseline (dict): The stored metrics, as returned by load_baseline.
+        metrics (dict): The name of each metric to compare mapped to True if
+            higher values are better.
+        threshold (float): How many times worse than the baseline a metric
+            may get before it is flagged.
+
+    Returns:
+        int: The number of regressed metrics.
+
+    """
+    lines = [f"{'case':>24} {'metric':>14} {'value':>12} {'baseline':>12} "
+             f"{'ratio':>7}"]
+    regressions = 0
+    for case, values in results.items():
+        stored = baseline.get(str(case), {})
+        for metric, higher_is_better in metrics.items():
+            value = values[metric]
+            reference = stored.get(metric)
+            if not reference:
+                lines.append(f'{case:>24} {metric:>14} {value:>12.3f} '
+                             f"{'-':>12} {'-':>7}")
+                continue
+
+            ratio = value / reference
+            worsening = 1 / ratio if higher_is_better and ratio else ratio
+            flag = ''
+            if worsening > threshold:
+                flag = '  REGRESSED'
+                regressions += 1
+            lines.append(f'{case:>24} {metric:>14} {value:>12.3f} '
+                         f'{reference:>12.3f} {ratio:>6.2f}x{flag}')
+
+    lines.append(f'{regressions} metrics regressed by more than '
+                 f'{threshold:.2f}x.')
+    console_utility.console_prompt('\n'.join(lines))
+    return regressions
@@ -0,0 +1,102 @@
+"""
+Benchmark cross-checking the discovery backends of the ignore generation.
+
+A tree is generated and turned into a git repository tracking the wishlist.
+Both the python walker and the git backend are then timed over it and their
+results compared. Run from the repository root:
+    py -m bin.gitter_done.benchmarks.discovery_backend_benchmark -s 100000
+"""
+import logging
+import subprocess
+import tempfile
+import time
+
+from .. import arg_parser_utility
+from .. import config
+from .. import console_utility
+from .. import file_utility
+from .. import gitignore_utility
+from .. import logging_utility
+from .. import pattern_utility
+from . import tree_generator
+
+DEFAULT_SIZES = [10000, 100000]
+
+
+def benchmark_backends(entry_count: int, root_directory: str = None):
+    """
+    Time both discovery backends over the same generated repository.
+
+    Args:
+        entry_count (int): The approximate number of entries of the tree.
+        root_directory (str, optional): Where to generate the tree.
+
+    Returns:
+        int: The number of entries generated.
+        float: The seconds spent by the python walker.
+        float: The seconds spent by the git backend.
+        bool: Whether both backends returned the same results.
+
+    """
+    with tempfile.TemporaryDirectory(dir=root_directory) as tree_root:
+        generated, wish_list = tree_generator.generate_tree_of_size(
+            tree_root, entry_count)
+        subprocess.run(['git', 'init', '-q', tree_root], check=True)
+        subprocess.run(['git', 'add', '--pathspec-from-file=-'],
+                       cwd=tree_root,
+                       input='\n'.join(wish_list).encode('utf-8'),
+                       check=True)
+
+        wishlist_trie = file_utility.generate_wishlist_trie(wish_list)
+        ignore_matcher = pattern_utility.IgnoreMatcher(
+            config.get_git_ignore_ignored_path_wishlist())
+
+        start = time.perf_counter()
+        walker_results = file_utility.recursely_get_ignored(tree_root,
+                                                            wishlist_trie,
+                                                            ignore_matcher)
+        walker_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidates = gitignore_utility.get_discovery_candidates(tree_root)
+        git_results = file_utility.get_ignored_from_candidates(
+            tree_root, candidates, wishlist_trie, ignore_matcher)
+        git_time = time.perf_counter() - start
+
+    return generated, walker_time, git_time, walker_results == git_results
+
+
+def _print_report(rows: list):
+    lines = [f"{'entries':>10} {'walker s':>10} {'git s':>10} "
+             f"{'identical':>10}"]
+    for generated, walker_time, git_time, identical in rows:
+        lines.append(f'{generated:>10} {walker_time:>10.3f} '
+                     f'{git_time:>10.3f} {str(identical):>10}')
+    console_utility.console_prompt('\n'.join(lines))
+
+
+if __name__ == '__main__':
+    PARSER = arg_parser_utility.setup_parser()
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-s',
+        '--sizes',
+        help='Approximate tree sizes to benchmark.',
+        type=int,
+        nargs='+',
+        default=DEFAULT_SIZES)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-r',
+        '--root',
+        help='Directory to generate the trees under.',
+        type=str,
+        default=None)
+    ARGS = PARSER.parse_args()
+
+    logging_utility.set_log_level(ARGS.loglevel, False, '', '')
+    # Keep the backends from flooding the console while being timed.
+    logging.getLogger('').setLevel(logging.WARNING)
+
+    _print_report([benchmark_backends(size, ARGS.root)
+                   for size in ARGS.sizes])
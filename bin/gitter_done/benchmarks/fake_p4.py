@@ -0,0 +1,591 @@
+"""
+A stand-in p4 executable emulating a Perforce server over a fixture depot.
+
+The depot is described by a JSON fixture holding its changes, the revisions
+of every file, and the files opened and synced by the single client. Each
+call loads the fixture in memory, runs the command and stores the fixture
+back, so consecutive calls see each other's changes as they would on a
+server. Only the subset of p4 used by p4_utility is emulated: edit, add,
+delete, revert [-a], sync [-f], fstat, describe, print, along with the -x
+and -G global options.
+
+Every call waits for the latency of the server, and the file contents sent
+by print and sync are throttled to its throughput. Both come from the
+fixture and can be overridden through environment variables.
+
+Install the executable in a directory put in front of the PATH, where
+project_utility looks the p4 tool up:
+    fake_p4.create_depot('depot.json', client_root, {'a.txt': 'A'})
+    fake_p4.install_fake_p4('bin', 'depot.json')
+
+Attributes:
+    DEPOT_ENV (str): The environment variable holding the fixture path.
+    LATENCY_ENV (str): The environment variable overriding the latency of
+        every call, in milliseconds.
+    THROUGHPUT_ENV (str): The environment variable overriding the server
+        throughput, in kilobytes per second.
+    DEPOT_ROOT (str): The depot path of the client root.
+    CONNECTION_ERROR (str): The error of commands failed through
+        fail_next_commands.
+
+"""
+import contextlib
+import json
+import marshal
+import os
+import sys
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEPOT_ENV = 'FAKE_P4_DEPOT'
+LATENCY_ENV = 'FAKE_P4_LATENCY_MS'
+THROUGHPUT_ENV = 'FAKE_P4_THROUGHPUT_KBPS'
+DEPOT_ROOT = '//depot/'
+CONNECTION_ERROR = ('Perforce client error:\n'
+                    '\tConnect to server failed; check $P4PORT.\n'
+                    '\tTCP connect to perforce:1666 failed.')
+
+
+# ============================================================================
+# Fixture handling.
+def create_depot(depot_path: str,
+                 client_root: str,
+                 files: dict,
+                 latency_ms: float = 0,
+                 throughput_kbps: float = None):
+    """
+    Create a fixture depot whose first change adds the given files.
+
+    The files are marked as synced by the client, as if the client root had
+    been populated from the depot.
+
+    Args:
+        depot_path (str): Where to write the fixture.
+        client_root (str): The root of the client workspace.
+        files (dict): The relative path of each file mapped to its contents.
+        latency_ms (float, optional): The latency of every call.
+        throughput_kbps (float, optional): The throughput of the server, in
+            kilobytes per second. Unlimited by default.
+
+    """
+    depot = {'client_root': os.path.abspath(client_root),
+             'server': {'latency_ms': latency_ms,
+                        'throughput_kbps': throughput_kbps},
+             'changes': {},
+             'files': {},
+             'opened': {},
+             'have': {}}
+    _submit(depot, files, 'Initial import.')
+    depot['have'] = {x: 1 for x in files}
+    _save_depot(depot_path, depot)
+
+
+def add_change(depot_path: str, files: dict, description: str = ''):
+    """
+    Submit a change to a fixture depot, as another client would.
+
+    Args:
+        depot_path (str): The fixture to update.
+        files (dict): The relative path of each file mapped to its new
+            contents, or to None to delete it.
+        description (str, optional): The description of the change.
+
+    Returns:
+        int: The number of the new change.
+
+    """
+    with _locked_depot(depot_path) as depot:
+        return _submit(depot, files, description)
+
+
+def fail_next_commands(depot_path: str, count: int):
+    """
+    Make the next commands fail as if the connection to the server dropped.
+
+    Args:
+        depot_path (str): The fixture to update.
+        count (int): The number of commands to fail.
+
+    """
+    with _locked_depot(depot_path) as depot:
+        depot['server']['failures'] = count
+
+
+def install_fake_p4(bin_directory: str, depot_path: str):
+    """
+    Write a p4 executable running the emulator over a fixture depot.
+
+    Args:
+        bin_directory (str): The directory to write the executable to.
+        depot_path (str): The fixture the executable serves.
+
+    Returns:
+        str: The path to the executable.
+
+    """
+    # The emulator only depends on the standard library, so it runs as a
+    # plain script wherever the package is imported from.
+    os.makedirs(bin_directory, exist_ok=True)
+    path = os.path.join(bin_directory, 'p4')
+    with open(path, 'w') as file:
+        file.write('#!/bin/sh\n'
+                   f"{DEPOT_ENV}='{os.path.abspath(depot_path)}' "
+                   f"exec '{sys.executable}' "
+                   f"'{os.path.abspath(__file__)}' \"$@\"\n")
+    os.chmod(path, 0o755)
+    return path
+
+
+def load_depot(depot_path: str):
+    """
+    Load a fixture depot.
+
+    Args:
+        depot_path (str): The fixture to load.
+
+    Returns:
+        dict: The fixture.
+
+    """
+    with open(depot_path, 'r') as file:
+        return json.load(file)
+
+
+@contextlib.contextmanager
+def _locked_depot(depot_path: str):
+    with open(depot_path + '.lock', 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        depot = load_depot(depot_path)
+        yield depot
+        _save_depot(depot_path, depot)
+
+
+def _save_depot(depot_path: str, depot: dict):
+    temporary_path = depot_path + '.tmp'
+    with open(temporary_path, 'w') as file:
+        json.dump(depot, file)
+    os.replace(temporary_path, depot_path)
+
+
+def _submit(depot: dict, files: dict, description: str):
+    change = len(depot['changes']) + 1
+    actions = {}
+    for path, contents in sorted(files.items()):
+        revisions = depot['files'].setdefault(path, [])
+        if contents is None:
+            action = 'delete'
+        elif revisions and revisions[-1]['action'] != 'delete':
+            action = 'edit'
+        else:
+            action = 'add'
+        revisions.append({'change': change,
+                          'action': action,
+                          'contents': contents or ''})
+        actions[path] = action
+    depot['changes'][str(change)] = {'user': 'fake',
+                                     'client': 'fake_client',
+                                     'time': int(time.time()),
+                                     'description': description,
+                                     'files': actions}
+    return change
+# ============================================================================
+
+
+# ============================================================================
+# Server emulation.
+class FakeP4Server:
+    """
+    Run p4 commands against a loaded fixture depot.
+
+    Every command returns records, each a (kind, value) tuple. The kind is
+    'info', 'warning' or 'error' with a message as value, 'stat' with a dict
+    of fields, or 'text' with file contents.
+
+    Attributes:
+        depot (dict): The fixture, modified in place by the commands.
+        transferred (int): The bytes of file contents sent to the client.
+
+    """
+
+    def __init__(self, depot: dict):
+        """
+        Initialize the server.
+
+        Args:
+            depot (dict): The loaded fixture.
+
+        """
+        self.depot = depot
+        self.transferred = 0
+
+    def run(self, command: str, arguments: list):
+        """
+        Run a single command.
+
+        Args:
+            command (str): The p4 command, e.g. 'edit'.
+            arguments (list): Its flags and file arguments.
+
+        Returns:
+            list: The records of the command.
+
+        """
+        handler = getattr(self, '_' + command, None)
+        if handler is None:
+            return [('error', "Unknown command.  Try 'p4 help' for info.")]
+        flags = {x for x in arguments if x.startswith('-')}
+        targets = [x for x in arguments if not x.startswith('-')]
+        return handler(flags, targets)
+
+    # ------------------------------------------------------------------
+    # Commands.
+    def _edit(self, _, targets):
+        records = []
+        for target in targets:
+            for path in self._resolve(target, records):
+                opened = self.depot['opened'].get(path)
+                head = self._head(path)
+                if opened == 'edit':
+                    records.append(('info', f'{self._depot_file(path)}'
+                                    f'#{head} - currently opened for edit'))
+                elif opened:
+                    records.append(('warning', f'{self._depot_file(path)} - '
+                                    f"can't edit (already opened for "
+                                    f'{opened})'))
+                else:
+                    self.depot['opened'][path] = 'edit'
+                    records.append(('info', f'{self._depot_file(path)}'
+                                    f'#{head} - opened for edit'))
+        return records
+
+    def _add(self, _, targets):
+        records = []
+        for target in targets:
+            path = self._to_relative(target)
+            opened = self.depot['opened'].get(path)
+            if path is None:
+                records.append(('warning',
+                                f'{target} - file(s) not in client view.'))
+            elif opened:
+                records.append(('warning', f'{self._depot_file(path)} - '
+                                f'currently opened for {opened}'))
+            elif self._is_live(path):
+                records.append(('warning', f'{self._depot_file(path)} - '
+                                "can't add existing file"))
+            else:
+                self.depot['opened'][path] = 'add'
+                revision = len(self.depot['files'].get(path, [])) + 1
+                records.append(('info', f'{self._depot_file(path)}'
+                                f'#{revision} - opened for add'))
+        return records
+
+    def _delete(self, _, targets):
+        records = []
+        for target in targets:
+            for path in self._resolve(target, records):
+                opened = self.depot['opened'].get(path)
+                if opened:
+                    records.append(('warning', f'{self._depot_file(path)} - '
+                                    f"can't delete (already opened for "
+                                    f'{opened})'))
+                    continue
+                self.depot['opened'][path] = 'delete'
+                with contextlib.suppress(OSError):
+                    os.remove(self._client_file(path))
+                records.append(('info', f'{self._depot_file(path)}'
+                                f'#{self._head(path)} - opened for delete'))
+        return records
+
+    def _revert(self, flags, targets):
+        opened = self.depot['opened']
+        if targets:
+            paths = [x for target in targets
+                     for x in self._resolve(target, [], opened_only=True)]
+        else:
+            paths = sorted(opened)
+
+        records = []
+        for path in paths:
+            action = opened[path]
+            if '-a' in flags and (action != 'edit' or
+                                  self._read_client_file(path) !=
+                                  self._revision(path)['contents']):
+                continue
+            del opened[path]
+            if action == 'add':
+                records.append(('info', f'{self._depot_file(path)}#none - '
+                                'was add, abandoned'))
+                continue
+            self._write_client_file(path, self._revision(path))
+            records.append(('info', f'{self._depot_file(path)}'
+                            f'#{self._head(path)} - was {action}, reverted'))
+
+        if not records:
+            records.append(('warning', 'file(s) not opened on this client.'))
+        return records
+
+    def _sync(self, flags, targets):
+        records = []
+        for target in targets or [DEPOT_ROOT + '...']:
+            change = None
+            if '@' in target:
+                target, _, change = target.rpartition('@')
+                change = int(change)
+            for path in self._resolve(target, records, include_deleted=True):
+                revisions = [x for x in self.depot['files'][path]
+                             if change is None or x['change'] <= change]
+                have = self.depot['have'].get(path)
+                if not revisions or (revisions[-1]['action'] == 'delete'
+                                     and have is None):
+                    continue
+                revision = len(revisions)
+                if have == revision and '-f' not in flags:
+                    continue
+
+                depot_file = f'{self._depot_file(path)}#{revision}'
+                client_file = self._client_file(path)
+                if revisions[-1]['action'] == 'delete':
+                    self.depot['have'].pop(path, None)
+                    with contextlib.suppress(OSError):
+                        os.remove(client_file)
+                    records.append(('info', f'{depot_file} - deleted as '
+                                    f'{client_file}'))
+                    continue
+
+                self._write_client_file(path, revisions[-1])
+                self.depot['have'][path] = revision
+                verb = 'updating' if have else 'added as'
+                if have == revision:
+                    verb = 'refreshing'
+                records.append(('info', f'{depot_file} - {verb} '
+                                f'{client_file}'))
+
+        if not records:
+            records.append(('warning', 'file(s) up-to-date.'))
+        return records
+
+    def _fstat(self, _, targets):
+        records = []
+        for target in targets:
+            for path in self._resolve(target, records, include_deleted=True):
+                revision = self._revision(path)
+                fields = {'depotFile': self._depot_file(path),
+                          'clientFile': self._client_file(path),
+                          'headAction': revision['action'],
+                          'headType': 'text',
+                          'headRev': str(self._head(path)),
+                          'headChange': str(revision['change']),
+                          'fileSize': str(len(revision['contents']))}
+                if path in self.depot['have']:
+                    fields['haveRev'] = str(self.depot['have'][path])
+                if path in self.depot['opened']:
+                    fields['action'] = self.depot['opened'][path]
+                records.append(('stat', fields))
+        return records
+
+    def _describe(self, _, targets):
+        records = []
+        for target in targets:
+            change = self.depot['changes'].get(target)
+            if change is None:
+                records.append(('error', f'{target} - no such changelist.'))
+                continue
+            stamp = time.strftime('%Y/%m/%d %H:%M:%S',
+                                  time.localtime(change['time']))
+            lines = [f"Change {target} by {change['user']}@"
+                     f"{change['client']} on {stamp}",
+                     '',
+                     f"\t{change['description']}",
+                     '',
+                     'Affected files ...',
+                     '']
+            for path, action in sorted(change['files'].items()):
+                revision = next(
+                    i for i, x in enumerate(self.depot['files'][path], 1)
+                    if x['change'] == int(target))
+                lines.append(f'... {self._depot_file(path)}#{revision} '
+                             f'{action}')
+            records.append(('info', '\n'.join(lines)))
+        return records
+
+    def _print(self, flags, targets):
+        records = []
+        for target in targets:
+            for path in self._resolve(target, records):
+                revision = self._revision(path)
+                if '-q' not in flags:
+                    records.append(('info', f'{self._depot_file(path)}'
+                                    f"#{self._head(path)} - "
+                                    f"{revision['action']} change "
+                                    f"{revision['change']} (text)"))
+                records.append(('text', revision['contents']))
+                self.transferred += len(revision['contents'])
+        return records
+
+    # ------------------------------------------------------------------
+    # Paths and revisions.
+    def _to_relative(self, target: str):
+        target = target.split('#')[0].replace('\\', '/')
+        if target.startswith(DEPOT_ROOT):
+            return target[len(DEPOT_ROOT):]
+        if target.startswith('//'):
+            return None
+        path = os.path.relpath(os.path.abspath(target),
+                               self.depot['client_root']).replace('\\', '/')
+        if path.startswith('..'):
+            return None
+        return '' if path == '.' else path
+
+    def _resolve(self, target: str, records: list, include_deleted=False,
+                 opened_only=False):
+        """Expand a file argument, recording a warning if nothing matches."""
+        is_wildcard = target.endswith('...')
+        path = self._to_relative(target[:-3] if is_wildcard else target)
+        candidates = self.depot['opened'] if opened_only \
+            else self.depot['files']
+        if is_wildcard and path and not path.endswith('/'):
+            path += '/'
+        if path is None:
+            matches = []
+        elif is_wildcard:
+            matches = sorted(x for x in candidates if x.startswith(path))
+        else:
+            matches = [path] if path in candidates else []
+        if not opened_only and not include_deleted:
+            matches = [x for x in matches if self._is_live(x)]
+
+        if not matches:
+            records.append(('warning', f'{target} - file(s) not on client.'))
+        return matches
+
+    def _head(self, path: str):
+        return len(self.depot['files'][path])
+
+    def _revision(self, path: str):
+        return self.depot['files'][path][-1]
+
+    def _is_live(self, path: str):
+        revisions = self.depot['files'].get(path)
+        return bool(revisions) and revisions[-1]['action'] != 'delete'
+
+    def _depot_file(self, path: str):
+        return DEPOT_ROOT + path
+
+    def _client_file(self, path: str):
+        return os.path.join(self.depot['client_root'], path)
+
+    def _read_client_file(self, path: str):
+        try:
+            with open(self._client_file(path), 'r', newline='') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def _write_client_file(self, path: str, revision: dict):
+        client_file = self._client_file(path)
+        os.makedirs(os.path.dirname(client_file), exist_ok=True)
+        with open(client_file, 'w', newline='') as file:
+            file.write(revision['contents'])
+        self.transferred += len(revision['contents'])
+# ============================================================================
+
+
+# ============================================================================
+# Command line.
+def _format_text(records: list):
+    chunks = []
+    for kind, value in records:
+        if kind == 'stat':
+            chunks.extend(f'... {key} {field}\n'
+                          for key, field in value.items())
+            chunks.append('\n')
+        elif kind == 'text':
+            chunks.append(value)
+        else:
+            chunks.append(value + '\n')
+    return ''.join(chunks)
+
+
+def _format_marshal(records: list):
+    """Format records the way -G does, as marshalled dicts of bytes."""
+    chunks = []
+    for kind, value in records:
+        if kind == 'stat':
+            fields = {'code': 'stat', **value}
+        elif kind == 'text':
+            fields = {'code': 'text', 'data': value}
+        elif kind == 'info':
+            fields = {'code': 'info', 'data': value, 'level': '0'}
+        else:
+            fields = {'code': 'error', 'data': value,
+                      'severity': '2' if kind == 'warning' else '3'}
+        chunks.append(marshal.dumps({k.encode(): v.encode()
+                                     for k, v in fields.items()}, 0))
+    return b''.join(chunks)
+
+
+def main(arguments: list = None):
+    """
+    Run a p4 command line against the fixture in FAKE_P4_DEPOT.
+
+    Args:
+        arguments (list, optional): The command line, without the
+            executable. Defaults to sys.argv.
+
+    Returns:
+        int: The exit code, 1 if any record is an error.
+
+    """
+    arguments = list(sys.argv[1:] if arguments is None else arguments)
+    use_marshal = False
+    batch = []
+    while arguments and arguments[0].startswith('-'):
+        option = arguments.pop(0)
+        if option == '-G':
+            use_marshal = True
+        elif option == '-x':
+            source = arguments.pop(0)
+            with (contextlib.nullcontext(sys.stdin) if source == '-'
+                  else open(source, 'r')) as file:
+                batch = [x.rstrip('\r\n') for x in file if x.strip()]
+        elif option in ('-c', '-p', '-u', '-P'):
+            arguments.pop(0)
+
+    if not arguments:
+        sys.stdout.write("Usage: p4 [options] command [arg ...]\n")
+        return 1
+
+    depot_path = os.environ[DEPOT_ENV]
+    with _locked_depot(depot_path) as depot:
+        server = FakeP4Server(depot)
+        if depot['server'].get('failures'):
+            depot['server']['failures'] -= 1
+            records = [('error', CONNECTION_ERROR)]
+        else:
+            records = server.run(arguments[0], arguments[1:] + batch)
+
+    settings = depot['server']
+    latency_ms = float(os.environ.get(LATENCY_ENV,
+                                      settings.get('latency_ms') or 0))
+    throughput_kbps = float(os.environ.get(
+        THROUGHPUT_ENV, settings.get('throughput_kbps') or 0))
+    delay = latency_ms / 1000
+    if throughput_kbps:
+        delay += server.transferred / 1024 / throughput_kbps
+    time.sleep(delay)
+
+    if use_marshal:
+        sys.stdout.buffer.write(_format_marshal(records))
+    else:
+        sys.stdout.write(_format_text(records))
+    return 1 if any(kind == 'error' for kind, _ in records) else 0
+# ============================================================================
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
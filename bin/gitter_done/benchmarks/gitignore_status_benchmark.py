@@ -0,0 +1,154 @@
+"""
+Benchmark comparing the generated .gitignore layouts against git status.
+
+A tree is generated and turned into a git repository tracking the wishlist.
+The .gitignore is then generated in every layout, from a single root file to
+one file per directory, optionally compacted. The generated line count and
+how long git status takes are reported for each. Run from the repository root:
+    py -m bin.gitter_done.benchmarks.gitignore_status_benchmark -s 10000
+"""
+import logging
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+from .. import arg_parser_utility
+from .. import config
+from .. import console_utility
+from .. import gitignore_utility
+from .. import logging_utility
+from . import tree_generator
+
+DEFAULT_SIZES = [1000, 10000]
+SINGLE = gitignore_utility.IGNORE_LAYOUT_SINGLE
+HIERARCHICAL = gitignore_utility.IGNORE_LAYOUT_HIERARCHICAL
+LAYOUTS = {
+    'full': {'compact': False, 'output_layout': SINGLE},
+    'compact': {'compact': True, 'output_layout': SINGLE},
+    'nested': {'compact': False, 'output_layout': HIERARCHICAL},
+    'nested+c': {'compact': True, 'output_layout': HIERARCHICAL},
+}
+
+
+def _count_generated_lines(root_directory: str):
+    line_count = 0
+    filename = gitignore_utility.GITIGNORE_FILENAME
+    for directory, _, files in os.walk(root_directory):
+        if filename not in files:
+            continue
+        with open(os.path.join(directory, filename), 'r') as file:
+            line_count += sum(1 for line in file
+                              if line.startswith(('/', '!')))
+    return line_count
+
+
+def _time_git_status(root_directory: str, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(['git', 'status', '--porcelain'],
+                       cwd=root_directory,
+                       stdout=subprocess.DEVNULL,
+                       check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def benchmark_layouts(entry_count: int,
+                      repeat: int = 5,
+                      root_directory: str = None):
+    """
+    Time git status with every .gitignore layout over the same repository.
+
+    Args:
+        entry_count (int): The approximate number of entries of the tree.
+        repeat (int, optional): The number of git status calls per layout.
+            The median is reported.
+        root_directory (str, optional): Where to generate the tree.
+
+    Returns:
+        list: The (entries, layout, generated lines, status seconds, status
+            output) of every layout.
+
+    """
+    rows = []
+    with tempfile.TemporaryDirectory(dir=root_directory) as tree_root:
+        generated, wish_list = tree_generator.generate_tree_of_size(
+            tree_root, entry_count)
+        wish_list.append(gitignore_utility.GITIGNORE_FILENAME)
+        subprocess.run(['git', 'init', '-q', tree_root], check=True)
+        subprocess.run(['git', 'add', '--pathspec-from-file=-'],
+                       cwd=tree_root,
+                       input='\n'.join(wish_list[:-1]).encode('utf-8'),
+                       check=True)
+
+        current_directory = os.getcwd()
+        os.chdir(tree_root)
+        try:
+            for layout, options in LAYOUTS.items():
+                gitignore_utility.generate_git_ignore(
+                    wish_list,
+                    config.get_git_ignore_ignored_path_wishlist(),
+                    tree_root,
+                    gitignore_utility.GitIgnoreOptions(use_walk_cache=False,
+                                                       **options))
+                status = subprocess.run(['git', 'status', '--porcelain'],
+                                        cwd=tree_root,
+                                        stdout=subprocess.PIPE,
+                                        check=True).stdout
+                rows.append((generated,
+                             layout,
+                             _count_generated_lines(tree_root),
+                             _time_git_status(tree_root, repeat),
+                             status))
+        finally:
+            os.chdir(current_directory)
+    return rows
+
+
+def _print_report(rows: list):
+    lines = [f"{'entries':>10} {'layout':>10} {'lines':>10} "
+             f"{'status s':>10} {'identical':>10}"]
+    reference = {}
+    for generated, layout, line_count, elapsed, status in rows:
+        reference.setdefault(generated, status)
+        lines.append(f'{generated:>10} {layout:>10} {line_count:>10} '
+                     f'{elapsed:>10.3f} '
+                     f'{str(status == reference[generated]):>10}')
+    console_utility.console_prompt('\n'.join(lines))
+
+
+if __name__ == '__main__':
+    PARSER = arg_parser_utility.setup_parser()
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-s',
+        '--sizes',
+        help='Approximate tree sizes to benchmark.',
+        type=int,
+        nargs='+',
+        default=DEFAULT_SIZES)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--repeat',
+        help='Number of git status calls per layout.',
+        type=int,
+        default=5)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-r',
+        '--root',
+        help='Directory to generate the trees under.',
+        type=str,
+        default=None)
+    ARGS = PARSER.parse_args()
+
+    logging_utility.set_log_level(ARGS.loglevel, False, '', '')
+    # Keep the generation from flooding the console while being timed.
+    logging.getLogger('').setLevel(logging.WARNING)
+
+    _print_report([row
+                   for size in ARGS.sizes
+                   for row in benchmark_layouts(size, ARGS.repeat, ARGS.root)])
@@ -0,0 +1,176 @@
+"""
+Benchmark suite of the ignore generation, compared against a stored baseline.
+
+A seeded depot is generated for every size, on local disk or a tmpfs mount
+given through --root. The walker is then measured for wall time, peak traced
+memory and filesystem calls, and the matcher for the time it takes to match
+every path of the depot. Run from the repository root:
+    py -m bin.gitter_done.benchmarks.ignore_benchmark_suite -r /dev/shm
+
+The filesystem calls are the directory listings and stat calls issued from
+python. They are the syscalls that matter to the walker and, unlike the wall
+time, do not vary from one machine to the next.
+
+Attributes:
+    BASELINE_PATH (str): Path to the stored baseline.
+    METRICS (dict): The metrics compared against the baseline, mapped to True
+        if higher values are better.
+
+"""
+import contextlib
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+
+from .. import arg_parser_utility
+from .. import config
+from .. import file_utility
+from .. import logging_utility
+from .. import pattern_utility
+from . import baseline
+from . import tree_generator
+
+BASELINE_PATH = baseline.get_baseline_path('ignore_benchmark_suite')
+METRICS = {'walk_seconds': False,
+           'walk_peak_kb': False,
+           'walk_fs_calls': False,
+           'match_us': False}
+DEFAULT_SIZES = [10000, 100000]
+
+
+@contextlib.contextmanager
+def count_filesystem_calls():
+    """
+    Count the directory listings and stat calls issued from python.
+
+    Yields:
+        dict: The counts, updated as calls are made.
+
+    """
+    counts = {'scandir': 0, 'stat': 0}
+    scandir = os.scandir
+    stat = os.stat
+
+    def _counted_scandir(*args, **kwargs):
+        counts['scandir'] += 1
+        return scandir(*args, **kwargs)
+
+    def _counted_stat(*args, **kwargs):
+        counts['stat'] += 1
+        return stat(*args, **kwargs)
+
+    with mock.patch.object(os, 'scandir', _counted_scandir), \
+            mock.patch.object(os, 'stat', _counted_stat):
+        yield counts
+
+
+def _list_paths(root_directory: str):
+    paths = []
+    for directory, folders, files in os.walk(root_directory):
+        relative_root = os.path.relpath(directory, root_directory)
+        relative_root = '' if relative_root == '.' else relative_root + '/'
+        paths.extend((relative_root + x, True) for x in folders)
+        paths.extend((relative_root + x, False) for x in files)
+    return paths
+
+
+def benchmark_size(entry_count: int, seed: int, root_directory: str = None):
+    """
+    Measure the walker and the matcher over one generated depot.
+
+    Args:
+        entry_count (int): The number of entries of the depot.
+        seed (int): The seed of the depot generator.
+        root_directory (str, optional): Where to generate the depot.
+
+    Returns:
+        dict: The measured METRICS, plus the entries generated.
+
+    """
+    ignore_matcher = pattern_utility.IgnoreMatcher(
+        config.get_git_ignore_ignored_path_wishlist())
+    with tempfile.TemporaryDirectory(dir=root_directory) as tree_root:
+        generated, wish_list = tree_generator.generate_depot(
+            tree_root, entry_count, seed)
+        wishlist_trie = file_utility.generate_wishlist_trie(wish_list)
+
+        with count_filesystem_calls() as counts:
+            start = time.perf_counter()
+            file_utility.recursely_get_ignored(tree_root,
+                                               wishlist_trie,
+                                               ignore_matcher)
+            walk_seconds = time.perf_counter() - start
+
+        # Tracing slows the walk down, so memory is measured separately.
+        tracemalloc.start()
+        file_utility.recursely_get_ignored(tree_root,
+                                           wishlist_trie,
+                                           ignore_matcher)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        paths = _list_paths(tree_root)
+
+    start = time.perf_counter()
+    for path, is_dir in paths:
+        ignore_matcher.match(path, is_dir)
+    match_seconds = time.perf_counter() - start
+
+    return {'entries': generated,
+            'walk_seconds': walk_seconds,
+            'walk_peak_kb': peak // 1024,
+            'walk_fs_calls': counts['scandir'] + counts['stat'],
+            'match_us': match_seconds * 1e6 / max(len(paths), 1)}
+
+
+if __name__ == '__main__':
+    PARSER = arg_parser_utility.setup_parser()
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-s',
+        '--sizes',
+        help='Depot sizes to benchmark, from 10k to 2M entries.',
+        type=int,
+        nargs='+',
+        default=DEFAULT_SIZES)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--seed',
+        help='Seed of the depot generator.',
+        type=int,
+        default=0)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-r',
+        '--root',
+        help='Directory to generate the depots under, e.g. a tmpfs mount.',
+        type=str,
+        default=None)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--threshold',
+        help='Ratio to the baseline above which a metric regressed.',
+        type=float,
+        default=1.25)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--save_baseline',
+        help='Store the results as the new baseline.',
+        action='store_true')
+    ARGS = PARSER.parse_args()
+
+    logging_utility.set_log_level(ARGS.loglevel, False, '', '')
+    # Keep the walker from flooding the console while being timed.
+    logging.getLogger('').setLevel(logging.WARNING)
+
+    RESULTS = {size: benchmark_size(size, ARGS.seed, ARGS.root)
+               for size in ARGS.sizes}
+    REGRESSIONS = baseline.print_comparison(
+        RESULTS, baseline.load_baseline(BASELINE_PATH), METRICS,
+        ARGS.threshold)
+    if ARGS.save_baseline:
+        baseline.save_baseline(RESULTS, BASELINE_PATH)
+    raise SystemExit(1 if REGRESSIONS else 0)
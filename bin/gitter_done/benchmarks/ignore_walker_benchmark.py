@@ -0,0 +1,90 @@
+"""
+Benchmark showing how the ignore walker scales with the size of the tree.
+
+Run from the repository root:
+    py -m bin.gitter_done.benchmarks.ignore_walker_benchmark -s 10000 1000000
+
+The time spent per entry should stay flat as the tree grows.
+"""
+import logging
+import tempfile
+import time
+
+from .. import arg_parser_utility
+from .. import config
+from .. import console_utility
+from .. import file_utility
+from .. import logging_utility
+from .. import pattern_utility
+from . import tree_generator
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+
+def benchmark_walker(entry_count: int, root_directory: str = None):
+    """
+    Time the ignore walker over a generated tree.
+
+    Args:
+        entry_count (int): The approximate number of entries of the tree.
+        root_directory (str, optional): Where to generate the tree, e.g. a
+            tmpfs mount. Defaults to the system temp directory.
+
+    Returns:
+        int: The number of entries generated.
+        int: The number of paths ignored.
+        float: The seconds spent walking the tree.
+
+    """
+    with tempfile.TemporaryDirectory(dir=root_directory) as tree_root:
+        generated, wish_list = tree_generator.generate_tree_of_size(
+            tree_root, entry_count)
+        wishlist_trie = file_utility.generate_wishlist_trie(wish_list)
+        ignore_matcher = pattern_utility.IgnoreMatcher(
+            config.get_git_ignore_ignored_path_wishlist())
+
+        start = time.perf_counter()
+        ignored = file_utility.recursely_get_ignored(tree_root,
+                                                     wishlist_trie,
+                                                     ignore_matcher)
+        elapsed = time.perf_counter() - start
+
+    return generated, len(ignored), elapsed
+
+
+def _print_report(rows: list):
+    lines = [f"{'entries':>10} {'ignored':>10} {'seconds':>10} "
+             f"{'us/entry':>10} {'scaling':>8}"]
+    base_cost = None
+    for generated, ignored, elapsed in rows:
+        cost = elapsed * 1e6 / generated
+        base_cost = base_cost or cost
+        lines.append(f'{generated:>10} {ignored:>10} {elapsed:>10.3f} '
+                     f'{cost:>10.2f} {cost / base_cost:>7.2f}x')
+    console_utility.console_prompt('\n'.join(lines))
+
+
+if __name__ == '__main__':
+    PARSER = arg_parser_utility.setup_parser()
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-s',
+        '--sizes',
+        help='Approximate tree sizes to benchmark.',
+        type=int,
+        nargs='+',
+        default=DEFAULT_SIZES)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-r',
+        '--root',
+        help='Directory to generate the trees under, e.g. a tmpfs mount.',
+        type=str,
+        default=None)
+    ARGS = PARSER.parse_args()
+
+    logging_utility.set_log_level(ARGS.loglevel, False, '', '')
+    # Keep the walker from flooding the console while being timed.
+    logging.getLogger('').setLevel(logging.INFO)
+
+    _print_report([benchmark_walker(size, ARGS.root) for size in ARGS.sizes])
@@ -0,0 +1,310 @@
+"""
+Microbenchmarks of the parsers and the string and path utilities.
+
+Every case runs one function over a seeded, generated input: a git log mixing
+adds, edits, deletes and renames, lists of depot paths and globs, and p4
+command messages. Calls are repeated for at least --min_time seconds over
+--rounds rounds. The calls per second of the fastest round are reported,
+along with the peak memory traced during one call, as a proxy of what each
+call allocates. Results are compared against a stored baseline. Run from the
+repository root:
+    py -m bin.gitter_done.benchmarks.microbenchmarks
+
+The input sizes are multiplied by --scale. The git log parser is quadratic in
+the number of files touched, so the default sizes are kept small enough for
+a run to take seconds; a 1M-line log needs --scale 500.
+
+Attributes:
+    BASELINE_PATH (str): Path to the stored baseline.
+    METRICS (dict): The metrics compared against the baseline, mapped to True
+        if higher values are better.
+    P4_MESSAGES (list): Messages returned by p4 edit, add and delete.
+
+"""
+import logging
+import random
+import time
+import tracemalloc
+
+from .. import arg_parser_utility
+from .. import file_utility
+from .. import git_utility
+from .. import logging_utility
+from .. import p4_utility
+from .. import string_utility
+from . import baseline
+from . import tree_generator
+
+BASELINE_PATH = baseline.get_baseline_path('microbenchmarks')
+METRICS = {'ops_per_sec': True, 'peak_kb': False}
+P4_MESSAGES = [
+    '//depot/{0}#3 - opened for edit',
+    '//depot/{0}#3 - currently opened for edit',
+    "//depot/{0} - can't edit (already opened for add)",
+    '{0} - file(s) not on client.',
+    '//depot/{0}#1 - opened for add',
+    '//depot/{0}#5 - opened for delete',
+    '//depot/{0} - must sync/resolve #6 before submitting',
+]
+
+
+# ============================================================================
+# Input generation.
+def generate_paths(count: int, seed: int = 0):
+    """
+    Generate depot like relative file paths.
+
+    Args:
+        count (int): The number of paths to generate.
+        seed (int, optional): The seed of the random generator.
+
+    Returns:
+        list: The generated paths, without duplicates.
+
+    """
+    rng = random.Random(seed)
+    extensions = list(tree_generator.DEFAULT_EXTENSION_MIX)
+    weights = list(tree_generator.DEFAULT_EXTENSION_MIX.values())
+    paths = []
+    for i in range(count):
+        depth = rng.randint(1, 6)
+        folders = [f'Dir_{rng.randrange(16)}' for _ in range(depth)]
+        extension = rng.choices(extensions, weights)[0]
+        paths.append('/'.join(folders) + f'/File {i}{extension}')
+    return paths
+
+
+def generate_git_log(line_count: int, seed: int = 0):
+    """
+    Generate the output of git log --name-status.
+
+    Args:
+        line_count (int): The number of file lines to generate.
+        seed (int, optional): The seed of the random generator.
+
+    Returns:
+        str: The generated log, one added, modified, deleted or renamed file
+            per line.
+
+    """
+    rng = random.Random(seed)
+    # Files get touched more than once, as they would across commits.
+    paths = generate_paths(max(line_count // 2, 1), seed)
+    lines = []
+    for _ in range(line_count):
+        status = rng.choices('AMDR', (3, 5, 1, 1))[0]
+        path = rng.choice(paths)
+        if status == 'R':
+            lines.append(f'R{rng.randint(50, 100):03}\t{path}\t'
+                         f'{rng.choice(paths)}')
+        else:
+            lines.append(f'{status}\t{path}')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_globs(count: int, seed: int = 0):
+    """
+    Generate ignore patterns of the shapes found in the config.
+
+    Args:
+        count (int): The number of patterns to generate.
+        seed (int, optional): The seed of the random generator.
+
+    Returns:
+        list: The generated patterns.
+
+    """
+    rng = random.Random(seed)
+    paths = generate_paths(count, seed)
+    globs = []
+    for path in paths:
+        folder, _, name = path.rpartition('/')
+        extension = name.rpartition('.')[2]
+        globs.append(rng.choice((f'*.{extension}',
+                                 f'**/{folder}/**',
+                                 f'{folder}/*',
+                                 f'/{path}',
+                                 f'{folder}/*.{extension}')))
+    return globs
+
+
+def generate_p4_messages(count: int, seed: int = 0):
+    """
+    Generate messages returned by the p4 edit, add and delete commands.
+
+    Args:
+        count (int): The number of messages to generate.
+        seed (int, optional): The seed of the random generator.
+
+    Returns:
+        list: The generated messages.
+
+    """
+    rng = random.Random(seed)
+    return [rng.choice(P4_MESSAGES).format(path)
+            for path in generate_paths(count, seed)]
+# ============================================================================
+
+
+# ============================================================================
+# Cases.
+def _parse_p4_messages(messages: list):
+    for message in messages:
+        p4_utility._parse_edit_message(message)
+        p4_utility._parse_add_message(message)
+        p4_utility._parse_delete_message(message)
+
+
+def _sync_paths(paths: list):
+    add_edit_list = []
+    delete_list = []
+    for i, path in enumerate(paths):
+        if i % 4:
+            git_utility._sync_file_lists(path, add_edit_list, delete_list)
+        else:
+            git_utility._sync_file_lists(path, delete_list, add_edit_list)
+
+
+def get_cases(scale: float = 1.0, seed: int = 0):
+    """
+    Generate the input of every case.
+
+    Args:
+        scale (float, optional): The multiplier of the input sizes.
+        seed (int, optional): The seed of the input generators.
+
+    Returns:
+        dict: The name of each case mapped to its function and argument.
+
+    """
+    def _size(count):
+        return max(int(count * scale), 1)
+
+    paths = generate_paths(_size(100000), seed)
+    return {
+        'parse_git_log': (git_utility._parse_modified_files_list,
+                          generate_git_log(_size(2000), seed)),
+        'sync_file_lists': (_sync_paths,
+                            generate_paths(_size(2000), seed) * 2),
+        'normalize_strings': (string_utility.normalize_strings, paths),
+        'regex_entries': (string_utility.convert_to_regex_entries,
+                          generate_globs(_size(10000), seed)),
+        'wishlist_trie': (file_utility.generate_wishlist_trie, paths),
+        'friendly_list': (string_utility.friendly_list_to_str, paths),
+        'p4_messages': (_parse_p4_messages,
+                        generate_p4_messages(_size(100000), seed)),
+    }
+# ============================================================================
+
+
+# ============================================================================
+# Measurement.
+def benchmark_case(function, argument, rounds: int = 5,
+                   min_time: float = 0.2):
+    """
+    Measure one case.
+
+    The calls per second of the fastest round are kept, as the slower rounds
+    only measure how busy the machine was.
+
+    Args:
+        function (function): The function to benchmark.
+        argument (object): The single argument it is called with.
+        rounds (int, optional): The number of timed rounds.
+        min_time (float, optional): The minimum number of seconds each round
+            keeps calling the function for.
+
+    Returns:
+        dict: The measured METRICS.
+
+    """
+    # Warm up the caches, e.g. of the compiled regular expressions.
+    function(argument)
+
+    ops_per_sec = 0
+    for _ in range(rounds):
+        calls = 0
+        start = time.perf_counter()
+        elapsed = 0
+        while calls < 1 or elapsed < min_time:
+            function(argument)
+            calls += 1
+            elapsed = time.perf_counter() - start
+        ops_per_sec = max(ops_per_sec, calls / elapsed)
+
+    # Tracing slows the calls down, so memory is measured separately.
+    tracemalloc.start()
+    function(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'ops_per_sec': ops_per_sec, 'peak_kb': peak // 1024}
+# ============================================================================
+
+
+if __name__ == '__main__':
+    PARSER = arg_parser_utility.setup_parser()
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--scale',
+        help='Multiplier of the input sizes.',
+        type=float,
+        default=1.0)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--seed',
+        help='Seed of the input generators.',
+        type=int,
+        default=0)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--rounds',
+        help='Number of timed rounds of each case, the fastest is kept.',
+        type=int,
+        default=5)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--min_time',
+        help='Minimum number of seconds each case is repeated for.',
+        type=float,
+        default=0.2)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-c',
+        '--cases',
+        help='Cases to run, all of them by default.',
+        type=str,
+        nargs='+',
+        default=None)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--threshold',
+        help='Ratio to the baseline above which a metric regressed.',
+        type=float,
+        default=1.25)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--save_baseline',
+        help='Store the results as the new baseline.',
+        action='store_true')
+    ARGS = PARSER.parse_args()
+
+    logging_utility.set_log_level(ARGS.loglevel, False, '', '')
+    # Keep the parsers from flooding the console while being timed.
+    logging.getLogger('').setLevel(logging.WARNING)
+
+    CASES = get_cases(ARGS.scale, ARGS.seed)
+    RESULTS = {name: benchmark_case(function,
+                                    argument,
+                                    ARGS.rounds,
+                                    ARGS.min_time)
+               for name, (function, argument) in CASES.items()
+               if not ARGS.cases or name in ARGS.cases}
+    # Baselines only hold for the input sizes they were recorded with.
+    BASELINE = baseline.load_baseline(BASELINE_PATH) \
+        if ARGS.scale == 1.0 else {}
+    REGRESSIONS = baseline.print_comparison(
+        RESULTS, BASELINE, METRICS, ARGS.threshold)
+    if ARGS.save_baseline:
+        baseline.save_baseline(RESULTS, BASELINE_PATH)
+    raise SystemExit(1 if REGRESSIONS else 0)
@@ -0,0 +1,230 @@
+"""
+End-to-end benchmark of the p4 operations against the fake p4 server.
+
+A git repository is generated whose trunk branch matches a fixture depot,
+along with a branch editing, adding and deleting files. The fake p4 is put
+in front of the PATH and the -cl operation is run on the branch, followed by
+the p4 sync performed by -u. The wall time and the number of external
+commands of each are reported, and the files opened in the depot are checked
+against the branch. Run from the repository root:
+    py -m bin.gitter_done.benchmarks.p4_end_to_end_benchmark --latencies 0 5 20
+
+Attributes:
+    BRANCH_NAME (str): The branch the changelist is generated from.
+
+"""
+import contextlib
+import logging
+import os
+import random
+import subprocess
+import tempfile
+import time
+from unittest import mock
+
+from .. import arg_parser_utility
+from .. import async_process_utility
+from .. import config
+from .. import console_utility
+from .. import external_process_utility
+from .. import logging_utility
+from .. import p4_utility
+from . import fake_p4
+
+BRANCH_NAME = 'p4_benchmark'
+DEFAULT_FILE_COUNTS = [100, 1000]
+
+
+@contextlib.contextmanager
+def count_external_commands():
+    """
+    Count the external commands run, one at a time or concurrently.
+
+    Yields:
+        list: The commands, appended as they are run.
+
+    """
+    commands = []
+    run = external_process_utility._run_command
+    run_async = async_process_utility.AsyncCommandExecutor.run
+
+    def _counted_run(command, *args, **kwargs):
+        commands.append(command)
+        return run(command, *args, **kwargs)
+
+    async def _counted_run_async(executor, arguments, *args, **kwargs):
+        commands.append(arguments)
+        return await run_async(executor, arguments, *args, **kwargs)
+
+    with mock.patch.object(external_process_utility,
+                           '_run_command',
+                           _counted_run), \
+            mock.patch.object(async_process_utility.AsyncCommandExecutor,
+                              'run',
+                              _counted_run_async):
+        yield commands
+
+
+def _git(repository: str, *arguments):
+    subprocess.run(['git', '-c', 'user.name=benchmark',
+                    '-c', 'user.email=benchmark@localhost', *arguments],
+                   cwd=repository,
+                   stdout=subprocess.DEVNULL,
+                   check=True)
+
+
+def _write_files(repository: str, files: dict):
+    for path, contents in files.items():
+        full_path = os.path.join(repository, path)
+        if contents is None:
+            os.remove(full_path)
+            continue
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w', newline='') as file:
+            file.write(contents)
+
+
+def generate_repository(repository: str, file_count: int, seed: int = 0):
+    """
+    Generate a git repository whose branch edits, adds and deletes files.
+
+    A tenth of the files is edited, a twentieth deleted, and as many added.
+    Another twentieth is edited and then restored, which p4 revert -a is
+    expected to revert.
+
+    Args:
+        repository (str): Where to generate the repository.
+        file_count (int): The number of files on the trunk branch.
+        seed (int, optional): The seed of the random generator.
+
+    Returns:
+        dict: The trunk files mapped to their contents.
+        dict: The action expected to be opened for each file.
+
+    """
+    rng = random.Random(seed)
+    trunk = {f'Source/Module_{i % 32}/File_{i}.cpp': f'// File {i}\n'
+             for i in range(file_count)}
+    _write_files(repository, trunk)
+    _git(repository, 'init', '-q', '-b', config.get_trunk_branch_name())
+    _git(repository, 'add', '-A')
+    _git(repository, 'commit', '-q', '-m', 'CL 1')
+    _git(repository, 'checkout', '-q', '-b', BRANCH_NAME)
+
+    paths = sorted(trunk)
+    rng.shuffle(paths)
+    step = max(file_count // 20, 1)
+    edited = paths[:2 * step]
+    deleted = paths[2 * step:3 * step]
+    restored = paths[3 * step:4 * step]
+    added = [f'Source/Module_New/File_{i}.cpp' for i in range(step)]
+
+    changes = {x: trunk[x] + '// Edited\n' for x in edited + restored}
+    changes.update({x: None for x in deleted})
+    changes.update({x: '// Added\n' for x in added})
+    _write_files(repository, changes)
+    _git(repository, 'add', '-A')
+    _git(repository, 'commit', '-q', '-m', 'Branch work')
+    _write_files(repository, {x: trunk[x] for x in restored})
+    _git(repository, 'commit', '-q', '-a', '-m', 'Restore')
+
+    expected = {x: 'edit' for x in edited}
+    expected.update({x: 'delete' for x in deleted})
+    expected.update({x: 'add' for x in added})
+    return trunk, expected
+
+
+def benchmark_file_count(file_count: int, latency_ms: float,
+                         root_directory: str = None):
+    """
+    Time the -cl and -u p4 operations over one generated repository.
+
+    Args:
+        file_count (int): The number of files on the trunk branch.
+        latency_ms (float): The latency of every p4 call.
+        root_directory (str, optional): Where to generate the repository.
+
+    Returns:
+        list: The (phase, seconds, commands, correct) of every operation.
+
+    """
+    rows = []
+    with tempfile.TemporaryDirectory(dir=root_directory) as work_root:
+        repository = os.path.join(work_root, 'repository')
+        os.makedirs(repository)
+        trunk, expected = generate_repository(repository, file_count)
+        depot_path = os.path.join(work_root, 'depot.json')
+        fake_p4.create_depot(depot_path, repository, trunk, latency_ms)
+
+        environment = {'PATH': os.path.join(work_root, 'bin') + os.pathsep +
+                       os.environ['PATH']}
+        fake_p4.install_fake_p4(os.path.join(work_root, 'bin'), depot_path)
+        current_directory = os.getcwd()
+        os.chdir(repository)
+        try:
+            with mock.patch.dict(os.environ, environment), \
+                    count_external_commands() as commands:
+                start = time.perf_counter()
+                p4_utility.execute_p4_offline_sync(BRANCH_NAME, False)
+                rows.append(('-cl', time.perf_counter() - start,
+                             len(commands),
+                             fake_p4.load_depot(depot_path)['opened'] ==
+                             expected))
+
+                # Another client submits the change -u then syncs to.
+                synced = dict(list(trunk.items())[:max(file_count // 10, 1)])
+                change = fake_p4.add_change(
+                    depot_path,
+                    {x: y + '// Synced\n' for x, y in synced.items()})
+                commands.clear()
+                start = time.perf_counter()
+                p4_utility._sync_p4_to_changelist(str(change))
+                have = fake_p4.load_depot(depot_path)['have']
+                rows.append(('-u', time.perf_counter() - start,
+                             len(commands),
+                             all(have.get(x) == 2 for x in synced)))
+        finally:
+            os.chdir(current_directory)
+    return rows
+
+
+if __name__ == '__main__':
+    PARSER = arg_parser_utility.setup_parser()
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-s',
+        '--sizes',
+        help='Numbers of files on the trunk branch to benchmark.',
+        type=int,
+        nargs='+',
+        default=DEFAULT_FILE_COUNTS)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--latencies',
+        help='Latencies of the fake p4 server to benchmark, in ms.',
+        type=float,
+        nargs='+',
+        default=[0])
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-r',
+        '--root',
+        help='Directory to generate the repositories under.',
+        type=str,
+        default=None)
+    ARGS = PARSER.parse_args()
+
+    logging_utility.set_log_level(ARGS.loglevel, False, '', '')
+    # Keep the p4 operations from flooding the console while being timed.
+    logging.getLogger('').setLevel(logging.WARNING)
+
+    LINES = [f"{'files':>8} {'latency':>8} {'phase':>6} {'seconds':>9} "
+             f"{'commands':>9} {'correct':>8}"]
+    for size in ARGS.sizes:
+        for latency in ARGS.latencies:
+            for phase, seconds, command_count, correct in \
+                    benchmark_file_count(size, latency, ARGS.root):
+                LINES.append(f'{size:>8} {latency:>8.1f} {phase:>6} '
+                             f'{seconds:>9.3f} {command_count:>9} '
+                             f'{str(correct):>8}')
+    console_utility.console_prompt('\n'.join(LINES))
@@ -0,0 +1,155 @@
+"""
+Benchmark showing how the ignore walker scales with its worker count.
+
+Network shares are simulated by adding a fixed latency to every directory
+listing and stat call. Run from the repository root:
+    py -m bin.gitter_done.benchmarks.parallel_walk_benchmark -w 1 2 4 8 16
+
+Every parallel run is checked against the serial run's results.
+"""
+import contextlib
+import logging
+import os
+import tempfile
+import time
+from unittest import mock
+
+from .. import arg_parser_utility
+from .. import config
+from .. import console_utility
+from .. import file_utility
+from .. import logging_utility
+from .. import pattern_utility
+from . import tree_generator
+
+DEFAULT_WORKERS = [1, 2, 4, 8, 16]
+
+
+@contextlib.contextmanager
+def simulated_latency(seconds: float):
+    """
+    Add a fixed latency to every directory listing and stat call.
+
+    Args:
+        seconds (float): The latency to add to every call.
+
+    """
+    scandir = os.scandir
+    stat = os.stat
+
+    def _slow_scandir(*args, **kwargs):
+        time.sleep(seconds)
+        return scandir(*args, **kwargs)
+
+    def _slow_stat(*args, **kwargs):
+        time.sleep(seconds)
+        return stat(*args, **kwargs)
+
+    with mock.patch.object(os, 'scandir', _slow_scandir), \
+            mock.patch.object(os, 'stat', _slow_stat):
+        yield
+
+
+def benchmark_workers(worker_counts: list,
+                      latency: float,
+                      fan_out: int = 10,
+                      depth: int = 3,
+                      root_directory: str = None):
+    """
+    Time the ignore walker over the same tree with several worker counts.
+
+    Args:
+        worker_counts (list): The worker counts to benchmark.
+        latency (float): The seconds added to every listing and stat call.
+        fan_out (int, optional): The number of child folders per directory.
+        depth (int, optional): The number of directory levels.
+        root_directory (str, optional): Where to generate the tree.
+
+    Returns:
+        list: The (workers, seconds, identical to serial) of every run.
+
+    """
+    rows = []
+    with tempfile.TemporaryDirectory(dir=root_directory) as tree_root:
+        _, wish_list = tree_generator.generate_tree(tree_root,
+                                                    fan_out,
+                                                    depth,
+                                                    10)
+        wishlist_trie = file_utility.generate_wishlist_trie(wish_list)
+        ignore_matcher = pattern_utility.IgnoreMatcher(
+            config.get_git_ignore_ignored_path_wishlist())
+        expected = file_utility.recursely_get_ignored(tree_root,
+                                                      wishlist_trie,
+                                                      ignore_matcher)
+
+        with simulated_latency(latency):
+            for workers in worker_counts:
+                start = time.perf_counter()
+                ignored = file_utility.recursely_get_ignored(
+                    tree_root,
+                    wishlist_trie,
+                    ignore_matcher,
+                    file_utility.WalkOptions(workers=workers))
+                rows.append((workers,
+                             time.perf_counter() - start,
+                             ignored == expected))
+    return rows
+
+
+def _print_report(rows: list):
+    lines = [f"{'workers':>8} {'seconds':>10} {'speedup':>8} "
+             f"{'identical':>10}"]
+    serial_time = None
+    for workers, elapsed, identical in rows:
+        serial_time = serial_time or elapsed
+        lines.append(f'{workers:>8} {elapsed:>10.3f} '
+                     f'{serial_time / elapsed:>7.2f}x {str(identical):>10}')
+    console_utility.console_prompt('\n'.join(lines))
+
+
+if __name__ == '__main__':
+    PARSER = arg_parser_utility.setup_parser()
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-w',
+        '--workers',
+        help='Worker counts to benchmark. The first one is the reference.',
+        type=int,
+        nargs='+',
+        default=DEFAULT_WORKERS)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--latency',
+        help='Milliseconds added to every directory listing and stat call.',
+        type=float,
+        default=2.0)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--fan_out',
+        help='Number of child folders of each generated directory.',
+        type=int,
+        default=10)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        full_name='--depth',
+        help='Number of generated directory levels.',
+        type=int,
+        default=3)
+    arg_parser_utility.add_parser_option(
+        PARSER,
+        '-r',
+        '--root',
+        help='Directory to generate the tree under.',
+        type=str,
+        default=None)
+    ARGS = PARSER.parse_args()
+
+    logging_utility.set_log_level(ARGS.loglevel, False, '', '')
+    # Keep the walker from flooding the console while being timed.
+    logging.getLogger('').setLevel(logging.INFO)
+
+    _print_report(benchmark_workers(ARGS.workers,
+                                    ARGS.latency / 1000,
+                                    ARGS.fan_out,
+                                    ARGS.depth,
+                                    ARGS.root))
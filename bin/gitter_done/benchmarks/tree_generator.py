@@ -0,0 +1,182 @@
+"""A module generating synthetic depot trees for the ignore benchmarks.
+
+Attributes:
+    DEFAULT_EXTENSION_MIX (dict): File extensions mapped to their relative
+        weight, roughly matching a game depot mixing code and art.
+
+"""
+import collections
+import logging
+import os
+import random
+
+DEFAULT_EXTENSION_MIX = {
+    '.cpp': 20, '.h': 20, '.cs': 5, '.py': 2, '.ini': 3, '.json': 2,
+    '.uasset': 25, '.umap': 2, '.psd': 4, '.png': 6, '.fbx': 3, '.wav': 3,
+    '.obj': 2, '.pdb': 1, '.log': 1, '.tmp': 1}
+
+
+# ============================================================================
+# Tree generation.
+def generate_tree(root_directory: str,
+                  fan_out: int,
+                  depth: int,
+                  files_per_directory: int):
+    """
+    Generate a tree where every leaf directory holds one desired file.
+
+    Every directory of the tree is therefore walked and every other file in
+    the leaf directories ends up in the ignore list.
+
+    Args:
+        root_directory (str): The directory to generate the tree under.
+        fan_out (int): The number of child folders of each directory.
+        depth (int): The number of directory levels.
+        files_per_directory (int): The number of files in each leaf directory.
+
+    Returns:
+        int: The number of entries generated.
+        list: The wishlist to run the walker with.
+
+    """
+    logging.info("Generating a tree with fan out %d, depth %d and %d files "
+                 "per directory under '%s'.",
+                 fan_out,
+                 depth,
+                 files_per_directory,
+                 root_directory)
+
+    entry_count = 0
+    wish_list = []
+    pending = [('', depth)]
+    while pending:
+        relative_root, remaining_depth = pending.pop()
+        directory = os.path.join(root_directory, relative_root)
+        os.makedirs(directory, exist_ok=True)
+
+        if not remaining_depth:
+            for i in range(files_per_directory):
+                extension = '.cpp' if i % 2 else '.psd'
+                with open(os.path.join(directory, f'file_{i}{extension}'),
+                          'w'):
+                    pass
+            entry_count += files_per_directory
+            wish_list.append(relative_root + '/file_0.psd')
+            continue
+
+        for i in range(fan_out):
+            pending.append((f'{relative_root}/dir_{i}'.lstrip('/'),
+                            remaining_depth - 1))
+        entry_count += fan_out
+
+    return entry_count, wish_list
+
+
+def generate_tree_of_size(root_directory: str, entry_count: int):
+    """
+    Generate a tree holding roughly the desired number of entries.
+
+    Args:
+        root_directory (str): The directory to generate the tree under.
+        entry_count (int): The approximate number of entries desired. Trees
+            grow by powers of ten, holding 100 files per leaf directory.
+
+    Returns:
+        int: The number of entries generated.
+        list: The wishlist to run the walker with.
+
+    """
+    depth = 1
+    while 100 * 10 ** depth < entry_count:
+        depth += 1
+    return generate_tree(root_directory, 10, depth, 100)
+
+
+# pylint: disable=too-many-arguments, too-many-locals
+def generate_depot(root_directory: str,
+                   entry_count: int,
+                   seed: int = 0,
+                   fan_out: int = 8,
+                   depth: int = 8,
+                   files_per_directory: int = 16,
+                   extension_mix: dict = None,
+                   wishlist_overlap: float = 0.2):
+    """
+    Generate a randomized yet reproducible depot tree and its wishlist.
+
+    Directories are filled breadth first, each with a random number of files
+    and child folders, until the desired number of entries exists. The same
+    seed always generates the same tree and wishlist.
+
+    Args:
+        root_directory (str): The directory to generate the tree under, e.g.
+            a tmpfs mount.
+        entry_count (int): The number of files and folders to generate.
+        seed (int, optional): The seed of the random generator.
+        fan_out (int, optional): The maximum number of child folders of each
+            directory.
+        depth (int, optional): The maximum number of directory levels.
+        files_per_directory (int, optional): The average number of files of
+            each directory.
+        extension_mix (dict, optional): File extensions mapped to their
+            relative weight. Defaults to DEFAULT_EXTENSION_MIX.
+        wishlist_overlap (float, optional): The share of the directories the
+            wishlist tracks, from 0 to 1.
+
+    Returns:
+        int: The number of entries generated.
+        list: The wishlist to run the walker with.
+
+    """
+    logging.info("Generating a depot of %d entries with seed %d under '%s'.",
+                 entry_count,
+                 seed,
+                 root_directory)
+
+    generator = random.Random(seed)
+    extension_mix = extension_mix or DEFAULT_EXTENSION_MIX
+    extensions = list(extension_mix)
+    weights = [extension_mix[x] for x in extensions]
+
+    generated = 0
+    wish_list = []
+    pending = collections.deque([('', 0)])
+    while pending and generated < entry_count:
+        relative_root, level = pending.popleft()
+        directory = os.path.join(root_directory, relative_root)
+        os.makedirs(directory, exist_ok=True)
+
+        file_count = generator.randint(0, files_per_directory * 2)
+        for i, extension in enumerate(generator.choices(extensions,
+                                                        weights,
+                                                        k=file_count)):
+            if generated >= entry_count:
+                break
+            name = f'File_{i}{extension}'
+            with open(os.path.join(directory, name), 'w'):
+                pass
+            generated += 1
+            if relative_root and generator.random() < \
+                    wishlist_overlap / files_per_directory:
+                wish_list.append(f'{relative_root}/{name}')
+
+        if level >= depth:
+            continue
+        for i in range(generator.randint(1, fan_out)):
+            if generated >= entry_count:
+                break
+            path = f'{relative_root}/Dir_{i}'.lstrip('/')
+            pending.append((path, level + 1))
+            generated += 1
+
+            # Track whole folders deep enough to leave most of the tree out.
+            roll = generator.random()
+            if level >= 1 and roll < wishlist_overlap / 2:
+                wish_list.append(path)
+            elif level >= 1 and roll < wishlist_overlap:
+                wish_list.append(path + '/*')
+
+    return generated, wish_list
+# pylint: enable=too-many-arguments, too-many-locals
+
+# ============================================================================
@@ -5,6 +5,43 @@ Attributes:
         different than standard.
     GITIGNORE_FILENAME (string): name of the .gitignore file if different
         than default.
+    GITIGNORE_WALK_CACHE_PATH (string): path to the cache used to only rescan
+        the directories that changed when regenerating the .gitignore.
+    GITIGNORE_WALK_WORKERS (int): number of threads listing directories
+        concurrently when generating the .gitignore. Raise it when the
+        project lives on a network share.
+    GITIGNORE_DISCOVERY_BACKEND (str): how the entries of the tree are
+        discovered when generating the .gitignore. Either "walker" to walk the
+        tree in python or "git" to let git list them.
+    GITIGNORE_COMPACT (bool): whether sibling entries of the generated
+        .gitignore are folded into a "/dir/*" rule followed by negations of
+        the few entries to keep, whenever that takes fewer lines.
+    GITIGNORE_LAYOUT (str): which files the generated .gitignore entries are
+        written to. Either "single" for the root .gitignore or "hierarchical"
+        for a .gitignore next to the entries they affect.
+    GITIGNORE_SIZE_LIMIT_MB (float): size in megabytes above which files are
+        left out of git even when the wishlist tracks them. None to track
+        files of any size.
+    COMMAND_CONCURRENCY (dict): the maximum number of commands of each tool,
+        e.g. "p4", run at the same time when commands are run concurrently.
+        Tools without their own limit share the "default" one. Lower the p4
+        limit if the server throttles concurrent requests.
+    COMMAND_OUTPUT_SPILL_SIZE (int): size in bytes above which the captured
+        output of a streamed command, e.g. a full repository git log, is
+        moved from memory to a temporary file.
+    COMMAND_TIMEOUTS (dict): the number of seconds after which a command of
+        each class is stopped along with the processes it started. The
+        classes are "query" for local queries, "network" for commands
+        talking to a server and "sync" for bulk updates of the workspace,
+        e.g. "p4 sync" or "git checkout". None to let them run forever,
+        the default. E.g. {"query": 300, "network": 900, "sync": 7200}
+        stops hung commands of unattended runs without cutting short slow
+        ones.
+    P4_RETRY (dict): how p4 commands failing with a transient server error
+        are retried: the number of "attempts" and the "base_delay" and
+        "max_delay" in seconds of the jittered exponential backoff.
+    P4_TRANSIENT_ERRORS (list): messages of p4 errors worth retrying, e.g.
+        dropped connections or a busy server.
     TRUNK_BRANCH_NAME (str): The name of the branch which is in sync with P4.
     IGNORED_P4_FILE_LIST (list): A list of file paths that should be ignored by
         P4 when building the change lists if they show modifications.
@@ -24,6 +61,34 @@ DEFAULT_REMOTE_NAME = 'remotes/origin'
 
 GITIGNORE_FILENAME = ".gitignore"
 
+GITIGNORE_WALK_CACHE_PATH = ".git/GitterDoneWalkCache.json"
+
+GITIGNORE_WALK_WORKERS = 1
+
+GITIGNORE_DISCOVERY_BACKEND = "walker"
+
+GITIGNORE_COMPACT = False
+
+GITIGNORE_LAYOUT = "single"
+
+GITIGNORE_SIZE_LIMIT_MB = None
+
+COMMAND_CONCURRENCY = {"git": 4, "p4": 8, "default": 4}
+
+COMMAND_OUTPUT_SPILL_SIZE = 8 * 1024 * 1024
+
+COMMAND_TIMEOUTS = {"query": None, "network": None, "sync": None}
+
+P4_RETRY = {"attempts": 3, "base_delay": 1.0, "max_delay": 30.0}
+
+P4_TRANSIENT_ERRORS = [
+    "Connect to server failed",
+    "TCP receive failed",
+    "TCP send failed",
+    "Partner exited unexpectedly",
+    "Server is too busy",
+]
+
 TRUNK_BRANCH_NAME = "master"
 
 IGNORED_P4_FILE_LIST = [
@@ -250,6 +315,74 @@ def get_git_ignore_filename():
     return GITIGNORE_FILENAME
 
 
+def get_git_ignore_walk_cache_path():
+    """
+    Get the path to the walk cache used when generating the git ignore.
+
+    Returns:
+        str: Path to the walk cache file.
+            (default=".git/GitterDoneWalkCache.json")
+
+    """
+    return GITIGNORE_WALK_CACHE_PATH
+
+
+def get_git_ignore_walk_workers():
+    """
+    Get the number of threads used to walk the tree for the git ignore.
+
+    Returns:
+        int: Number of walker threads. (default=1)
+
+    """
+    return GITIGNORE_WALK_WORKERS
+
+
+def get_git_ignore_discovery_backend():
+    """
+    Get the backend used to discover the entries of the tree for the ignore.
+
+    Returns:
+        str: Name of the discovery backend. (default="walker")
+
+    """
+    return GITIGNORE_DISCOVERY_BACKEND
+
+
+def get_git_ignore_compact():
+    """
+    Get whether the generated git ignore entries should be compacted.
+
+    Returns:
+        bool: True if sibling entries are folded into wildcards.
+            (default=False)
+
+    """
+    return GITIGNORE_COMPACT
+
+
+def get_git_ignore_layout():
+    """
+    Get the layout of the files the generated git ignore entries go to.
+
+    Returns:
+        str: Name of the ignore layout. (default="single")
+
+    """
+    return GITIGNORE_LAYOUT
+
+
+def get_git_ignore_size_limit_mb():
+    """
+    Get the size above which wishlisted files are ignored anyway.
+
+    Returns:
+        float: Size limit in megabytes, None for no limit. (default=None)
+
+    """
+    return GITIGNORE_SIZE_LIMIT_MB
+
+
 def get_p4_ignore_wishlist():
     """
     Get a list of files that should be ignored by P4.
@@ -300,6 +433,57 @@ def get_forced_sync_path_wishlist():
     return FORCED_SYNC_WISHLIST
 
 
+def get_command_concurrency():
+    """Get the number of commands of each tool allowed to run at once.
+
+    Returns:
+        dict: The concurrency limit of each tool, and of the "default" tool.
+
+    """
+    return COMMAND_CONCURRENCY
+
+
+def get_command_output_spill_size():
+    """Get the size above which captured command output spills to disk.
+
+    Returns:
+        int: The size in bytes.
+
+    """
+    return COMMAND_OUTPUT_SPILL_SIZE
+
+
+def get_command_timeouts():
+    """Get the number of seconds commands of each class may run for.
+
+    Returns:
+        dict: The timeout of each command class, None for no timeout.
+
+    """
+    return COMMAND_TIMEOUTS
+
+
+def get_p4_retry_policy():
+    """Get how p4 commands failing with transient errors are retried.
+
+    Returns:
+        dict: The number of "attempts", and the "base_delay" and "max_delay"
+            of the backoff in seconds.
+
+    """
+    return P4_RETRY
+
+
+def get_p4_transient_errors():
+    """Get the messages of the p4 errors worth retrying.
+
+    Returns:
+        list: The messages of the transient p4 errors.
+
+    """
+    return P4_TRANSIENT_ERRORS
+
+
 def get_trunk_branch_name():
     """Get the name of the trunk branch.
 
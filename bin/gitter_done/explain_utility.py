@@ -0,0 +1,160 @@
+"""A module explaining the decisions taken while generating the git ignore.
+
+Attributes:
+    NO_MATCH_LABEL (str): Label of the time spent on entries no rule matched.
+    ROOT_LABEL (str): Label of the root of the tree in the reports.
+
+"""
+import os
+
+from . import file_utility
+from . import pattern_utility
+
+# ============================================================================
+# Global Variables.
+NO_MATCH_LABEL = '(no match)'
+ROOT_LABEL = '(root)'
+# ============================================================================
+
+
+# ============================================================================
+def get_pruned_directories(root_directory: str,
+                           ignore_list: list,
+                           wishlist_trie: file_utility.Node):
+    """
+    Count the ignored directories pruned under each wishlist entry.
+
+    A directory is pruned when the wishlist entry of its parent does not
+    lead into it, so it is never listed.
+
+    Args:
+        root_directory (str): The root the ignore list is relative to.
+        ignore_list (list): The relative paths ignored by the generation.
+        wishlist_trie (file_utility.Node): The root of the wishlist trie.
+
+    Returns:
+        dict: The wishlist path of each walked directory mapped to the number
+            of directories pruned directly under it.
+
+    """
+    pruned = {}
+    for path in ignore_list:
+        if not os.path.isdir(os.path.join(root_directory, path)):
+            continue
+        parent = path.rpartition('/')[0]
+        node = _find_node(wishlist_trie, parent)
+        label = node.path if node is not None and node.path else ROOT_LABEL
+        pruned[label] = pruned.get(label, 0) + 1
+    return pruned
+
+
+def build_report(profiler: pattern_utility.ProfilingMatcher,
+                 pruned: dict,
+                 top: int):
+    """
+    Build the report of the costliest rules and the most pruned entries.
+
+    Args:
+        profiler (pattern_utility.ProfilingMatcher): The matcher the tree was
+            walked with.
+        pruned (dict): The result of get_pruned_directories.
+        top (int): The number of rows of each table.
+
+    Returns:
+        str: The report, ready to be printed.
+
+    """
+    calls = sum(profiler.hits.values())
+    total_seconds = sum(profiler.seconds.values())
+    lines = [f'Top {top} ignore rules by match time '
+             f'({calls} hits, {total_seconds * 1000:.1f} ms in total):',
+             f"{'ms':>10} {'hits':>10} {'bucket':>10}  rule"]
+    rules = sorted(profiler.seconds.items(),
+                   key=lambda x: (-x[1], x[0] or ''))
+    for rule, seconds in rules[:top]:
+        if rule is None:
+            hits, bucket, rule = '', '', NO_MATCH_LABEL
+        else:
+            hits, bucket = profiler.hits.get(rule, 0), profiler.buckets[rule]
+        lines.append(f'{seconds * 1000:>10.2f} {hits:>10} {bucket:>10}  '
+                     f'{rule}')
+
+    unused = [x for x in profiler.rules if x not in profiler.hits]
+    lines.append(f'{len(unused)} of {len(profiler.rules)} rules never '
+                 'matched.')
+
+    lines.append('')
+    lines.append(f'Top {top} wishlist entries by directories pruned:')
+    lines.append(f"{'pruned':>10}  entry")
+    for label, count in sorted(pruned.items(),
+                               key=lambda x: (-x[1], x[0]))[:top]:
+        lines.append(f'{count:>10}  {label}')
+    return '\n'.join(lines)
+
+
+def why(path: str,
+        wishlist_trie: file_utility.Node,
+        ignore_matcher: pattern_utility.IgnoreMatcher,
+        root_directory: str = '.'):
+    """
+    Explain whether the generation ignores a path and why.
+
+    The answer comes from the compiled matcher and the wishlist trie alone,
+    without walking the tree.
+
+    Args:
+        path (str): The path to explain, relative to the root.
+        wishlist_trie (file_utility.Node): The root of the wishlist trie.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns.
+        root_directory (str, optional): The root the path is relative to.
+
+    Returns:
+        str: A single sentence explaining the decision.
+
+    """
+    components = [x for x in path.replace('\\', '/').split('/')
+                  if x and x != '.']
+    is_dir = os.path.isdir(os.path.join(root_directory, *components))
+
+    node = wishlist_trie
+    for i, name in enumerate(components):
+        relative_path = '/'.join(components[:i + 1])
+        is_last = i == len(components) - 1
+        entry_is_dir = is_dir or not is_last
+        rule = ignore_matcher.match(relative_path, entry_is_dir)
+        if rule is not None:
+            return (f"'{path}' is ignored: '{relative_path}' matches the "
+                    f"'{rule}' rule ({ignore_matcher.buckets[rule]} bucket).")
+
+        if node.is_leaf:
+            continue
+        if not entry_is_dir and \
+                file_utility.WISHLIST_FILES_TOKEN in node.children:
+            return (f"'{path}' is kept: the '{node.path}/"
+                    f"{file_utility.WISHLIST_FILES_TOKEN}' wishlist entry "
+                    'keeps the files of its directory.')
+
+        child = node.children.get(name.lower())
+        if child is None:
+            parent = node.path or ROOT_LABEL
+            return (f"'{path}' is ignored: '{relative_path}' is not in the "
+                    f"wishlist under '{parent}'.")
+        node = child
+
+    if node.is_leaf:
+        return f"'{path}' is kept: it is under the '{node.path}' wishlist " \
+            'entry.'
+    return f"'{path}' is walked: wishlist entries lie below it."
+
+
+def _find_node(wishlist_trie: file_utility.Node, relative_path: str):
+    node = wishlist_trie
+    for name in [x for x in relative_path.split('/') if x]:
+        if node.is_leaf:
+            return node
+        node = node.children.get(name)
+        if node is None:
+            return None
+    return node
+# ============================================================================
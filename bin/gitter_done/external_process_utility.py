@@ -1,34 +1,585 @@
-"""Handle calling external processes outside of git."""
+"""Handle calling external processes outside of git.
+
+Every command is given a class, which sets how long it may run for before
+it is stopped along with every process it started. p4 commands failing with
+a transient server error are retried after a jittered exponential backoff.
+Commands declared idempotent are answered from the query cache of the run,
+when there is one. Every command run is timed by the command timer of the
+run, and added to the trace of the run, when there are ones.
+
+Attributes:
+    CHUNK_SIZE (int): The number of bytes read at once from a streamed
+        command, bounding the memory its reads take.
+    MAX_LINE_SIZE (int): The number of bytes of a streamed line held at once.
+        Longer lines are handed out in pieces of that size.
+    ERROR_OUTPUT_SIZE (int): The number of bytes at the end of the output of
+        a failed streamed command read back into its error.
+    COMMAND_CLASS_QUERY (str): The class of local queries.
+    COMMAND_CLASS_NETWORK (str): The class of commands talking to a server.
+    COMMAND_CLASS_SYNC (str): The class of bulk updates of the workspace.
+    TIMEOUT_EXIT_CODE (int): The exit code of commands killed for running
+        past their timeout.
+
+"""
+import codecs
 import logging
+import os
+import random
+import shlex
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from . import config
+from . import process_group_utility
+from . import query_cache_utility
+from . import timing_utility
+from . import trace_utility
+from . import transcript_utility
+
+# ============================================================================
+# Global Variables.
+CHUNK_SIZE = 65536
+MAX_LINE_SIZE = 1024 * 1024
+ERROR_OUTPUT_SIZE = 64 * 1024
+COMMAND_CLASS_QUERY = 'query'
+COMMAND_CLASS_NETWORK = 'network'
+COMMAND_CLASS_SYNC = 'sync'
+TIMEOUT_EXIT_CODE = 124
+_TRANSCRIPT = None
+_QUERY_CACHE = None
+_COMMAND_TIMER = None
+# The sub commands of each tool outside of the query class, every p4 command
+# talking to the server.
+_COMMAND_CLASSES = {
+    'git': {'clone': COMMAND_CLASS_NETWORK,
+            'fetch': COMMAND_CLASS_NETWORK,
+            'ls-remote': COMMAND_CLASS_NETWORK,
+            'pull': COMMAND_CLASS_NETWORK,
+            'push': COMMAND_CLASS_NETWORK,
+            'add': COMMAND_CLASS_SYNC,
+            'checkout': COMMAND_CLASS_SYNC,
+            'reset': COMMAND_CLASS_SYNC},
+    'p4': {'sync': COMMAND_CLASS_SYNC},
+    'p4vfs': {'sync': COMMAND_CLASS_SYNC},
+}
+_DEFAULT_COMMAND_CLASSES = {'p4': COMMAND_CLASS_NETWORK,
+                            'p4vfs': COMMAND_CLASS_NETWORK}
+# Global options of git and p4 followed by a value, e.g. "git -C <path>".
+_OPTIONS_WITH_VALUE = {'-C', '-c', '-d', '-p', '-u', '-x', '-z'}
+# ============================================================================
+
+
+def set_transcript(transcript: transcript_utility.Transcript):
+    """
+    Record or replay every external command through a transcript.
+
+    Args:
+        transcript (transcript_utility.Transcript): The transcript to use, or
+            None to run the commands normally again.
+
+    """
+    global _TRANSCRIPT  # pylint: disable=global-statement
+    _TRANSCRIPT = transcript
+
+
+def get_transcript():
+    """
+    Get the transcript every external command goes through.
+
+    Returns:
+        transcript_utility.Transcript: The active transcript, None if the
+            commands run normally.
+
+    """
+    return _TRANSCRIPT
+
+
+def set_query_cache(query_cache: query_cache_utility.QueryCache):
+    """
+    Answer the commands declared idempotent from a query cache.
+
+    Args:
+        query_cache (query_cache_utility.QueryCache): The cache of the run, or
+            None to always run the commands.
 
+    """
+    global _QUERY_CACHE  # pylint: disable=global-statement
+    _QUERY_CACHE = query_cache
+
+
+def get_query_cache():
+    """
+    Get the query cache answering the commands declared idempotent.
+
+    Returns:
+        query_cache_utility.QueryCache: The cache of the run, None if the
+            commands always run.
 
-def trigger_external_subprocess(command):
+    """
+    return _QUERY_CACHE
+
+
+def get_cached_query(arguments: list, cwd: str = None):
+    """
+    Get the cached result of an idempotent command.
+
+    Args:
+        arguments (list): The program followed by its arguments.
+        cwd (str, optional): The directory the command runs from.
+
+    Returns:
+        object: The result the command returned earlier in the run, None if
+            it has to run.
+
+    """
+    query_cache = get_query_cache()
+    if query_cache is None or not arguments:
+        return None
+    command_results = query_cache.get(_get_query(arguments),
+                                      arguments,
+                                      os.path.abspath(cwd or os.getcwd()))
+    if command_results is not None:
+        logging.info("Answered external command from the query cache: %s",
+                     shlex.join(arguments))
+    return command_results
+
+
+def update_query_cache(arguments: list,
+                       cwd: str,
+                       idempotent: bool,
+                       command_results: tuple):
+    """
+    Cache the result of a query, or drop the queries a mutating command hits.
+
+    Args:
+        arguments (list): The program followed by its arguments.
+        cwd (str): The directory the command ran from, None for the current
+            one.
+        idempotent (bool): Whether the command only reads.
+        command_results (tuple): What the command returned.
+
+    """
+    query_cache = get_query_cache()
+    if query_cache is None or not arguments:
+        return
+    if not idempotent:
+        query_cache.invalidate(*_get_query(arguments))
+    elif command_results[0]:
+        query_cache.store(_get_query(arguments),
+                          arguments,
+                          os.path.abspath(cwd or os.getcwd()),
+                          command_results)
+
+
+def _get_query(arguments: list):
+    return get_tool(arguments[0]), get_sub_command(arguments)
+
+
+def set_command_timer(command_timer: timing_utility.CommandTimer):
+    """
+    Time every external command with a command timer.
+
+    Args:
+        command_timer (timing_utility.CommandTimer): The timer of the run, or
+            None to stop timing the commands.
+
+    """
+    global _COMMAND_TIMER  # pylint: disable=global-statement
+    _COMMAND_TIMER = command_timer
+
+
+def get_command_timer():
+    """
+    Get the command timer timing every external command.
+
+    Returns:
+        timing_utility.CommandTimer: The timer of the run, None if the
+            commands are not timed.
+
+    """
+    return _COMMAND_TIMER
+
+
+def record_timing(command: str,  # pylint: disable=too-many-arguments
+                  arguments: list,
+                  start: float,
+                  cpu_start: float,
+                  command_results: tuple):
+    """
+    Record the timing of a command which just finished, and trace it.
+
+    Args:
+        command (str): The command line.
+        arguments (list): The program followed by its arguments.
+        start (float): When the command started, from time.perf_counter.
+        cpu_start (float): The CPU time of the finished child processes when
+            it started, None if unknown.
+        command_results (tuple): What the command returned.
+
+    """
+    command_timer = get_command_timer()
+    tracer = trace_utility.get_tracer()
+    if command_timer is None and tracer is None:
+        return
+
+    successfull_command_call, result = command_results
+    if not successfull_command_call:
+        exit_code, output_bytes = result.returncode, len(result.output or b'')
+    elif isinstance(result, CommandOutput):
+        exit_code, output_bytes = 0, result.size
+    else:
+        exit_code, output_bytes = 0, len(result.encode(encoding="utf-8"))
+
+    cpu_seconds = None
+    if cpu_start is not None:
+        cpu_seconds = timing_utility.get_children_cpu_time() - cpu_start
+    timing = timing_utility.CommandTiming(
+        command,
+        ' '.join(x for x in _get_query(arguments) if x) if arguments else '',
+        start,
+        cpu_seconds,
+        output_bytes,
+        exit_code)
+    if command_timer is not None:
+        command_timer.record(timing)
+    if tracer is not None:
+        tracer.add_command(timing)
+
+
+def get_tool(program: str):
+    """
+    Get the name of the tool a program is, e.g. "p4" for "C:/bin/P4.exe".
+
+    Args:
+        program (str): The path to the program.
+
+    Returns:
+        str: The lowercase name of the program, without its extension.
+
+    """
+    return os.path.splitext(os.path.basename(program))[0].lower()
+
+
+def get_sub_command(arguments: list):
+    """
+    Get the sub command of a git or p4 command, e.g. "sync" for "p4 -c x sync".
+
+    Args:
+        arguments (list): The program followed by its arguments.
+
+    Returns:
+        str: The first argument past the global options, None if there is
+            none.
+
+    """
+    skip_value = False
+    for argument in arguments[1:]:
+        if skip_value:
+            skip_value = False
+        elif argument.startswith('-'):
+            skip_value = argument in _OPTIONS_WITH_VALUE
+        else:
+            return argument
+    return None
+
+
+def get_command_class(arguments: list):
+    """
+    Get the class of a command, deciding how long it may run for.
+
+    Args:
+        arguments (list): The program followed by its arguments.
+
+    Returns:
+        str: COMMAND_CLASS_QUERY, COMMAND_CLASS_NETWORK or COMMAND_CLASS_SYNC.
+
+    """
+    tool = get_tool(arguments[0]) if arguments else ''
+    return _COMMAND_CLASSES.get(tool, {}).get(
+        get_sub_command(arguments),
+        _DEFAULT_COMMAND_CLASSES.get(tool, COMMAND_CLASS_QUERY))
+
+
+def get_command_timeout(arguments: list, command_class: str = None):
+    """
+    Get the number of seconds a command may run for.
+
+    Args:
+        arguments (list): The program followed by its arguments.
+        command_class (str, optional): The class of the command. Defaults to
+            the class get_command_class gives it.
+
+    Returns:
+        float: The timeout of the command, None if it may run forever.
+
+    """
+    if command_class is None:
+        command_class = get_command_class(arguments)
+    return config.get_command_timeouts().get(command_class)
+
+
+def is_transient_failure(arguments: list,
+                         error: subprocess.CalledProcessError):
+    """
+    Check whether a failed command is worth retrying.
+
+    Only p4 commands failing with one of the configured transient errors are,
+    as retrying any other failure, or a timeout, only fails again later.
+
+    Args:
+        arguments (list): The program followed by its arguments.
+        error (subprocess.CalledProcessError): How the command failed.
+
+    Returns:
+        bool: True if the command should be retried.
+
+    """
+    if not arguments or get_tool(arguments[0]) not in ('p4', 'p4vfs') or \
+            error.returncode == TIMEOUT_EXIT_CODE:
+        return False
+    output = (error.output or b'').decode(encoding="utf-8", errors="ignore")
+    return any(x in output for x in config.get_p4_transient_errors())
+
+
+def get_retry_delay(attempt: int):
+    """
+    Get how long to wait before retrying a command, with full jitter.
+
+    Randomizing the whole delay keeps concurrent commands failing together
+    from hitting the server again all at once.
+
+    Args:
+        attempt (int): The number of attempts that failed so far.
+
+    Returns:
+        float: The delay in seconds.
+
+    """
+    policy = config.get_p4_retry_policy()
+    return random.uniform(0, min(policy['max_delay'],
+                                 policy['base_delay'] * 2 ** (attempt - 1)))
+
+
+def run_command(arguments: list,  # pylint: disable=too-many-arguments
+                input_text: str = None,
+                cwd: str = None,
+                env: dict = None,
+                command_class: str = None,
+                idempotent: bool = False):
+    """
+    Run an external command from its argument list, without a shell.
+
+    Every argument reaches the program as it is, so paths holding spaces or
+    quotes need no quoting, and no shell process is spawned in between. File
+    descriptors other than the standard ones are closed in the child.
+
+    Args:
+        arguments (list): The program followed by its arguments.
+        input_text (str, optional): Text to feed to the command's stdin.
+        cwd (str, optional): The directory to run the command from. Defaults
+            to the current directory.
+        env (dict, optional): The environment of the command. Defaults to the
+            current environment.
+        command_class (str, optional): The class of the command, setting its
+            timeout. Defaults to the class get_command_class gives it.
+        idempotent (bool, optional): Whether the command only reads, and
+            always answers the same until a mutating command runs, so its
+            result can be served from the query cache.
+
+    Returns:
+        bool: Value determining wether the command failed.
+        string: The command's output if any, or a
+            subprocess.CalledProcessError if it failed.
+
+    """
+    if idempotent:
+        command_results = get_cached_query(arguments, cwd)
+        if command_results is not None:
+            return command_results
+
+    command_results = _run_command(shlex.join(arguments), arguments, False,
+                                   input_text, cwd, env, command_class)
+    update_query_cache(arguments, cwd, idempotent, command_results)
+    return command_results
+
+
+def trigger_external_subprocess(command, input_text: str = None):
     """
     Trigger  an external subprocess command.
 
     Args:
         command (string): The command to be trigger by the subprocess.
-        debug_mode (bool, optional): Flag to forego triggering the command if
-            desired.
+        input_text (str, optional): Text to feed to the command's stdin.
 
     Returns:
         bool: Value determining wether the command failed.
         string: The command's output if any.
 
     """
+    command_results = _run_command(command, command, True, input_text)
+    update_query_cache(_split_command(command), None, False, command_results)
+    return command_results
+
+
+def _run_command(command: str,  # pylint: disable=too-many-arguments
+                 arguments,
+                 shell: bool,
+                 input_text: str = None,
+                 cwd: str = None,
+                 env: dict = None,
+                 command_class: str = None):
+    argument_list = _split_command(command) if shell else arguments
+    timeout = get_command_timeout(argument_list, command_class)
+    attempt = 1
+    while True:
+        start = time.perf_counter()
+        cpu_start = timing_utility.get_children_cpu_time()
+        command_results = _run_command_once(command, arguments, shell,
+                                            input_text, cwd, env, timeout)
+        record_timing(command, argument_list, start, cpu_start,
+                      command_results)
+        if command_results[0] or \
+                attempt >= config.get_p4_retry_policy()['attempts'] or \
+                not is_transient_failure(argument_list, command_results[1]):
+            return command_results
+
+        delay = get_retry_delay(attempt)
+        logging.warning("Retrying in %.1f seconds after a transient error: "
+                        "%s", delay, command)
+        if not _is_replaying():
+            time.sleep(delay)
+        attempt += 1
+
+
+def _run_command_once(command: str,  # pylint: disable=too-many-arguments
+                      arguments,
+                      shell: bool,
+                      input_text: str,
+                      cwd: str,
+                      env: dict,
+                      timeout: float):
     logging.info("Triggering external command: %s", command)
+    transcript = get_transcript()
+    if _is_replaying():
+        return transcript.replay(command, input_text)
+
+    start = time.perf_counter()
+    try:
+        exit_code, output = _run_process(arguments, shell, input_text, cwd,
+                                         env, timeout)
+    except OSError as ex:
+        # Without a shell, a missing program raises instead of failing.
+        exit_code, output = 127, str(ex).encode()
+
+    if exit_code:
+        error = subprocess.CalledProcessError(exit_code,
+                                              command,
+                                              output=output)
+        return _record_failure(transcript, command, input_text, error, start)
+
+    result = output.decode(encoding="utf-8", errors="ignore")
+    result = result.rstrip()
+    logging.debug("Command Response:\n%s", result)
+    if transcript is not None:
+        transcript.record(command, input_text, 0, result,
+                          time.perf_counter() - start)
+    return True, result
+
+
+def _run_process(arguments,  # pylint: disable=too-many-arguments
+                 shell: bool,
+                 input_text: str,
+                 cwd: str,
+                 env: dict,
+                 timeout: float):
+    encoded_input = None
+    if input_text is not None:
+        encoded_input = input_text.encode(encoding="utf-8")
+    group_options = process_group_utility.get_process_group_options()
+    with subprocess.Popen(arguments,
+                          shell=shell,
+                          stdin=None if input_text is None
+                          else subprocess.PIPE,
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT,
+                          cwd=cwd,
+                          env=env,
+                          close_fds=True,
+                          **group_options) as process:
+        with _Deadline(process, timeout) as deadline:
+            output, _ = process.communicate(encoded_input)
+    return (deadline.get_exit_code(process.returncode),
+            output + deadline.get_message())
+
+
+def _is_replaying():
+    transcript = get_transcript()
+    return transcript is not None and \
+        transcript.mode == transcript_utility.MODE_REPLAY
+
+
+def _split_command(command: str):
     try:
-        output = subprocess.check_output(command,
-                                         stderr=subprocess.STDOUT,
-                                         shell=True)
+        return shlex.split(command, posix=sys.platform != 'win32')
+    except ValueError:
+        return command.split()
+
+
+class _Deadline:
+    """Stop a process group once it runs past its timeout."""
+
+    def __init__(self, process, timeout: float):
+        self.timeout = timeout
+        self.expired = False
+        self._process = process
+        self._timer = None
+        if timeout is not None:
+            self._timer = threading.Timer(timeout, self._expire)
+            self._timer.daemon = True
+
+    def __enter__(self):
+        if self._timer is not None:
+            self._timer.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def _expire(self):
+        self.expired = True
+        logging.error("Stopping a command running for over %s seconds: %s",
+                      self.timeout,
+                      self._process.args)
+        process_group_utility.stop_process_group(self._process)
+
+    def get_exit_code(self, exit_code: int):
+        """Get the exit code of the process, TIMEOUT_EXIT_CODE if killed."""
+        return TIMEOUT_EXIT_CODE if self.expired else exit_code
 
-        result = output.decode(encoding="utf-8", errors="ignore")
-        result = result.rstrip()
-        logging.debug("Command Response:\n%s", result)
-        return True, result
-    except subprocess.CalledProcessError as ex:
-        return False, ex
+    def get_message(self):
+        """Get the message to append to the output of the process."""
+        if not self.expired:
+            return b''
+        return f'\nTimed out after {self.timeout} seconds.'.encode()
+
+
+def _record_failure(transcript: transcript_utility.Transcript,
+                    command: str,
+                    input_text: str,
+                    error: subprocess.CalledProcessError,
+                    start: float):
+    if transcript is not None:
+        transcript.record(command,
+                          input_text,
+                          error.returncode,
+                          (error.output or b'').decode(encoding="utf-8",
+                                                       errors="ignore"),
+                          time.perf_counter() - start)
+    return False, error
 
 
 def trigger_external_subprocess_with_live_output(command):
@@ -37,34 +588,383 @@ def trigger_external_subprocess_with_live_output(command):
 
     Args:
         command (string): The command to be trigger by the subprocess.
-        debug_mode (bool, optional): Flag to forego triggering the command if
-            desired.
 
     Returns:
         bool: Value determining wether the command failed.
         string: The command's output if any.
 
     """
+    successfull_command_call, command_results = _stream_command(
+        command, command, True, lambda line: print(line.strip()))
+    update_query_cache(_split_command(command), None, False,
+                       (successfull_command_call, None))
+    if not successfull_command_call:
+        return False, command_results
+
+    with command_results:
+        return True, command_results.read()
+
+
+# ============================================================================
+# Streamed commands.
+class CommandOutput:
+    """
+    The captured output of a streamed command.
+
+    The output is held in memory until it outgrows the spill size, and in a
+    temporary file from then on. Close it, or use it as a context manager, to
+    delete the temporary file.
+
+    Attributes:
+        size (int): The size of the output in bytes.
+        spill_size (int): The size in bytes above which the output is moved
+            to a temporary file.
+
+    """
+
+    def __init__(self, spill_size: int = None):
+        """
+        Initialize an empty output.
+
+        Args:
+            spill_size (int, optional): The size in bytes above which the
+                output is moved to a temporary file. Defaults to the spill
+                size of the config.
+
+        """
+        self.size = 0
+        self.spill_size = config.get_command_output_spill_size() \
+            if spill_size is None else spill_size
+        self._file = tempfile.SpooledTemporaryFile(max_size=self.spill_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def spilled(self):
+        """bool: Whether the output was moved to a temporary file."""
+        return self.size > self.spill_size
+
+    def write(self, data: bytes):
+        """
+        Append raw output.
+
+        Args:
+            data (bytes): The output to append.
+
+        """
+        self._file.write(data)
+        self.size += len(data)
+
+    def lines(self):
+        """
+        Iterate over the lines of the output, reading them in chunks.
+
+        Yields:
+            str: Every line of the output, without its line break.
+
+        """
+        self._file.seek(0)
+        yield from _split_lines(iter(lambda: self._file.read(CHUNK_SIZE),
+                                     b''))
+
+    def read_bytes(self):
+        """
+        Read the whole raw output at once.
+
+        Returns:
+            bytes: The output.
+
+        """
+        self._file.seek(0)
+        return self._file.read()
+
+    def read_tail(self, size: int):
+        """
+        Read the end of the raw output.
+
+        Args:
+            size (int): The maximum number of bytes to read.
+
+        Returns:
+            bytes: The last size bytes of the output, or all of it if shorter.
+
+        """
+        self._file.seek(max(self.size - size, 0))
+        return self._file.read()
+
+    def read_chunks(self):
+        """
+        Iterate over the output in chunks, without its trailing whitespace.
+
+        Yields:
+            str: The output, about CHUNK_SIZE bytes at a time, the chunks
+                joining into what read returns.
+
+        """
+        self._file.seek(0)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        # Whitespace is held back until more text follows it.
+        whitespace = ''
+        for chunk in iter(lambda: self._file.read(CHUNK_SIZE), b''):
+            text = decoder.decode(chunk)
+            stripped = text.rstrip()
+            if stripped:
+                yield whitespace + stripped
+                whitespace = text[len(stripped):]
+            else:
+                whitespace += text
+
+    def read(self):
+        """
+        Read the whole output at once.
+
+        Returns:
+            str: The output, without its trailing whitespace.
+
+        """
+        return self.read_bytes().decode(encoding="utf-8",
+                                        errors="ignore").rstrip()
+
+    def close(self):
+        """Release the output, deleting its temporary file if any."""
+        self._file.close()
+
+
+def stream_command(arguments: list,  # pylint: disable=too-many-arguments
+                   on_line=None,
+                   input_text: str = None,
+                   cwd: str = None,
+                   env: dict = None,
+                   command_class: str = None):
+    """
+    Run an external command from its argument list, streaming its output.
+
+    The output is read in chunks of CHUNK_SIZE bytes and handed to on_line
+    one line at a time as soon as it is read. It is also captured into a
+    CommandOutput, which spills to a temporary file once large, so parsers
+    can go through commands printing gigabytes in constant memory.
+
+    Args:
+        arguments (list): The program followed by its arguments.
+        on_line (function, optional): Called with every line of the output,
+            without its line break.
+        input_text (str, optional): Text to feed to the command's stdin.
+        cwd (str, optional): The directory to run the command from.
+        env (dict, optional): The environment of the command.
+        command_class (str, optional): The class of the command, setting its
+            timeout. Defaults to the class get_command_class gives it.
+
+    Returns:
+        bool: Value determining wether the command failed.
+        CommandOutput: The command's output, for the caller to close, or a
+            subprocess.CalledProcessError if it failed. Its output then only
+            holds the last ERROR_OUTPUT_SIZE bytes, and its command_output
+            the whole CommandOutput.
+
+    """
+    command_results = _stream_command(shlex.join(arguments), arguments,
+                                      False, on_line, input_text, cwd, env,
+                                      command_class)
+    update_query_cache(arguments, cwd, False, command_results)
+    return command_results
+
+
+def _stream_command(command: str,  # pylint: disable=too-many-arguments
+                    arguments,
+                    shell: bool,
+                    on_line=None,
+                    input_text: str = None,
+                    cwd: str = None,
+                    env: dict = None,
+                    command_class: str = None):
+    start = time.perf_counter()
+    cpu_start = timing_utility.get_children_cpu_time()
+    command_results = _stream_command_once(command, arguments, shell,
+                                           on_line, input_text, cwd, env,
+                                           command_class)
+    record_timing(command, _split_command(command) if shell else arguments,
+                  start, cpu_start, command_results)
+    return command_results
+
+
+def _stream_command_once(  # pylint: disable=too-many-arguments
+        command, arguments, shell, on_line, input_text, cwd, env,
+        command_class):
     logging.info("Triggering external command: %s", command)
+    transcript = get_transcript()
+    if _is_replaying():
+        return _replay_streamed(transcript, command, input_text, on_line)
+
+    output = CommandOutput()
+
+    start = time.perf_counter()
+    try:
+        exit_code = _run_streamed_process(
+            arguments, shell, on_line, input_text, cwd, env, output,
+            get_command_timeout(_split_command(command) if shell
+                                else arguments, command_class))
+    except OSError as ex:
+        # Without a shell, a missing program raises instead of failing.
+        exit_code = 127
+        output.write(str(ex).encode())
+
+    logging.debug("Command Response: %d bytes%s",
+                  output.size,
+                  ", spilled to disk" if output.spilled else "")
+    if transcript is not None:
+        # Copied in chunks, so recording doesn't read a spilled output back
+        # into memory.
+        transcript.record_chunks(command,
+                                 input_text,
+                                 exit_code,
+                                 output.read_chunks(),
+                                 time.perf_counter() - start)
+    if exit_code:
+        # Only the end of the output, where the error usually is, is read
+        # back, the whole of it staying in the output.
+        error = subprocess.CalledProcessError(
+            exit_code, command, output=output.read_tail(ERROR_OUTPUT_SIZE))
+        error.command_output = output
+        return False, error
+    return True, output
+
+
+def _replay_streamed(transcript: transcript_utility.Transcript,
+                     command: str,
+                     input_text: str,
+                     on_line):
+    successfull_command_call, command_results = transcript.replay(
+        command, input_text)
+    output = CommandOutput()
+    if not successfull_command_call:
+        output.write(command_results.output or b'')
+        command_results.command_output = output
+        return False, command_results
+
+    output.write(command_results.encode(encoding="utf-8"))
+    for line in output.lines():
+        if on_line is not None:
+            on_line(line)
+    return True, output
+
+
+def _run_streamed_process(  # pylint: disable=too-many-arguments
+        arguments, shell, on_line, input_text, cwd, env, output, timeout):
+    group_options = process_group_utility.get_process_group_options()
+    with subprocess.Popen(arguments,
+                          shell=shell,
+                          stdin=subprocess.DEVNULL if input_text is None
+                          else subprocess.PIPE,
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT,
+                          cwd=cwd,
+                          env=env,
+                          close_fds=True,
+                          **group_options) as process, \
+            _Deadline(process, timeout) as deadline:
+        # Feed the input from a thread, so a command filling its output pipe
+        # before reading all of its input doesn't deadlock.
+        feeder = None
+        if input_text is not None:
+            feeder = threading.Thread(
+                target=_feed,
+                args=(process.stdin, input_text.encode(encoding="utf-8")),
+                daemon=True)
+            feeder.start()
+
+        for line in _split_lines(_read_chunks(process.stdout, output)):
+            if on_line is not None:
+                on_line(line)
+
+        if feeder is not None:
+            feeder.join()
+        exit_code = deadline.get_exit_code(process.wait())
+        output.write(deadline.get_message())
+        return exit_code
+
+
+def _feed(stream, data: bytes):
     try:
-        process = subprocess.Popen(command,
-                                   shell=True,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.STDOUT)
-        final_output = []
-        while True:
-            output = process.stdout.readline().decode(
-                encoding="utf-8",
-                errors="ignore")
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                output = output.rstrip()
-                print(output.strip())
-                final_output.append(output)
-
-        results = "".join(final_output)
-        logging.debug("Command Response:\n%s", results)
-        return True, results
-    except subprocess.CalledProcessError as ex:
-        return False, ex
+        stream.write(data)
+        stream.close()
+    except (BrokenPipeError, ConnectionResetError):
+        # The command exited without reading all of its input.
+        pass
+
+
+def _read_chunks(stream, output: CommandOutput):
+    while True:
+        # read1 returns whatever is available instead of waiting for a full
+        # chunk, so lines reach the callback as soon as they are printed.
+        chunk = stream.read1(CHUNK_SIZE)
+        if not chunk:
+            return
+        output.write(chunk)
+        yield chunk
+
+
+class LineSplitter:
+    """
+    Split chunks of output into lines, as they are read.
+
+    The start of a line is held until its line break is read, up to
+    MAX_LINE_SIZE bytes. A longer line is handed out in pieces of that size,
+    so a command printing without line breaks can't grow the buffer.
+
+    """
+
+    def __init__(self):
+        """Initialize a splitter holding no line."""
+        self._pending = bytearray()
+
+    def split(self, chunk: bytes):
+        """
+        Split the next chunk of output.
+
+        Args:
+            chunk (bytes): The output read since the previous chunk.
+
+        Returns:
+            list: The lines completed by the chunk, without their line break.
+
+        """
+        *lines, tail = chunk.split(b'\n')
+        if lines and self._pending:
+            self._pending += lines[0]
+            lines[0] = bytes(self._pending)
+            self._pending.clear()
+        lines = [_decode_line(x) for x in lines]
+
+        self._pending += tail
+        while len(self._pending) >= MAX_LINE_SIZE:
+            lines.append(_decode_line(bytes(self._pending[:MAX_LINE_SIZE])))
+            del self._pending[:MAX_LINE_SIZE]
+        return lines
+
+    def flush(self):
+        """
+        Hand out the last line of the output, if it has no line break.
+
+        Returns:
+            list: The last line, if any.
+
+        """
+        lines = [_decode_line(bytes(self._pending))] if self._pending else []
+        self._pending.clear()
+        return lines
+
+
+def _split_lines(chunks):
+    splitter = LineSplitter()
+    for chunk in chunks:
+        yield from splitter.split(chunk)
+    yield from splitter.flush()
+
+
+def _decode_line(line: bytes):
+    return line.decode(encoding="utf-8", errors="ignore").rstrip('\r')
+# ============================================================================
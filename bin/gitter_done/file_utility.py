@@ -1,13 +1,100 @@
-"""A module focused on path & file handling operations."""
+"""A module focused on path & file handling operations.
+
+Attributes:
+    WISHLIST_FILES_TOKEN (str): Wishlist suffix token for a directory whose
+        files are desired but whose child folders are not.
+
+"""
+import concurrent.futures
+import functools
 import glob
+import json
 import os
-import re
 import logging
-import sys
+import stat
+import tempfile
 
-from . import git_utility
+from . import logging_utility
+from . import pattern_utility
 from . import string_utility
 
+# ============================================================================
+# Global Variables.
+WISHLIST_FILES_TOKEN = '*'
+# ============================================================================
+
+
+# ============================================================================
+class Node:  # pylint:disable=R0903
+    """
+    Object representation of each entry in the wishlist trie.
+
+    Attributes:
+        path (string): String representing a filepath.
+        is_leaf (bool): Flag representing if this node is a leaf, in which
+            case everything under it is desired.
+        children (dict): Case folded path components mapped to their Node.
+
+    """
+
+    __slots__ = ('path', 'is_leaf', 'children')
+
+    def __init__(self, path, is_leaf):
+        """
+        Object constructor.
+
+        Args:
+            path (string): String representing a filepath.
+            is_leaf (bool): Flag representing if this node is a leaf.
+
+        """
+        self.path = path
+        self.is_leaf = is_leaf
+        self.children = {}
+
+
+class WalkOptions:  # pylint:disable=R0903
+    """
+    Options of the walks deciding which entries of a tree to ignore.
+
+    Attributes:
+        walk_cache (dict): The walk cache from load_walk_cache, None to list
+            every directory. Directories whose mtime did not change reuse
+            their cached decisions instead of being listed again. It is
+            updated in place to reflect the directories walked.
+        workers (int): The number of threads listing directories
+            concurrently. Worth raising on network shares where every
+            listing is slow. The results are identical to a serial walk.
+        size_limit (int): Size in bytes above which the files the wishlist
+            keeps are reported as oversized, None to not check sizes.
+            Directories the wishlist keeps whole are then walked as well.
+        oversized (dict): Filled in place with the relative path of each
+            oversized file mapped to its size.
+
+    """
+
+    __slots__ = ('walk_cache', 'workers', 'size_limit', 'oversized')
+
+    def __init__(self,
+                 walk_cache: dict = None,
+                 workers: int = 1,
+                 size_limit: int = None):
+        """
+        Object constructor.
+
+        Args:
+            walk_cache (dict, optional): The walk cache to reuse and update.
+            workers (int, optional): The number of threads to walk with.
+            size_limit (int, optional): Size in bytes above which kept files
+                are reported as oversized.
+
+        """
+        self.walk_cache = walk_cache
+        self.workers = workers
+        self.size_limit = size_limit
+        self.oversized = {}
+# ============================================================================
+
 
 # ============================================================================
 # Path utilties.
@@ -39,58 +126,40 @@ def expand_path(string):
     return temp_list
 
 
-def generate_wishlist_filemap(wish_list):
+def generate_wishlist_trie(wish_list):
     """
-    Walk through the GIT_FILE_WISHLIST generating the correct path format.
+    Build a case folded path trie out of the GIT_FILE_WISHLIST.
+
+    Each path component becomes a child lookup so the walker can decide
+    whether to descend into, keep or ignore an entry without scanning the
+    whole wishlist. A trailing '/*' is stored as a WISHLIST_FILES_TOKEN child,
+    keeping the files of that directory but none of its child folders.
 
     Args:
         wish_list (list): the list of relative paths to expand into the list of
             files to track.
 
     Returns:
-        dict: object containing all the information about the path.
+        Node: The root node of the wishlist trie.
 
     """
-    file_map = {}
+    root = Node('', False)
 
-    # for each path in the wish list
     for path in sorted(wish_list):
-        # split the path into smaller strings
-        split_path = path.split("/")
-
-        # if the first element is an empty string, get rid of it
-        if not split_path[0].strip(' '):
-            del split_path[0]
-
-        # this string will grow as the path grows
-        temp_path = ""
-
-        # for each level of the path
-        for i, item in enumerate(split_path):
-
-            is_leaf = False
-
-            if len(split_path) == 1:
-                # it's a file in the root
-                temp_path = item
-            elif i > 0:
-                # it's not a file in the root, let's add a slash (/)
-                if sys.platform == 'win32':
-                    temp_path += os.altsep + item
-                else:
-                    temp_path += os.sep + item
-            else:
-                temp_path += item
-
-            # check if this is the leaf
-            if i == len(split_path) - 1:
-                is_leaf = True
+        components = [x for x in path.strip(' ').split('/') if x]
+        node = root
+        for i, item in enumerate(components):
+            key = item.lower()
+            child = node.children.get(key)
+            if child is None:
+                child = Node('/'.join(components[:i + 1]), False)
+                node.children[key] = child
+            node = child
 
-            # store the path into the dictionary
-            key = temp_path.lower()
-            file_map[key] = git_utility.Node(temp_path, is_leaf)
+        if node is not root:
+            node.is_leaf = True
 
-    return file_map
+    return root
 
 
 def get_files_from_directory(directory):
@@ -113,149 +182,200 @@ def get_files_from_directory(directory):
     return file_list
 
 
-def _get_normalized_files_in_directory(directory: str):
-    entries = os.listdir(directory)
-
-    files = [f.lower() for f in entries if os.path.isfile(
-        os.path.join(directory, f))]
-
-    files = string_utility.normalize_strings(files, lower=True)
-    logging.debug("Files found under '%s' are: %s",
-                  directory,
-                  string_utility.friendly_list_to_str(files))
-    return files
-
-
-def _get_normalized_directories_in_directory(directory: str):
-    entries = os.listdir(directory)
+def write_file_atomically(path: str, contents: str):
+    """
+    Replace the contents of a file without ever leaving it half written.
 
-    directories = [d for d in entries if os.path.isdir(os.path.join(
-        directory, d))]
+    The contents go to a temporary file next to the destination which then
+    replaces it. The permissions of an existing destination are kept.
 
-    directories = string_utility.normalize_strings(directories, lower=True)
-    logging.debug("Directories found under '%s' are: %s",
-                  directory,
-                  string_utility.friendly_list_to_str(directories))
-    return directories
+    Args:
+        path (str): The path to the file to write.
+        contents (str): The text to write.
 
+    Returns:
+        bool: True if the file was written.
 
-def _get_normalized_combined_path(root: str, suffix: str):
-    return string_utility.normalize_string(os.path.join(root, suffix))
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        mode = 0o644
+
+    directory, filename = os.path.split(os.path.abspath(path))
+    try:
+        descriptor, temp_path = tempfile.mkstemp(prefix=filename + '.',
+                                                 suffix='.tmp',
+                                                 dir=directory)
+    except OSError as ex:
+        logging.error("Could not write '%s': %s", path, ex)
+        return False
+
+    try:
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(contents)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except OSError as ex:
+        logging.error("Could not write '%s': %s", path, ex)
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def load_walk_cache(cache_path: str, config_hash: str):
+    """
+    Load the walk cache left behind by a previous .gitignore generation.
 
+    Args:
+        cache_path (str): The path to the walk cache file.
+        config_hash (str): The hash of the wishlist and ignore configuration
+            the tree is about to be walked with.
 
-def _get_combined_filtered_list(
-        list_1: list,
-        list_2: list,
-        lower: bool = False):
+    Returns:
+        dict: The cached directory entries. Empty if there is no cache or if
+            it was generated with a different configuration.
 
-    if lower:
-        return [x for x in list_1 if x.lower() not in list_2]
-    return [x for x in list_1 if x not in list_2]
+    """
+    try:
+        with open(cache_path, 'r') as file:
+            contents = json.load(file)
+    except (OSError, ValueError):
+        logging.info("No usable walk cache found at '%s'.", cache_path)
+        return {}
 
+    if contents.get('config_hash') != config_hash:
+        logging.info('Configuration changed since the last walk. '
+                     'Invalidating the walk cache.')
+        return {}
 
-def _insert_items_in_list(
-        raw_list: list,
-        root: str,
-        exclude_list: list,
-        output_list: list):
+    return contents.get('directories', {})
 
-    for file in raw_list:
-        path = _get_normalized_combined_path(root, file)
-        output_list = _insert_item_in_list(path[2:], exclude_list, output_list)
-    return output_list
 
+def save_walk_cache(cache_path: str, config_hash: str, walk_cache: dict):
+    """
+    Persist the walk cache for the next .gitignore generation.
 
-def _insert_item_in_list(
-        item: str,
-        exclude_list: list,
-        output_list: list):
+    Args:
+        cache_path (str): The path to the walk cache file.
+        config_hash (str): The hash of the configuration the tree was walked
+            with.
+        walk_cache (dict): The walk cache updated by recursely_get_ignored.
 
-    if item not in exclude_list and item not in output_list:
-        logging.debug("Adding the following exclude list '%s'", item)
-        output_list.append(item)
-    return output_list
+    """
+    if not os.path.isdir(os.path.dirname(cache_path) or '.'):
+        logging.debug("Skipping saving the walk cache to '%s'.", cache_path)
+        return
+
+    logging.info("Saving the walk cache of %d directories to '%s'.",
+                 len(walk_cache),
+                 cache_path)
+    try:
+        with open(cache_path, 'w') as file:
+            json.dump({'config_hash': config_hash,
+                       'directories': walk_cache},
+                      file)
+    except OSError as ex:
+        logging.error("Could not save the walk cache: %s", ex)
+
+
+def _scan_directory(directory: str):
+    """
+    List a directory once, splitting its entries into files and directories.
 
+    Relies on the type information cached in each DirEntry so most platforms
+    do not need an extra stat call per entry.
 
-def _build_pattern_list(root_directory: str,
-                        desired: list):
-    desired_pattern = []
-    for entry in desired:
-        if not root_directory == ".":
-            prefix_to_strip = root_directory.lower()[2:]
-            if not prefix_to_strip == entry:
-                if sys.platform == 'win32':
-                    splitting_regex = prefix_to_strip + os.altsep
-                else:
-                    splitting_regex = prefix_to_strip + os.sep
-                raw_list = entry.strip("*").split(splitting_regex)
-                desired_pattern.extend(list(filter(None, raw_list)))
-        else:
-            desired_pattern.append(entry)
-    return desired_pattern
+    Args:
+        directory (str): The path to the directory to scan.
 
+    Returns:
+        dict: Normalized lowercase file names mapped to their DirEntry.
+        dict: Normalized lowercase directory names mapped to their DirEntry.
 
-# pylint: disable=too-many-arguments
-def _cull_files(root_directory: str,
-                raw_files: list,
-                desired_patterns: list,
-                exclude_list: list,
-                ignore_regex: list,
-                should_ignore_files: bool = False):
+    """
+    files = {}
+    directories = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        bucket = directories
+                    elif entry.is_file():
+                        bucket = files
+                    else:
+                        continue
+                except OSError:
+                    continue
+                name = string_utility.normalize_string(entry.name, lower=True)
+                bucket.setdefault(name, entry)
+    except OSError as ex:
+        logging.error("Could not scan the directory '%s': %s", directory, ex)
+
+    # Scanned once per directory, so skipped altogether unless emitted.
+    if logging_utility.is_level_emitted(logging.DEBUG):
+        logging.debug("Files found under '%s' are: %s",
+                      directory,
+                      string_utility.lazy_friendly_list_to_str(files))
+        logging.debug("Directories found under '%s' are: %s",
+                      directory,
+                      string_utility.lazy_friendly_list_to_str(directories))
+    return files, directories
+
+
+def _get_relative_path(relative_root: str, name: str):
+    if relative_root:
+        return relative_root + '/' + name
+    return name
+
+
+def _cull_files(relative_root: str,
+                undesired_files: list,
+                ignore_matcher: pattern_utility.IgnoreMatcher):
     files_to_ignore = []
-    filtered_files = []
-    undesired_files = list(set(raw_files)-set(desired_patterns))
     for file in undesired_files:
-        found_match = False
-        for entry in ignore_regex:
-            match = re.search(entry, file, re.I)
-            if match:
-                found_match = True
-                logging.debug("Matched %s with %s. Ignoring this file",
-                              file,
-                              entry)
-                filtered_files.append(file.lower())
-
-        if not found_match:
-            logging.debug("Found a Desired File: %s", file)
-
-    undesired_files = list(set(undesired_files)-set(filtered_files))
-
-    if not desired_patterns:
-        undesired_files = []
-    if should_ignore_files:
-        undesired_files = list(set(undesired_files)-set(filtered_files))
+        path = _get_relative_path(relative_root, file)
+        # Matches are left to the patterns, see explain_utility.why.
+        if ignore_matcher.match(path) is None:
+            files_to_ignore.append(path)
 
-    if undesired_files:
+    if files_to_ignore:
         logging.debug("Ignoring the following files found under '%s': %s",
-                      root_directory,
-                      string_utility.friendly_list_to_str(undesired_files))
-
-    files_to_ignore = _insert_items_in_list(undesired_files,
-                                            root_directory,
-                                            exclude_list,
-                                            files_to_ignore)
+                      relative_root,
+                      string_utility.lazy_friendly_list_to_str(
+                          files_to_ignore))
 
     return files_to_ignore
-# pylint: enable=too-many-arguments
 
 
-# pylint: disable=too-many-locals
 def recursely_get_ignored(root_directory: str,
-                          results: list,
-                          desired: list,
-                          ignore_regex: list):
+                          desired: Node,
+                          ignore_matcher: pattern_utility.IgnoreMatcher,
+                          options: WalkOptions = None):
     """
-    Recursively walk a directory tree and return the list of objects to ignore.
+    Walk a directory tree and return the list of objects to ignore.
+
+    The tree is walked iteratively with an explicit stack, listing each
+    directory a single time. Directories that are ignored or fall outside of
+    the wishlist are pruned before they are ever listed, and directories the
+    wishlist keeps whole are never listed either.
 
     Args:
-        root_directory (str): The path to start recursing from.
-        results (list): List of paths mapping to directories found under the
-            root directory.
-        ignore_regex (list, optional): A list of regex strings to run against
-            the entries such so we exclude matches.
+        root_directory (str): The path to start walking from.
+        desired (Node): The wishlist trie node matching the root
+            directory.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns to run against the entries such so we exclude matches.
+        options (WalkOptions, optional): The walk cache, workers and size
+            limit of the walk, collecting the oversized files. Defaults to a
+            serial walk without cache nor size limit.
 
     Returns:
-        list: List of directories found under the root directory.
+        list: Sorted paths, relative to the root directory, to be ignored.
 
     """
     logging.info(("Recursively extracting all ignored folders "
@@ -263,90 +383,599 @@ def recursely_get_ignored(root_directory: str,
                  root_directory)
 
     if not os.path.isdir(root_directory):
-        logging.error("The path \'%s\' is not a directory.")
+        logging.error("The path \'%s\' is not a directory.", root_directory)
+        return []
+
+    if options is None:
+        options = WalkOptions()
+    walk_cache = options.walk_cache
+    if walk_cache is None:
+        walk_directory = functools.partial(_get_ignored_in_directory,
+                                           ignore_matcher=ignore_matcher,
+                                           size_limit=options.size_limit)
+    else:
+        walk_directory = functools.partial(_get_cached_ignored_in_directory,
+                                           ignore_matcher=ignore_matcher,
+                                           size_limit=options.size_limit,
+                                           previous_cache=dict(walk_cache),
+                                           walk_cache=walk_cache)
+        walk_cache.clear()
+
+    # Insertion ordered set keyed by the case folded path.
+    results = {}
+    _walk([(root_directory, '', desired)],
+          walk_directory,
+          options.workers,
+          results,
+          options.oversized)
+    return sorted(results.values())
+
+
+def get_ignored_from_candidates(root_directory: str,
+                                candidates: list,
+                                desired: Node,
+                                ignore_matcher: pattern_utility.IgnoreMatcher,
+                                options: WalkOptions = None):
+    """
+    Return the list of objects to ignore out of a list of candidate paths.
 
-    raw_files = _get_normalized_files_in_directory(root_directory)
-    raw_directories = _get_normalized_directories_in_directory(root_directory)
+    The candidates are typically listed by git, with tracked files listed
+    one by one and wholly untracked directories collapsed into a single
+    entry with a trailing slash. The same decisions as recursely_get_ignored
+    are taken over them, only walking the disk for the collapsed directories
+    the wishlist needs to look into.
 
-    files_to_ignore = []
-    directories_to_ignore = []
-    desired_entries = []
-    regex_list = []
-    desired_pattern = _build_pattern_list(root_directory, desired)
-
-    logging.debug(("Checking the entries found under '%s'"
-                   " against any found on: %s"),
-                  root_directory,
-                  string_utility.friendly_list_to_str(desired_pattern))
-
-    for entry in desired_pattern:
-        regex_list.append(re.compile(entry, re.I))
-
-    # Cull out the undesired directories.
-    recursion_results = []
-    for folder in raw_directories:
-        found_match = False
-        for entry in ignore_regex:
-            match = re.search(entry, folder, re.I)
-            if match:
-                found_match = True
-                logging.debug("Matched %s with %s. Ignoring this directory",
-                              folder,
-                              entry)
-        if not found_match:
-            # reduce the list filtering ones matching this directory
-            regex = re.compile(folder, re.I)
-            matches = list(filter(regex.search, desired))
-            path = string_utility.normalize_string(
-                os.path.join(root_directory, folder)
-                )
+    Args:
+        root_directory (str): The path the candidates are relative to.
+        candidates (list): The relative paths of the entries in the tree.
+            Directories end with a slash and their contents are unknown.
+        desired (Node): The wishlist trie node matching the root
+            directory.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns to run against the entries such so we exclude matches.
+        options (WalkOptions, optional): The workers walking the collapsed
+            directories and the size limit, collecting the oversized files.
+            The walk cache is not used. Defaults to a serial walk without
+            size limit.
+
+    Returns:
+        list: Sorted paths, relative to the root directory, to be ignored.
+
+    """
+    logging.info("Extracting all ignored entries out of %d candidates.",
+                 len(candidates))
+    if options is None:
+        options = WalkOptions()
+
+    results = {}
+    collapsed_directories = _get_ignored_in_listings(
+        _build_candidate_listings(root_directory, candidates),
+        desired,
+        ignore_matcher,
+        options,
+        results)
+
+    logging.info("Walking %d collapsed directories on disk.",
+                 len(collapsed_directories))
+    _walk(collapsed_directories,
+          functools.partial(_get_ignored_in_directory,
+                            ignore_matcher=ignore_matcher,
+                            size_limit=options.size_limit),
+          options.workers,
+          results,
+          options.oversized)
+    return sorted(results.values())
+
+
+def _get_ignored_in_listings(listings: dict,
+                             desired: Node,
+                             ignore_matcher: pattern_utility.IgnoreMatcher,
+                             options: WalkOptions,
+                             results: dict):
+    """
+    Decide what to ignore in the listings built out of the candidates.
 
-            # Continue going down the rabbit hole.
-            if matches:
-                recursion_results = recursely_get_ignored(path,
-                                                          results,
-                                                          matches,
-                                                          ignore_regex)
-            elif len(desired) == 1:
-                desired_entries.append(folder)
-
-        results.extend(
-            _get_combined_filtered_list(recursion_results, results, True)
-            )
-
-    undesired_dirs = (
-        sorted(
-            list(
-                set({x.lower() for x in raw_directories} -
-                    set(desired_pattern) -
-                    set(desired_entries))))
-        )
-
-    if undesired_dirs:
+    Args:
+        listings (dict): The listings from _build_candidate_listings.
+        desired (Node): The wishlist trie node matching the root directory.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns to run against the entries.
+        options (WalkOptions): The size limit, collecting the oversized
+            files.
+        results (dict): Filled with the ignored paths keyed by their case
+            folded path.
+
+    Returns:
+        list: The (path, relative root, wishlist node) of the collapsed
+            directories the wishlist needs to look into.
+
+    """
+    collapsed_directories = []
+    pending = [('', desired)]
+    while pending:
+        relative_root, node = pending.pop()
+        raw_directories = listings[relative_root][1]
+        ignored, too_large, children = _get_ignored_in_listing(
+            relative_root,
+            listings[relative_root][0],
+            {folder: x[0] for folder, x in raw_directories.items()},
+            node,
+            ignore_matcher,
+            options.size_limit)
+        for path in ignored:
+            results.setdefault(path.lower(), path)
+        options.oversized.update(too_large)
+
+        for child in children:
+            if raw_directories[child[1].rsplit('/', 1)[-1]][1]:
+                collapsed_directories.append(child)
+            else:
+                pending.append(child[1:])
+    return collapsed_directories
+
+
+def _build_candidate_listings(root_directory: str, candidates: list):
+    """
+    Arrange candidate paths into per directory listings.
+
+    Args:
+        root_directory (str): The path the candidates are relative to.
+        candidates (list): The relative paths of the entries in the tree.
+            Directories end with a slash and their contents are unknown.
+
+    Returns:
+        dict: The normalized, lowercase path of each directory mapped to a
+            dict of its file names mapped to their on-disk path and a dict of
+            its child directory names mapped to their [on-disk path,
+            collapsed] pair.
+
+    """
+    listings = {'': ({}, {})}
+    for candidate in candidates:
+        is_collapsed = candidate.endswith('/')
+        components = candidate.rstrip('/').split('/')
+        relative_root = ''
+        directory = root_directory
+        for i, name in enumerate(components):
+            folder = string_utility.normalize_string(name, lower=True)
+            raw_files, raw_directories = listings[relative_root]
+            directory = os.path.join(directory, name)
+            is_last = i == len(components) - 1
+            if is_last and not is_collapsed:
+                raw_files[folder] = directory
+                break
+
+            relative_root = _get_relative_path(relative_root, folder)
+            if folder not in raw_directories:
+                raw_directories[folder] = [directory, is_last]
+                listings[relative_root] = ({}, {})
+    return listings
+
+
+def _walk(pending: list,
+          walk_directory,
+          workers: int,
+          results: dict,
+          oversized: dict):
+    """
+    Walk the pending directories, serially or with a pool of threads.
+
+    Args:
+        pending (list): The (path, relative root, wishlist node) of the
+            directories to walk.
+        walk_directory (callable): Decides what to ignore in one directory.
+        workers (int): The number of threads to walk with.
+        results (dict): The ignored paths keyed by their case folded path.
+        oversized (dict): The oversized files mapped to their size.
+
+    """
+    if workers > 1:
+        _walk_in_parallel(pending, walk_directory, workers, results, oversized)
+        return
+
+    while pending:
+        ignored, too_large, children = walk_directory(*pending.pop())
+        for path in ignored:
+            results.setdefault(path.lower(), path)
+        oversized.update(too_large)
+        pending.extend(reversed(children))
+
+
+def _walk_in_parallel(pending: list,
+                      walk_directory,
+                      workers: int,
+                      results: dict,
+                      oversized: dict):
+    """
+    Walk the pending directories with a pool of threads.
+
+    Only a bounded number of directories are handed to the pool at a time,
+    the rest wait on the pending stack. Results are merged on the calling
+    thread and sorted by the caller, so the order in which the workers finish
+    does not matter.
+
+    Args:
+        pending (list): The (path, relative root, wishlist node) of the
+            directories to walk.
+        walk_directory (callable): Decides what to ignore in one directory.
+        workers (int): The number of threads to walk with.
+        results (dict): The ignored paths keyed by their case folded path.
+        oversized (dict): The oversized files mapped to their size.
+
+    """
+    logging.info('Walking the tree with %d workers.', workers)
+    max_in_flight = workers * 2
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        while pending or in_flight:
+            while pending and len(in_flight) < max_in_flight:
+                in_flight.add(pool.submit(walk_directory, *pending.pop()))
+
+            done, in_flight = concurrent.futures.wait(
+                in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                ignored, too_large, children = future.result()
+                for path in ignored:
+                    results.setdefault(path.lower(), path)
+                oversized.update(too_large)
+                pending.extend(reversed(children))
+
+
+# pylint: disable=too-many-arguments
+def _get_cached_ignored_in_directory(
+        directory: str,
+        relative_root: str,
+        desired: Node,
+        ignore_matcher: pattern_utility.IgnoreMatcher,
+        size_limit: int,
+        previous_cache: dict,
+        walk_cache: dict):
+    """
+    Decide which entries of a directory to ignore, reusing the walk cache.
+
+    The directory is only listed again if its mtime changed, as adding,
+    removing or renaming an entry always updates the mtime of its parent.
+    Files growing in place do not, so their size is only checked again once
+    their directory changes.
+
+    Args:
+        directory (str): The on-disk path of the directory to scan.
+        relative_root (str): The normalized, lowercase path of the directory
+            relative to the walk root, used for matching and output.
+        desired (Node): The wishlist trie node of this directory.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns to run against the entries such so we exclude matches.
+        size_limit (int): Size in bytes above which kept files are reported
+            as oversized. None to not check sizes.
+        previous_cache (dict): The walk cache entries of the previous run.
+        walk_cache (dict): The walk cache to record this directory into.
+
+    Returns:
+        list: The paths to ignore found directly under this directory.
+        list: The (path, size) of each oversized file directly under this
+            directory.
+        list: The (path, relative root, wishlist node) of each child directory
+            that must still be walked.
+
+    """
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    cached = previous_cache.get(relative_root)
+    if mtime is not None and cached is not None and cached['mtime'] == mtime:
+        children = []
+        for name, folder in cached['children']:
+            node = _get_child_node(desired, folder)
+            if node is None:
+                break
+            children.append((os.path.join(directory, name),
+                             _get_relative_path(relative_root, folder),
+                             node))
+        else:
+            walk_cache[relative_root] = cached
+            return cached['ignored'], cached['oversized'], children
+
+    ignored, oversized, children = _get_ignored_in_directory(directory,
+                                                             relative_root,
+                                                             desired,
+                                                             ignore_matcher,
+                                                             size_limit)
+    if mtime is not None:
+        walk_cache[relative_root] = {
+            'mtime': mtime,
+            'ignored': ignored,
+            'oversized': oversized,
+            'children': [[os.path.basename(path), folder.rsplit('/', 1)[-1]]
+                         for path, folder, _ in children]}
+
+    return ignored, oversized, children
+# pylint: enable=too-many-arguments
+
+
+def _get_ignored_in_directory(directory: str,
+                              relative_root: str,
+                              desired: Node,
+                              ignore_matcher: pattern_utility.IgnoreMatcher,
+                              size_limit: int = None):
+    """
+    Decide which entries of a single directory should be ignored.
+
+    Args:
+        directory (str): The on-disk path of the directory to scan.
+        relative_root (str): The normalized, lowercase path of the directory
+            relative to the walk root, used for matching and output.
+        desired (Node): The wishlist trie node of this directory.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns to run against the entries such so we exclude matches.
+        size_limit (int, optional): Size in bytes above which kept files are
+            reported as oversized.
+
+    Returns:
+        list: The paths to ignore found directly under this directory.
+        list: The (path, size) of each oversized file directly under this
+            directory.
+        list: The (path, relative root, wishlist node) of each child directory
+            that must still be walked.
+
+    """
+    raw_files, raw_directories = _scan_directory(directory)
+    return _get_ignored_in_listing(
+        relative_root,
+        raw_files,
+        {folder: entry.path for folder, entry in raw_directories.items()},
+        desired,
+        ignore_matcher,
+        size_limit)
+
+
+# pylint: disable=too-many-arguments
+def _get_ignored_in_listing(relative_root: str,
+                            raw_files: dict,
+                            raw_directories: dict,
+                            desired: Node,
+                            ignore_matcher: pattern_utility.IgnoreMatcher,
+                            size_limit: int = None):
+    """
+    Decide which entries of a directory listing should be ignored.
+
+    Args:
+        relative_root (str): The normalized, lowercase path of the directory
+            relative to the walk root, used for matching and output.
+        raw_files (dict): The normalized, lowercase names of the files mapped
+            to their DirEntry or on-disk path.
+        raw_directories (dict): The normalized, lowercase names of the child
+            directories mapped to their on-disk path.
+        desired (Node): The wishlist trie node of this directory.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns to run against the entries such so we exclude matches.
+        size_limit (int, optional): Size in bytes above which kept files are
+            reported as oversized.
+
+    Returns:
+        list: The paths to ignore found directly under this directory.
+        list: The (path, size) of each oversized file directly under this
+            directory.
+        list: The (path, relative root, wishlist node) of each child directory
+            that must still be walked.
+
+    """
+    directories_to_ignore, children = _cull_directories(relative_root,
+                                                        raw_directories,
+                                                        desired,
+                                                        ignore_matcher,
+                                                        size_limit)
+
+    # Cull out the undesired files. Entries ending in '/*' keep every file.
+    if desired.is_leaf or WISHLIST_FILES_TOKEN in desired.children:
+        undesired_files = []
+        desired_files = raw_files
+    else:
+        undesired_files = [x for x in raw_files if x not in desired.children]
+        desired_files = [x for x in raw_files if x in desired.children]
+    files_to_ignore = _cull_files(relative_root,
+                                  undesired_files,
+                                  ignore_matcher)
+
+    oversized = []
+    if size_limit is not None:
+        oversized = _get_oversized_files(relative_root,
+                                         {x: raw_files[x]
+                                          for x in desired_files},
+                                         ignore_matcher,
+                                         size_limit)
+
+    return files_to_ignore + directories_to_ignore, oversized, children
+# pylint: enable=too-many-arguments
+
+
+def _cull_directories(relative_root: str,
+                      raw_directories: dict,
+                      desired: Node,
+                      ignore_matcher: pattern_utility.IgnoreMatcher,
+                      size_limit: int):
+    """
+    Cull out the undesired directories before they are ever listed.
+
+    Args:
+        relative_root (str): The normalized, lowercase path of the directory
+            relative to the walk root.
+        raw_directories (dict): The normalized, lowercase names of the child
+            directories mapped to their on-disk path.
+        desired (Node): The wishlist trie node of this directory.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns.
+        size_limit (int): Size in bytes above which kept files are reported
+            as oversized. None to not check sizes.
+
+    Returns:
+        list: The paths of the child directories to ignore.
+        list: The (path, relative root, wishlist node) of each child directory
+            that must still be walked.
+
+    """
+    directories_to_ignore = []
+    children = []
+    for folder, directory in raw_directories.items():
+        path = _get_relative_path(relative_root, folder)
+        node = _get_child_node(desired, folder)
+        if ignore_matcher.match(path, is_dir=True) is not None:
+            if node is None:
+                directories_to_ignore.append(path)
+        elif node is None:
+            directories_to_ignore.append(path)
+        elif not node.is_leaf or size_limit is not None:
+            # Continue going down the rabbit hole. Directories kept whole are
+            # only walked to check the size of their files.
+            children.append((directory, path, node))
+
+    if directories_to_ignore:
         logging.debug("Ignoring the following directories found @ '%s': %s",
-                      root_directory,
-                      string_utility.friendly_list_to_str(undesired_dirs))
-
-    directories_to_ignore = _insert_items_in_list(undesired_dirs,
-                                                  root_directory,
-                                                  results,
-                                                  directories_to_ignore)
-
-    # Cull out the undesired files.
-    should_ignore_files = any([s for s in results if root_directory[2:] in s])
-    files_to_ignore = _cull_files(root_directory,
-                                  raw_files,
-                                  desired_pattern,
-                                  results,
-                                  ignore_regex,
-                                  should_ignore_files)
-    # if the current folder is the last on the desired group and there are
-    # no more folders to walk under. Then we may want to add the files here
-    # as the desired entry includes all of it.
-
-    results += [x for x in files_to_ignore if x.lower() not in results]
-    results += [x for x in directories_to_ignore if x.lower() not in results]
-    return results
-
-# pylint: enable=too-many-locals
+                      relative_root,
+                      string_utility.lazy_friendly_list_to_str(
+                          directories_to_ignore))
+    return directories_to_ignore, children
+
+
+def _get_child_node(desired: Node, folder: str):
+    # Everything under a directory kept whole is kept whole as well.
+    if desired.is_leaf:
+        return desired
+    return desired.children.get(folder)
+
+
+def _get_oversized_files(relative_root: str,
+                         files: dict,
+                         ignore_matcher: pattern_utility.IgnoreMatcher,
+                         size_limit: int):
+    """
+    Find the kept files larger than the size limit.
+
+    Args:
+        relative_root (str): The normalized, lowercase path of the directory
+            relative to the walk root.
+        files (dict): The names of the kept files mapped to their DirEntry,
+            whose cached stat is used, or to their on-disk path.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns. Matched files are already ignored by them.
+        size_limit (int): Size in bytes above which files are oversized.
+
+    Returns:
+        list: The (path, size) of each oversized file.
+
+    """
+    oversized = []
+    for name, entry in files.items():
+        path = _get_relative_path(relative_root, name)
+        if ignore_matcher.match(path) is not None:
+            continue
+        try:
+            if isinstance(entry, os.DirEntry):
+                size = entry.stat().st_size
+            else:
+                size = os.stat(entry).st_size
+        except OSError:
+            continue
+        if size > size_limit:
+            logging.debug("Ignoring '%s' weighing %d bytes.", path, size)
+            oversized.append((path, size))
+    return oversized
+
+
+def compact_ignore_list(root_directory: str,
+                        ignore_list: list,
+                        ignore_matcher: pattern_utility.IgnoreMatcher,
+                        minimum_siblings: int = 3,
+                        also_ignored: set = None):
+    """
+    Fold sibling ignore entries into a wildcard followed by negations.
+
+    A directory where most entries are ignored is written as 'dir/*' followed
+    by '!dir/entry' for each entry to keep, whenever that takes fewer lines.
+    Entries matched by the ignore patterns are never negated since the
+    wildcard ignores them just the same.
+
+    Args:
+        root_directory (str): The root the ignore list is relative to.
+        ignore_list (list): Sorted relative paths to be ignored.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns.
+        minimum_siblings (int, optional): Directories with fewer ignored
+            entries are not rescanned.
+        also_ignored (set, optional): Relative paths ignored elsewhere in the
+            file, which must not be negated either.
+
+    Returns:
+        list: (path, negated) tuples in the order they must be written.
+
+    """
+    siblings = {}
+    for path in ignore_list:
+        parent, _, _ = path.rpartition('/')
+        siblings.setdefault(parent, []).append(path)
+
+    rules = []
+    negations = {}
+    for parent, ignored in siblings.items():
+        if len(ignored) < minimum_siblings:
+            rules.extend(ignored)
+            continue
+
+        kept = _get_kept_entries(os.path.join(root_directory, parent),
+                                 parent,
+                                 set(ignored).union(also_ignored or ()),
+                                 ignore_matcher)
+        if len(kept) + 1 >= len(ignored):
+            rules.extend(ignored)
+            continue
+
+        wildcard = _get_relative_path(parent, '*')
+        logging.debug("Folding %d entries under '%s' into %s with %d "
+                      "negations.",
+                      len(ignored),
+                      parent,
+                      wildcard,
+                      len(kept))
+        rules.append(wildcard)
+        negations[wildcard] = kept
+
+    compacted = []
+    for rule in sorted(rules):
+        compacted.append((rule, False))
+        # Negations only work when written after the wildcard they undo.
+        compacted.extend((x, True) for x in negations.get(rule, []))
+    return compacted
+
+
+def _get_kept_entries(directory: str,
+                      relative_root: str,
+                      ignored: set,
+                      ignore_matcher: pattern_utility.IgnoreMatcher):
+    """
+    List the entries of a directory that must stay visible to git.
+
+    Args:
+        directory (str): The path to the directory on disk.
+        relative_root (str): The path of the directory relative to the root.
+        ignored (set): The relative paths ignored under the directory.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns.
+
+    Returns:
+        list: Sorted relative paths neither ignored nor matched by the
+            patterns.
+
+    """
+    files, directories = _scan_directory(directory)
+    kept = []
+    for names, is_dir in ((files, False), (directories, True)):
+        for name in names:
+            path = _get_relative_path(relative_root, name)
+            if path not in ignored and \
+                    ignore_matcher.match(path, is_dir) is None:
+                kept.append(path)
+    return sorted(kept)
+
 # ============================================================================
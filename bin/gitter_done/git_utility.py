@@ -1,139 +1,22 @@
 """A module handling a lot of the common git specific operations will be using.
 
-Attributes:
-    GITIGNORE_FILENAME (str): default name of the file used to create the git
-        ignore tree.
-    GITIGNORE_BEGIN_TOKEN (str): A token to prefix to the output of the
-        ignore file.
-    GITIGNORE_END_TOKEN (str): A token to sufix to the output of the
-        ignore file.
+The generation of the git ignore files lives in gitignore_utility.
 
 """
 import logging
-import os
 import fnmatch
 import re
-import sys
 
 from . import config
 from . import console_utility
 from . import external_process_utility
-from . import file_utility
+from . import logging_utility
 from . import string_utility
+from . import timing_utility
+from . import trace_utility
 
-# ============================================================================
-# Global Variables.
-GITIGNORE_FILENAME = config.get_git_ignore_filename()
-GITIGNORE_BEGIN_TOKEN = '# GENERATED BY GitterDone.py **********************\n'
-GITIGNORE_END_TOKEN = '# END GEN ******************************************\n'
-# ============================================================================
-
-
-# ============================================================================
-class Node:  # pylint:disable=R0903
-    """
-    Object representation of each entry in a tree.
-
-    Attributes:
-        path (string): String representing a filepath.
-        is_leaf (bool): Flag representing if this node is a leaf.
-
-    """
-
-    def __init__(self, path, is_leaf):
-        """
-        Object constructor.
-
-        Args:
-            path (string): String representing a filepath.
-            is_leaf (bool): Flag representing if this node is a leaf.
 
-        """
-        self.path = path
-        self.is_leaf = is_leaf
 # ============================================================================
-
-
-# ============================================================================
-def generate_git_ignore(to_track: list,
-                        to_ignore: list,
-                        ignore_file_path: str = '.'):
-    """
-    Handle creating the new gitignore that just tracks everything by default.
-
-    Args:
-        to_track (list): The list of files and folders to be tracked.
-        to_ignore (list): The list patterns to be ignored by git.
-        ignore_file_path (str): The absolute path to the desired git ignore.
-
-    """
-    logging.info("Automatically Generating the %s file.", GITIGNORE_FILENAME)
-
-    file_contents = []
-    wish_list = to_track
-
-    wish_list = string_utility.normalize_strings(wish_list)
-    ignore_patterns_list = string_utility.normalize_strings(to_ignore)
-    ignore_regex_list = string_utility.convert_to_regex_entries(
-        ignore_patterns_list
-        )
-    logging.debug('Tracking the following patterns: %s',
-                  string_utility.friendly_list_to_str(wish_list))
-    logging.debug('Ignoring the following patterns: %s',
-                  string_utility.friendly_list_to_str(ignore_patterns_list))
-
-    wishlist_file_map = file_utility.generate_wishlist_filemap(wish_list)
-
-    final_ignore_list = file_utility.recursely_get_ignored(".",
-                                                           [],
-                                                           wishlist_file_map,
-                                                           ignore_regex_list)
-
-    final_ignore_list.sort()
-    file_contents.append(GITIGNORE_BEGIN_TOKEN)
-    file_contents.append('\n')
-    file_contents.append("# --- Ignored patterns imported from config.\n\n")
-    for item in ignore_patterns_list:
-        file_contents.append(item + '\n')
-    file_contents.append("\n# --- Auto Generated to be ignored.\n\n")
-    for item in final_ignore_list:
-        if sys.platform == 'win32':
-            path = os.altsep + item + '\n'
-        else:
-            path = os.sep + item + '\n'
-        file_contents.append(path)
-    file_contents.append('\n')
-    file_contents.append(GITIGNORE_END_TOKEN)
-
-    logging.debug("New gitignore contents:\n %s",
-                  file_contents)
-    _save_git_ignore_to_disk(file_contents, ignore_file_path)
-
-    logging.info('%s was updated successfully!', GITIGNORE_FILENAME)
-
-
-def _save_git_ignore_to_disk(contents: str, filepath: str):
-    """
-    Save the .gitignore file to disk.
-
-    Args:
-        contents (str): Contents of the file to be written.
-
-    """
-    output_path = '.'
-    if os.path.isdir(filepath):
-        output_path = os.path.join(filepath, GITIGNORE_FILENAME)
-    else:
-        output_path = GITIGNORE_FILENAME
-    logging.info('Saving ignore list to disk at \"%s\".', output_path)
-    logging.debug('Contents of ignore file: \n%s', contents)
-
-    file = open(output_path, 'w')
-    file.writelines(contents)
-
-    file.close()
-
-
 def _remove_ignored_files_from_file_list(file_list: list, ignore_list: list):
     pruned_file_list = file_list
 
@@ -166,6 +49,7 @@ def _remove_ignored_files_from_file_list(file_list: list, ignore_list: list):
 
 # ============================================================================
 # Git Log file parsing operations.
+@timing_utility.phase('list changes')
 def get_modified_files_for_branch(
         desired_branch: str,
         include_trunk_branch: str,
@@ -190,7 +74,7 @@ def get_modified_files_for_branch(
             structure.
 
     """
-    command = ''
+    command = ['git', 'log']
 
     if desired_branch:
         logging.info('Getting all the commits for branch: %s', desired_branch)
@@ -199,29 +83,31 @@ def get_modified_files_for_branch(
                           ' requested for branch: %s'),
                          trunk_branch_name,
                          desired_branch)
-
-            command = (f'git log {desired_branch}'
-                       ' --name-status --oneline --no-merges')
-        else:
-            command = (f'git log {desired_branch} --name-status '
-                       f'--oneline --no-merges --not '
-                       f'{trunk_branch_name} {ignored_branches}')
+        command.append(desired_branch)
     else:
         logging.info('Getting all the commits for the entire repository')
         if include_trunk_branch:
             logging.info('Include the trunk branch changes requested')
-            command = 'git log --all --name-status --oneline --no-merges'
-        else:
-            command = (f'git log --all --name-status'
-                       f' --oneline--no-merges'
-                       f' --not {trunk_branch_name} {ignored_branches}')
+        command.append('--all')
+
+    # Follow a chronological order. Important in special cases e.g. A file is
+    # first deleted and then added again.
+    command += ['--name-status', '--oneline', '--no-merges', '--reverse']
+    if not include_trunk_branch:
+        command += ['--not', trunk_branch_name, *ignored_branches.split()]
 
+    # The log of a whole repository can be huge, so parse it as it is read
+    # back instead of holding it in memory.
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.stream_command(command)
 
     if successfull_command_call:
-        return _parse_modified_files_list(command_results)
+        with command_results:
+            add_edit_list, delete_list = _parse_modified_files_lines(
+                command_results.lines())
+        trace_utility.add_count('git files', 'add/edit', len(add_edit_list))
+        trace_utility.add_count('git files', 'delete', len(delete_list))
+        return add_edit_list, delete_list
 
     return None, None
 
@@ -230,9 +116,6 @@ def _parse_modified_files_list(plain_text_input: str):
     """
     Parse a plain text return from a git log command.
 
-    Based on the entry we bucket the output into the appropriate file list.
-    'Add', 'Delete', 'Edit.'
-
     Args:
         plain_text_input (str): The plain text return from a git log command,
                                    informing which files have been touched.
@@ -242,53 +125,77 @@ def _parse_modified_files_list(plain_text_input: str):
         list: A lists of files that need to be removed from P4.
 
     """
-    add_edit_list = []
-    delete_list = []
-
     lines = plain_text_input.splitlines()
 
     # Reverse the list so we follow a chronological order. Important in special
     # cases e.g. A file is first deleted and then added again.
     lines.reverse()
 
-    pretty_lines_list = string_utility.friendly_list_to_str(lines)
-    logging.debug('Extracted logs from the git branch: %s', pretty_lines_list)
+    logging.debug('Extracted logs from the git branch: %s',
+                  string_utility.lazy_friendly_list_to_str(lines))
 
-    for line in lines:
-        logging.debug('Parsing the following line: \"%s\"', line)
+    return _parse_modified_files_lines(lines)
+
+
+def _parse_modified_files_lines(lines):
+    """
+    Parse the lines of a git log command, in chronological order.
 
+    Based on the entry we bucket the output into the appropriate file list.
+    'Add', 'Delete', 'Edit.'
+
+    Args:
+        lines (iterable): The lines of a git log command, informing which
+            files have been touched, oldest first. Consumed one at a time.
+
+    Returns:
+        list: A lists of files that need to be added to P4.
+        list: A lists of files that need to be removed from P4.
+
+    """
+    add_edit_list = []
+    delete_list = []
+
+    # One record per line at most, as the log of a large branch holds as
+    # many lines as files, and none when no handler emits DEBUG.
+    log_lines = logging_utility.is_level_emitted(logging.DEBUG)
+    for line in lines:
         # look for: add (A), delete (D), modify (M)
         match = re.match(r'([ADM])\s*\t*(.+)', line)
         if match:
             if (match.group(1) == 'A' or match.group(1) == 'M'):
-                logging.debug('File added or modified: \"%s\" \n',
-                              match.group(2)
-                              )
+                if log_lines:
+                    logging.debug('File added or modified: \"%s\"',
+                                  match.group(2))
                 _sync_file_lists(match.group(2), add_edit_list, delete_list)
                 continue
 
             if match.group(1) == 'D':
-                logging.debug('File to be deleted: \"%s\" \n', match.group(2))
+                if log_lines:
+                    logging.debug('File to be deleted: \"%s\"',
+                                  match.group(2))
                 _sync_file_lists(match.group(2), delete_list, add_edit_list)
                 continue
 
         # look for: rename (R)
         match = re.match(r'R[0-9]+\s*\t*(.+(?=\w*\s*\t))\s*\t*(.+)', line)
         if match:
-            logging.debug(
-                'File to be renamed from this \"%s\", to this \"%s\" \n',
-                match.group(1), match.group(2)
-                )
+            if log_lines:
+                logging.debug(
+                    'File to be renamed from this \"%s\", to this \"%s\"',
+                    match.group(1), match.group(2))
 
             _sync_file_lists(match.group(1), delete_list, add_edit_list)
             _sync_file_lists(match.group(2), add_edit_list, delete_list)
             continue
 
-    delete_list_string = string_utility.friendly_list_to_str(delete_list)
-    logging.debug('Files to be deleted: %s', delete_list_string)
+        if log_lines:
+            logging.debug('Skipping the following line: \"%s\"', line)
 
-    add_list_string = string_utility.friendly_list_to_str(add_edit_list)
-    logging.debug('Files to add/edit: %s', add_list_string)
+    logging.debug('Files to be deleted: %s',
+                  string_utility.lazy_friendly_list_to_str(delete_list))
+    logging.debug('Files to add/edit: %s',
+                  string_utility.lazy_friendly_list_to_str(add_edit_list))
 
     return add_edit_list, delete_list
 
@@ -317,6 +224,7 @@ def _sync_file_lists(file, list_to_add_to, list_to_remove_from):
 
 # ============================================================================
 # Git Operations.
+@timing_utility.phase('commit')
 def stage_git_changes():
     """
     Add all the changes in the current git branch.
@@ -325,16 +233,15 @@ def stage_git_changes():
         bool: True if the git add command was successful.
 
     """
-    git_add_command = 'git add -A'
-    git_status_command = 'git status'
+    git_add_command = ['git', 'add', '-A']
+    git_status_command = ['git', 'status']
     attempts = 0
 
     while attempts < 3:
         # first check if there are changes.
         successfull_command_call, \
-            command_results = (external_process_utility.
-                               trigger_external_subprocess(
-                                   git_status_command))
+            command_results = external_process_utility.run_command(
+                git_status_command)
         if not successfull_command_call:
             logging.error('git status operation failed.')
             return False
@@ -351,9 +258,8 @@ def stage_git_changes():
                           ' Triggering git add command once again.'))
 
             successfull_command_call, \
-                command_results = (external_process_utility.
-                                   trigger_external_subprocess(
-                                       git_add_command))
+                command_results = external_process_utility.run_command(
+                    git_add_command)
             if not successfull_command_call:
                 logging.error('Could not perform git add operation.')
                 return False
@@ -365,6 +271,7 @@ def stage_git_changes():
     return True
 
 
+@timing_utility.phase('commit')
 def commit_git_changes(commit_mesage):
     """
     Create a commit in git with the latest changes.
@@ -373,10 +280,9 @@ def commit_git_changes(commit_mesage):
         bool: True if the git commit command was successful.
 
     """
-    command = f'git commit -v -m \"{commit_mesage}\"'
+    command = ['git', 'commit', '-v', '-m', commit_mesage]
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(command)
     if successfull_command_call:
         logging.debug("Commit sucessfull:\n%s", command_results)
         return True
@@ -391,10 +297,9 @@ def git_fetch():
         bool: True if the operation successfully completes.
 
     """
-    command = 'git fetch --all --tags --force --prune'
+    command = ['git', 'fetch', '--all', '--tags', '--force', '--prune']
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(command)
     if successfull_command_call:
         logging.debug("Fetch sucessfull:\n%s", command_results)
         return True
@@ -409,10 +314,9 @@ def discard_git_changes():
         bool: True if the discard was successful.
 
     """
-    command = 'git reset --hard'
+    command = ['git', 'reset', '--hard']
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(command)
     if successfull_command_call:
         logging.debug("Reset sucessfull:\n%s", command_results)
         return True
@@ -433,18 +337,17 @@ def push(origin_name: str, tag: str = None, forced: bool = False):
              (DANGEROUS)
 
     """
-    command = f'git push {origin_name}'
+    command = ['git', 'push', origin_name]
     if forced:
-        command = f'git push -f {origin_name}'
+        command = ['git', 'push', '-f', origin_name]
     if tag is not None:
-        command += f' {tag}'
+        command.append(tag)
 
     logging.debug(
         "Pushing to the respository via the following command: %s",
         command)
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(command)
     if successfull_command_call:
         logging.debug("Push sucessfull:\n%s", command_results)
         return True
@@ -467,18 +370,17 @@ def tag_commit(tag: str,
             commit was successful.
 
     """
-    command = f'git tag {tag}'
+    command = ['git', 'tag', tag]
     if force:
-        command += ' -f'
+        command.append('-f')
     if message:
-        command += f' -m "{message}"'
+        command += ['-m', message]
     if commit_hash is not None:
-        command += f' {commit_hash}'
+        command.append(commit_hash)
 
     logging.debug("Tagging commit via the following command: %s", command)
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(command)
     if successfull_command_call:
         logging.debug("Tagged:\n %s", command_results)
         return True
@@ -502,22 +404,28 @@ def delete_tag(tag: str,
             commit was successful.
 
     """
-    command = f'git tag --delete {tag}'
+    commands = [['git', 'tag', '--delete', tag]]
     if delete_on_remote:
-        command += f' & git push -f {remote_name} :refs/tags/{tag}'
+        commands.append(['git', 'push', '-f', remote_name,
+                         f':refs/tags/{tag}'])
 
-    logging.debug(
-        "Deleting a tag from the respository via the following command: %s",
-        command)
-    successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
+    for command in commands:
+        logging.debug(
+            "Deleting a tag from the respository via the following command: "
+            "%s",
             command)
-    if successfull_command_call:
+        successfull_command_call, \
+            command_results = external_process_utility.run_command(command)
+        if not successfull_command_call:
+            logging.error("Could not delete the tag '%s': %s",
+                          tag,
+                          command_results)
+            return False
         logging.debug("Tagged deleted:\n %s", command_results)
-        return True
-    return False
+    return True
 
 
+@timing_utility.phase('preflight')
 def check_and_resolve_pending_git_changes(bypass_prompt: bool = False):
     """
     Verify that the branch has no current pending changes.
@@ -528,10 +436,9 @@ def check_and_resolve_pending_git_changes(bypass_prompt: bool = False):
     """
     logging.info("Checking for pending changes in current branch.")
     resolved_changes = False
-    command = "git status -s"
+    command = ['git', 'status', '-s']
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(command)
     if successfull_command_call:
         if command_results:
             logging.error("There are pending changes on this branch!")
@@ -552,6 +459,7 @@ def check_and_resolve_pending_git_changes(bypass_prompt: bool = False):
     return resolved_changes
 
 
+@timing_utility.phase('preflight')
 def check_and_resolve_if_user_is_on_branch(branch_name: str,
                                            bypass_prompt: bool = False):
     """
@@ -603,10 +511,10 @@ def is_user_in_branch(branch_name: str):
              on the right branch. Empty otherwise.
 
     """
-    command = "git rev-parse --abbrev-ref HEAD"
+    command = ['git', 'rev-parse', '--abbrev-ref', 'HEAD']
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(
+            command, idempotent=True)
     if successfull_command_call:
         match = re.match(r'(.+)', command_results)
         if match:
@@ -639,11 +547,10 @@ def checkout_branch(branch_name: str):
     """
     logging.info("Executing checkout of the trunk branch.")
 
-    command = f"git checkout {branch_name} -f"
+    command = ['git', 'checkout', branch_name, '-f']
 
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(command)
     if successfull_command_call:
         logging.info("Successfully checked out %s.", branch_name)
         logging.debug("Checkout Successful:\n%s", command_results)
@@ -665,10 +572,10 @@ def pull_latest_branch_version(branch_name: str, default_remote_name: str):
     """
     logging.info("Pulling latest commit from remote forcefully in git.")
 
-    command = "git reset --hard " + default_remote_name + "/" + branch_name
+    command = ['git', 'reset', '--hard',
+               f'{default_remote_name}/{branch_name}']
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(command)
     if successfull_command_call:
         logging.info(
             "Successfully git pulled to latest commit in the trunk branch.")
@@ -695,10 +602,10 @@ def get_details_of_last_commit_for_tag(desired_tag_name: str):
     logging.info("Getting the details of the commit tagged as: %s",
                  desired_tag_name)
 
-    command = "git log -1 --oneline " + desired_tag_name
+    command = ['git', 'log', '-1', '--oneline', desired_tag_name]
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(
+            command, idempotent=True)
     if successfull_command_call:
         logging.info("Successfully retrieved details of commit tagged as: %s",
                      desired_tag_name)
@@ -732,10 +639,10 @@ def get_details_of_last_commit_for_branch(desired_branch_name: str):
                       desired_branch_name)
         return ""
 
-    command = "git log -1 --oneline " + desired_branch_name
+    command = ['git', 'log', '-1', '--oneline', desired_branch_name]
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(
+            command, idempotent=True)
     if successfull_command_call:
         logging.info(
             "Last commit details from branch: %s retrieved successfully",
@@ -793,6 +700,7 @@ def parse_hash_from_raw_commit_message(raw_commit_message: str):
     return match.group(1)
 
 
+@timing_utility.phase('verify branch')
 def verify_branch_up_to_date(  # pylint:disable=R0912, R0911
         desired_branch_name: str,
         target_changelist_number: str,
@@ -948,10 +856,10 @@ def check_if_remote_set_up_exist():
         bool: True if there is a remote repository bound to the repository.
 
     """
-    command = 'git remote -v'
+    command = ['git', 'remote', '-v']
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(
+            command, idempotent=True)
     if successfull_command_call:
         if command_results:
             logging.info(
@@ -971,10 +879,10 @@ def get_git_branch_information():
     """
     logging.info('Retrieving the Git Repository\'s Branch information.')
 
-    command = 'git branch -a'
+    command = ['git', 'branch', '-a']
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(
+            command, idempotent=True)
     if successfull_command_call:
         branches = re.findall('(\\w.+$)', command_results, re.MULTILINE)
     return branches
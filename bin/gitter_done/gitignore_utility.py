@@ -0,0 +1,830 @@
+"""A module generating the git ignore files tracking only the wishlist.
+
+Attributes:
+    GITIGNORE_FILENAME (str): default name of the file used to create the git
+        ignore tree.
+    GITIGNORE_BEGIN_TOKEN (str): A token to prefix to the output of the
+        ignore file.
+    GITIGNORE_END_TOKEN (str): A token to sufix to the output of the
+        ignore file.
+    GITIGNORE_WALK_CACHE_PATH (str): path to the cache of the directories
+        walked while generating the git ignore.
+    WALK_CACHE_VERSION (int): Version of the walk cache decisions. Bump it to
+        invalidate existing caches whenever the walker decisions change.
+    DISCOVERY_WALKER (str): Discovery backend walking the tree in python.
+    DISCOVERY_GIT (str): Discovery backend listing the tree through git.
+    DISCOVERY_BACKENDS (tuple): All the available discovery backends.
+    IGNORE_LAYOUT_SINGLE (str): Layout writing every generated entry into the
+        root ignore file.
+    IGNORE_LAYOUT_HIERARCHICAL (str): Layout writing the generated entries
+        into an ignore file next to the entries they affect.
+    IGNORE_LAYOUTS (tuple): All the available ignore layouts.
+
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+
+from . import config
+from . import console_utility
+from . import explain_utility
+from . import external_process_utility
+from . import file_utility
+from . import pattern_utility
+from . import string_utility
+from . import timing_utility
+from . import trace_utility
+
+# ============================================================================
+# Global Variables.
+GITIGNORE_FILENAME = config.get_git_ignore_filename()
+GITIGNORE_BEGIN_TOKEN = '# GENERATED BY GitterDone.py **********************\n'
+GITIGNORE_END_TOKEN = '# END GEN ******************************************\n'
+GITIGNORE_WALK_CACHE_PATH = config.get_git_ignore_walk_cache_path()
+WALK_CACHE_VERSION = 2
+DISCOVERY_WALKER = 'walker'
+DISCOVERY_GIT = 'git'
+DISCOVERY_BACKENDS = (DISCOVERY_WALKER, DISCOVERY_GIT)
+IGNORE_LAYOUT_SINGLE = 'single'
+IGNORE_LAYOUT_HIERARCHICAL = 'hierarchical'
+IGNORE_LAYOUTS = (IGNORE_LAYOUT_SINGLE, IGNORE_LAYOUT_HIERARCHICAL)
+# ============================================================================
+
+
+# ============================================================================
+class GitIgnoreOptions:  # pylint:disable=R0903
+    """
+    Options of the git ignore generation, defaulting to config.py.
+
+    Attributes:
+        use_walk_cache (bool): Flag determining if we should only rescan the
+            directories that changed since the last generation.
+        walk_workers (int): The number of threads walking the tree.
+        discovery_backend (str): One of DISCOVERY_BACKENDS, picking how the
+            entries of the tree are discovered.
+        compact (bool): Flag determining if sibling entries are folded into
+            wildcards and negations when shorter.
+        output_layout (str): One of IGNORE_LAYOUTS, picking which ignore
+            files the generated entries are written to.
+        size_limit_mb (float): Size in megabytes above which the files the
+            wishlist keeps get ignored anyway. Zero or less to keep them all.
+        explain_top (int): When set, the tree is walked without the walk
+            cache while profiling the ignore rules, and a report of the top
+            rules and pruned wishlist entries is printed.
+
+    """
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 use_walk_cache: bool = True,
+                 walk_workers: int = None,
+                 discovery_backend: str = None,
+                 compact: bool = None,
+                 output_layout: str = None,
+                 size_limit_mb: float = None,
+                 explain_top: int = None):
+        """
+        Object constructor. Options left to None use the value in config.py.
+
+        Args:
+            use_walk_cache (bool, optional): Whether to reuse the walk cache.
+            walk_workers (int, optional): The number of walking threads.
+            discovery_backend (str, optional): One of DISCOVERY_BACKENDS.
+            compact (bool, optional): Whether to compact the entries.
+            output_layout (str, optional): One of IGNORE_LAYOUTS.
+            size_limit_mb (float, optional): The size limit in megabytes.
+            explain_top (int, optional): The number of rules to report.
+
+        """
+        self.use_walk_cache = use_walk_cache and not explain_top
+        self.walk_workers = walk_workers
+        if walk_workers is None:
+            self.walk_workers = config.get_git_ignore_walk_workers()
+        self.discovery_backend = discovery_backend
+        if discovery_backend is None:
+            self.discovery_backend = config.get_git_ignore_discovery_backend()
+        self.compact = compact
+        if compact is None:
+            self.compact = config.get_git_ignore_compact()
+        self.output_layout = output_layout
+        if output_layout is None:
+            self.output_layout = config.get_git_ignore_layout()
+        self.size_limit_mb = size_limit_mb
+        if size_limit_mb is None:
+            self.size_limit_mb = config.get_git_ignore_size_limit_mb()
+        self.explain_top = explain_top
+
+    @property
+    def hierarchical(self):
+        """bool: Whether entries are written next to what they affect."""
+        return self.output_layout == IGNORE_LAYOUT_HIERARCHICAL
+
+    @property
+    def size_limit(self):
+        """int: The size limit in bytes, None to keep every file."""
+        if self.size_limit_mb is None or self.size_limit_mb <= 0:
+            return None
+        return int(self.size_limit_mb * 1024 * 1024)
+
+
+def generate_git_ignore(to_track: list,
+                        to_ignore: list,
+                        ignore_file_path: str = '.',
+                        options: GitIgnoreOptions = None):
+    """
+    Handle creating the new gitignore that just tracks everything by default.
+
+    Args:
+        to_track (list): The list of files and folders to be tracked.
+        to_ignore (list): The list patterns to be ignored by git.
+        ignore_file_path (str): The absolute path to the desired git ignore.
+        options (GitIgnoreOptions, optional): How the tree is discovered and
+            the entries written. Defaults to the values in config.py.
+
+    """
+    logging.info("Automatically Generating the %s file.", GITIGNORE_FILENAME)
+    if options is None:
+        options = GitIgnoreOptions()
+    if options.output_layout not in IGNORE_LAYOUTS:
+        logging.error("Unknown ignore layout '%s'. Expected one of: %s",
+                      options.output_layout,
+                      string_utility.friendly_list_to_str(IGNORE_LAYOUTS))
+
+    wish_list = string_utility.normalize_strings(to_track)
+    ignore_patterns_list = string_utility.normalize_strings(to_ignore)
+    ignore_matcher = pattern_utility.IgnoreMatcher(ignore_patterns_list)
+    logging.debug('Tracking the following patterns: %s',
+                  string_utility.lazy_friendly_list_to_str(wish_list))
+    logging.debug('Ignoring the following patterns: %s',
+                  string_utility.lazy_friendly_list_to_str(
+                      ignore_patterns_list))
+
+    wishlist_trie = file_utility.generate_wishlist_trie(wish_list)
+    walk_matcher = ignore_matcher
+    if options.explain_top:
+        logging.info('Profiling the ignore rules. Skipping the walk cache.')
+        walk_matcher = pattern_utility.ProfilingMatcher(ignore_matcher)
+
+    walk_options = file_utility.WalkOptions(workers=options.walk_workers,
+                                            size_limit=options.size_limit)
+    final_ignore_list = _discover_ignored(
+        wishlist_trie,
+        walk_matcher,
+        options,
+        walk_options,
+        _get_ignore_config_hash(wish_list,
+                                ignore_patterns_list,
+                                options.size_limit))
+
+    if options.explain_top:
+        console_utility.console_prompt(explain_utility.build_report(
+            walk_matcher,
+            explain_utility.get_pruned_directories(".",
+                                                   final_ignore_list,
+                                                   wishlist_trie),
+            options.explain_top))
+
+    final_ignore_list = _arrange_layout(final_ignore_list,
+                                        options.hierarchical)
+    _write_generated_entries(ignore_patterns_list,
+                             final_ignore_list,
+                             ignore_matcher,
+                             ignore_file_path,
+                             options,
+                             walk_options.oversized)
+    logging.info('%s was updated successfully!', GITIGNORE_FILENAME)
+
+
+def _discover_ignored(wishlist_trie: file_utility.Node,
+                      ignore_matcher: pattern_utility.IgnoreMatcher,
+                      options: GitIgnoreOptions,
+                      walk_options: file_utility.WalkOptions,
+                      config_hash: str):
+    """
+    Discover the entries to ignore with the chosen backend.
+
+    The git backend falls back to walking the tree when git can't list it.
+
+    Args:
+        wishlist_trie (file_utility.Node): The root of the wishlist trie.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns.
+        options (GitIgnoreOptions): The backend and walk cache to use.
+        walk_options (file_utility.WalkOptions): The workers and size limit
+            of the walk, collecting the oversized files.
+        config_hash (str): The hash of the configuration the walk cache was
+            built with.
+
+    Returns:
+        list: Sorted paths to be ignored.
+
+    """
+    if options.discovery_backend == DISCOVERY_GIT:
+        final_ignore_list = _get_ignored_with_git(wishlist_trie,
+                                                  ignore_matcher,
+                                                  walk_options)
+        if final_ignore_list is not None:
+            return final_ignore_list
+    elif options.discovery_backend != DISCOVERY_WALKER:
+        logging.error("Unknown discovery backend '%s'. Expected one of: %s",
+                      options.discovery_backend,
+                      string_utility.friendly_list_to_str(DISCOVERY_BACKENDS))
+
+    if options.use_walk_cache:
+        walk_options.walk_cache = file_utility.load_walk_cache(
+            GITIGNORE_WALK_CACHE_PATH, config_hash)
+
+    with timing_utility.phase('discovery'):
+        final_ignore_list = file_utility.recursely_get_ignored(
+            ".",
+            wishlist_trie,
+            ignore_matcher,
+            walk_options)
+
+    if options.use_walk_cache:
+        file_utility.save_walk_cache(GITIGNORE_WALK_CACHE_PATH,
+                                     config_hash,
+                                     walk_options.walk_cache)
+    return final_ignore_list
+
+
+def _arrange_layout(ignore_list: list, hierarchical: bool):
+    """
+    Arrange the ignored entries for the ignore files of the chosen layout.
+
+    Ignore files generated by a previous run are regenerated, not walked, and
+    the stale ones are cleaned up.
+
+    Args:
+        ignore_list (list): Sorted paths to be ignored.
+        hierarchical (bool): Flag determining if entries are written next to
+            the directories they affect rather than to the root git ignore.
+
+    Returns:
+        list: Sorted paths to be ignored, along with the nested ignore files
+            of the hierarchical layout.
+
+    """
+    generated_files = _find_generated_ignore_files(ignore_list, hierarchical)
+    ignore_list = [x for x in ignore_list if x not in generated_files]
+    nested_files = set()
+    if hierarchical:
+        nested_files = _get_nested_ignore_files(ignore_list)
+        ignore_list = sorted(nested_files.union(ignore_list))
+    _remove_stale_ignore_files(generated_files, nested_files)
+    return ignore_list
+
+
+def _write_generated_entries(  # pylint: disable=too-many-arguments
+        ignore_patterns_list: list,
+        ignore_list: list,
+        ignore_matcher: pattern_utility.IgnoreMatcher,
+        ignore_file_path: str,
+        options: GitIgnoreOptions,
+        oversized: dict):
+    """
+    Write the ignored entries, compacted when it is shorter and still exact.
+
+    Args:
+        ignore_patterns_list (list): The patterns imported from config.
+        ignore_list (list): Sorted paths to be ignored.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns.
+        ignore_file_path (str): The path to the root git ignore.
+        options (GitIgnoreOptions): The compaction and layout to use.
+        oversized (dict): The files over the size limit mapped to their size.
+
+    """
+    if oversized:
+        logging.info('Ignoring %d files over %s:\n%s',
+                     len(oversized),
+                     string_utility.friendly_size_to_str(options.size_limit),
+                     ''.join(_get_size_report(oversized)))
+
+    entries = [(x, False) for x in ignore_list]
+    trace_utility.add_count('gitignore entries', 'ignored', len(entries))
+    trace_utility.add_count('gitignore entries', 'oversized', len(oversized))
+
+    if options.compact:
+        with timing_utility.phase('compaction'):
+            compacted = file_utility.compact_ignore_list(
+                ".",
+                ignore_list,
+                ignore_matcher,
+                also_ignored=set(oversized))
+        logging.info('Compacting the %d generated entries into %d.',
+                     len(entries),
+                     len(compacted))
+
+        if len(compacted) < len(entries):
+            _write_git_ignore_files(ignore_patterns_list,
+                                    compacted,
+                                    ignore_file_path,
+                                    options.hierarchical,
+                                    oversized)
+            negated = [x for x, is_negation in compacted if is_negation]
+            if verify_ignored_paths(ignore_list + sorted(oversized),
+                                    negated):
+                return
+            logging.error('The compacted %s does not ignore the same paths. '
+                          'Keeping the full list instead.',
+                          GITIGNORE_FILENAME)
+
+    _write_git_ignore_files(ignore_patterns_list,
+                            entries,
+                            ignore_file_path,
+                            options.hierarchical,
+                            oversized)
+
+
+@timing_utility.phase('write')
+def _write_git_ignore_files(ignore_patterns_list: list,
+                            entries: list,
+                            ignore_file_path: str,
+                            hierarchical: bool,
+                            oversized: dict):
+    """
+    Write the generated entries to the ignore files of the chosen layout.
+
+    Args:
+        ignore_patterns_list (list): The patterns imported from config.
+        entries (list): The (path, negated) tuples to be written in order.
+        ignore_file_path (str): The path to the root git ignore.
+        hierarchical (bool): Flag determining if entries are written next to
+            the directories they affect rather than to the root git ignore.
+        oversized (dict): The files over the size limit mapped to their size,
+            always written to the root git ignore.
+
+    """
+    if not hierarchical:
+        _save_git_ignore_to_disk(
+            _build_git_ignore_contents(ignore_patterns_list,
+                                       entries,
+                                       oversized),
+            ignore_file_path)
+        return
+
+    directories = {}
+    for path, negated in entries:
+        parent, _, name = path.rpartition('/')
+        directories.setdefault(parent, []).append((name, negated))
+
+    _save_git_ignore_to_disk(
+        _build_git_ignore_contents(ignore_patterns_list,
+                                   directories.pop('', []),
+                                   oversized),
+        ignore_file_path)
+
+    # The entries are case folded, and only matched against, while the files
+    # are written to the directories as named on disk.
+    disk_directories = {'': ''}
+    for parent, local_entries in directories.items():
+        disk_parent = _find_directory_on_disk(parent, disk_directories)
+        if disk_parent is None:
+            logging.error("Could not find the directory '%s' to write its "
+                          "%s.",
+                          parent,
+                          GITIGNORE_FILENAME)
+            continue
+        _save_git_ignore_to_disk(
+            _build_git_ignore_contents(None, local_entries), disk_parent)
+
+
+def _find_directory_on_disk(path: str, disk_directories: dict):
+    """
+    Find the directory a case folded relative path names on disk.
+
+    Args:
+        path (str): The normalized, lowercase relative path of a directory.
+        disk_directories (dict): The directories found so far, keyed by their
+            case folded path, shared between calls so every parent is only
+            looked up once.
+
+    Returns:
+        str: The relative path of the directory as named on disk, None if
+            there is no such directory.
+
+    """
+    if path in disk_directories:
+        return disk_directories[path]
+
+    parent, _, name = path.rpartition('/')
+    disk_parent = _find_directory_on_disk(parent, disk_directories)
+    disk_path = None
+    if disk_parent is not None and \
+            os.path.isdir(os.path.join(disk_parent, name)):
+        disk_path = os.path.join(disk_parent, name)
+    elif disk_parent is not None:
+        try:
+            with os.scandir(disk_parent or '.') as entries:
+                for entry in entries:
+                    if entry.is_dir() and string_utility.normalize_string(
+                            entry.name, lower=True) == name:
+                        disk_path = os.path.join(disk_parent, entry.name)
+                        break
+        except OSError as ex:
+            logging.error("Could not scan the directory '%s': %s",
+                          disk_parent,
+                          ex)
+    disk_directories[path] = disk_path
+    return disk_path
+
+
+def _build_git_ignore_contents(ignore_patterns_list: list,
+                               entries: list,
+                               oversized: dict = None):
+    """
+    Build the lines of the generated git ignore.
+
+    Args:
+        ignore_patterns_list (list): The patterns imported from config. None
+            for nested ignore files, which only hold generated entries.
+        entries (list): The (path, negated) tuples to be written in order.
+        oversized (dict, optional): The files over the size limit mapped to
+            their size.
+
+    Returns:
+        list: The lines of the file.
+
+    """
+    file_contents = []
+    file_contents.append(GITIGNORE_BEGIN_TOKEN)
+    file_contents.append('\n')
+    if ignore_patterns_list is not None:
+        file_contents.append(
+            "# --- Ignored patterns imported from config.\n\n")
+        for item in ignore_patterns_list:
+            file_contents.append(item + '\n')
+        file_contents.append('\n')
+    file_contents.append("# --- Auto Generated to be ignored.\n\n")
+    for item, negated in entries:
+        if sys.platform == 'win32':
+            path = os.altsep + item + '\n'
+        else:
+            path = os.sep + item + '\n'
+        if negated:
+            path = '!' + path
+        file_contents.append(path)
+    if oversized:
+        # Written last so no negation above can bring them back.
+        file_contents.append("\n# --- Files over the size limit.\n\n")
+        file_contents.extend(_get_size_report(oversized))
+        file_contents.append('\n')
+        for item in sorted(oversized):
+            file_contents.append('/' + item + '\n')
+    file_contents.append('\n')
+    file_contents.append(GITIGNORE_END_TOKEN)
+
+    logging.debug("New gitignore contents:\n %s",
+                  file_contents)
+    return file_contents
+
+
+def _get_size_report(oversized: dict):
+    """
+    Summarize the oversized files per extension, largest total first.
+
+    Args:
+        oversized (dict): The files over the size limit mapped to their size.
+
+    Returns:
+        list: Comment lines holding the file count and total size of each
+            extension.
+
+    """
+    extensions = {}
+    for path, size in oversized.items():
+        extension = os.path.splitext(path)[1] or '(none)'
+        count, total = extensions.get(extension, (0, 0))
+        extensions[extension] = (count + 1, total + size)
+
+    return [f'# {extension}: {count} files, '
+            f'{string_utility.friendly_size_to_str(total)}\n'
+            for extension, (count, total) in sorted(
+                extensions.items(), key=lambda x: (-x[1][1], x[0]))]
+
+
+def _get_nested_ignore_files(ignore_list: list):
+    """
+    Get the nested ignore files the hierarchical layout writes.
+
+    Every nested ignore file ignores itself. git still reads it while keeping
+    the status identical to the single layout.
+
+    Args:
+        ignore_list (list): Relative paths to be ignored.
+
+    Returns:
+        set: The relative paths of the nested ignore files.
+
+    """
+    filename = string_utility.normalize_string(GITIGNORE_FILENAME, lower=True)
+    return {f'{path.rpartition("/")[0]}/{filename}'
+            for path in ignore_list if '/' in path}
+
+
+def _find_generated_ignore_files(ignore_list: list, scan_tree: bool):
+    """
+    Find the nested ignore files written by a previous generation.
+
+    Generated files are told apart from the user's own by holding a block
+    starting with GITIGNORE_BEGIN_TOKEN.
+
+    Args:
+        ignore_list (list): Relative paths to be ignored. Generated files in
+            the walked directories show up here.
+        scan_tree (bool): Flag determining if git should also list the ignore
+            files of the directories that were not walked.
+
+    Returns:
+        dict: The lowercase relative paths of the generated files mapped to
+            their path on disk.
+
+    """
+    filename = string_utility.normalize_string(GITIGNORE_FILENAME, lower=True)
+    candidates = [x for x in ignore_list
+                  if x.rpartition('/')[2] == filename]
+
+    if scan_tree:
+        command = ['git', 'ls-files', '-z', '--cached', '--others', '--',
+                   f':(glob)**/{GITIGNORE_FILENAME}']
+        successfull_command_call, \
+            command_results = external_process_utility.run_command(command)
+        if successfull_command_call:
+            candidates.extend(x for x in command_results.split('\0') if x)
+        else:
+            logging.error('Could not list the nested %s files: %s',
+                          GITIGNORE_FILENAME,
+                          command_results)
+
+    generated_files = {}
+    for path in candidates:
+        # The root ignore file is always rewritten in place.
+        if '/' not in path:
+            continue
+        contents = _read_git_ignore(path)
+        if contents is None or not _split_generated_block(contents)[1]:
+            continue
+        generated_files[string_utility.normalize_string(path,
+                                                        lower=True)] = path
+    return generated_files
+
+
+def _remove_stale_ignore_files(generated_files: dict, nested_files: set):
+    """
+    Remove the generated blocks that are not about to be rewritten.
+
+    Files left empty are removed while the user's own rules are kept.
+
+    Args:
+        generated_files (dict): The generated files found on disk.
+        nested_files (set): The relative paths of the files to be written.
+
+    """
+    for path, disk_path in generated_files.items():
+        if path in nested_files:
+            continue
+        logging.info("Removing the stale generated block of '%s'.",
+                     disk_path)
+        contents = _read_git_ignore(disk_path)
+        if contents is None:
+            continue
+        before, _, after = _split_generated_block(contents)
+        if (before + after).strip():
+            file_utility.write_file_atomically(disk_path, before + after)
+            continue
+        try:
+            os.remove(disk_path)
+        except OSError as ex:
+            logging.error("Could not remove '%s': %s", disk_path, ex)
+
+
+@timing_utility.phase('verify')
+def verify_ignored_paths(ignored: list,
+                         not_ignored: list,
+                         root_directory: str = '.'):
+    """
+    Check the ignore files on disk against the expected results.
+
+    Every path is checked in a single batched git check-ignore call.
+
+    Args:
+        ignored (list): Relative paths git is expected to ignore.
+        not_ignored (list): Relative paths git is expected to not ignore.
+        root_directory (str, optional): The root of the working tree.
+
+    Returns:
+        bool: True if git ignores exactly the expected paths.
+
+    """
+    command = ['git', '-C', root_directory, 'check-ignore', '--no-index',
+               '--stdin', '-z']
+    paths = ignored + not_ignored
+
+    successfull_command_call, \
+        command_results = external_process_utility.run_command(
+            command, ''.join(x + '\0' for x in paths))
+    if not successfull_command_call:
+        # check-ignore exits with 1 when none of the paths are ignored.
+        if getattr(command_results, 'returncode', None) != 1:
+            logging.error('Could not check the ignored paths: %s',
+                          command_results)
+            return False
+        command_results = ''
+
+    reported = {x for x in command_results.split('\0') if x}
+    mismatches = reported.symmetric_difference(ignored)
+    if mismatches:
+        logging.debug('Paths not ignored as expected: %s',
+                      string_utility.LazyString(
+                          lambda: string_utility.friendly_list_to_str(
+                              sorted(mismatches))))
+    return not mismatches
+
+
+def explain_git_ignore(path: str, to_track: list, to_ignore: list):
+    """
+    Explain whether generating the git ignore would ignore a path and why.
+
+    Args:
+        path (str): The path to explain, relative to the root.
+        to_track (list): The list of files and folders to be tracked.
+        to_ignore (list): The list patterns to be ignored by git.
+
+    Returns:
+        str: A sentence explaining the decision.
+
+    """
+    wishlist_trie = file_utility.generate_wishlist_trie(
+        string_utility.normalize_strings(to_track))
+    ignore_matcher = pattern_utility.IgnoreMatcher(
+        string_utility.normalize_strings(to_ignore))
+    return explain_utility.why(path, wishlist_trie, ignore_matcher)
+
+
+@timing_utility.phase('discovery')
+def _get_ignored_with_git(wishlist_trie: file_utility.Node,
+                          ignore_matcher: pattern_utility.IgnoreMatcher,
+                          walk_options: file_utility.WalkOptions):
+    """
+    Get the list of objects to ignore from the candidates git lists.
+
+    Args:
+        wishlist_trie (file_utility.Node): The root of the wishlist trie.
+        ignore_matcher (pattern_utility.IgnoreMatcher): The compiled ignore
+            patterns.
+        walk_options (file_utility.WalkOptions): The workers walking the
+            collapsed untracked directories the wishlist needs to look into
+            and the size limit, collecting the oversized files.
+
+    Returns:
+        list: Sorted paths to be ignored. None if git could not list the
+            candidates.
+
+    """
+    candidates = get_discovery_candidates()
+    if candidates is None:
+        logging.error('Could not list the candidates through git. '
+                      'Falling back to walking the tree.')
+        return None
+
+    return file_utility.get_ignored_from_candidates(".",
+                                                    candidates,
+                                                    wishlist_trie,
+                                                    ignore_matcher,
+                                                    walk_options)
+
+
+def get_discovery_candidates(root_directory: str = '.'):
+    """
+    List the entries of the working tree through git.
+
+    Tracked files are listed one by one while untracked directories are
+    collapsed into a single entry ending in a slash. Existing ignore files
+    are not applied so the previously generated entries are listed as well.
+
+    Args:
+        root_directory (str, optional): The root of the working tree.
+
+    Returns:
+        list: The relative paths of the entries. None if the git command
+            failed.
+
+    """
+    command = ['git', '-C', root_directory, 'ls-files', '-z', '--cached',
+               '--others', '--directory']
+
+    successfull_command_call, \
+        command_results = external_process_utility.run_command(command)
+    if not successfull_command_call:
+        return None
+
+    candidates = [x for x in command_results.split('\0') if x]
+
+    # git never lists its own directory, which the walker does find.
+    if os.path.isdir(os.path.join(root_directory, '.git')):
+        candidates.append('.git/')
+
+    return candidates
+
+
+def _get_ignore_config_hash(wish_list: list,
+                            ignore_patterns_list: list,
+                            size_limit: int = None):
+    """
+    Hash the configuration the walker decisions depend on.
+
+    Args:
+        wish_list (list): The normalized list of files and folders to track.
+        ignore_patterns_list (list): The normalized patterns to be ignored.
+        size_limit (int, optional): Size in bytes above which kept files are
+            ignored.
+
+    Returns:
+        str: A hex digest changing whenever any of the inputs change.
+
+    """
+    contents = json.dumps([WALK_CACHE_VERSION,
+                           wish_list,
+                           ignore_patterns_list,
+                           size_limit])
+    return hashlib.sha256(contents.encode('utf-8')).hexdigest()
+
+
+def _save_git_ignore_to_disk(contents: list, filepath: str):
+    """
+    Save the generated block of the .gitignore file to disk.
+
+    Anything outside the GITIGNORE_BEGIN_TOKEN and GITIGNORE_END_TOKEN lines
+    is kept as is. The file is left untouched when its contents would not
+    change so git's untracked cache stays valid.
+
+    Args:
+        contents (list): Lines of the generated block to be written.
+        filepath (str): The directory to write the .gitignore file to.
+
+    """
+    output_path = '.'
+    if os.path.isdir(filepath):
+        output_path = os.path.join(filepath, GITIGNORE_FILENAME)
+    else:
+        output_path = GITIGNORE_FILENAME
+
+    previous_contents = _read_git_ignore(output_path)
+    new_contents = ''.join(contents)
+    if previous_contents is not None:
+        before, _, after = _split_generated_block(previous_contents)
+        new_contents = before + new_contents + after
+        if _hash_contents(previous_contents) == _hash_contents(new_contents):
+            logging.debug('\"%s\" is already up to date.', output_path)
+            return
+
+    logging.info('Saving ignore list to disk at \"%s\".', output_path)
+    logging.debug('Contents of ignore file: \n%s', new_contents)
+    file_utility.write_file_atomically(output_path, new_contents)
+
+
+def _read_git_ignore(path: str):
+    try:
+        with open(path, 'r') as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def _hash_contents(contents: str):
+    return hashlib.sha256(contents.encode('utf-8')).hexdigest()
+
+
+def _split_generated_block(contents: str):
+    """
+    Split the contents of an ignore file around its generated block.
+
+    Args:
+        contents (str): The contents of the ignore file.
+
+    Returns:
+        str: The contents preceding the generated block.
+        str: The generated block. Empty if there is none.
+        str: The contents following the generated block.
+
+    """
+    lines = contents.splitlines(keepends=True)
+    # Files written before the last line had a newline may lack one.
+    if lines and not lines[-1].endswith('\n'):
+        lines[-1] += '\n'
+
+    try:
+        begin = lines.index(GITIGNORE_BEGIN_TOKEN)
+    except ValueError:
+        return ''.join(lines), '', ''
+    try:
+        end = lines.index(GITIGNORE_END_TOKEN, begin) + 1
+    except ValueError:
+        end = len(lines)
+
+    return (''.join(lines[:begin]),
+            ''.join(lines[begin:end]),
+            ''.join(lines[end:]))
+# ============================================================================
@@ -9,6 +9,46 @@ import os
 import sys
 
 
+def is_level_emitted(level: int, logger: logging.Logger = None):
+    """
+    Check whether any handler emits the records of a level.
+
+    Hot loops check it once before looping, and skip their per item records
+    altogether when nothing would emit them. Runs of gitter_done.py always
+    log to a file at DEBUG, so this only skips work when the module is used
+    without that file, e.g. from the tests and benchmarks.
+
+    Args:
+        level (int): The level of the records, e.g. logging.DEBUG.
+        logger (logging.Logger, optional): The logger the records go to.
+            Defaults to the root logger.
+
+    Returns:
+        bool: True if a handler of the logger or of its ancestors emits the
+            records of the level.
+
+    """
+    if logger is None:
+        logger = logging.getLogger()
+    if not logger.isEnabledFor(level):
+        return False
+
+    found_handlers = False
+    current = logger
+    while current is not None:
+        for handler in current.handlers:
+            found_handlers = True
+            if level >= handler.level:
+                return True
+        if not current.propagate:
+            break
+        current = current.parent
+
+    # Loggers without handlers fall back to logging.lastResort.
+    return not found_handlers and logging.lastResort is not None and \
+        level >= logging.lastResort.level
+
+
 def get_logger_output_path(logger_output_dir: str,
                            use_temp_dir: bool = True):
     """
@@ -59,6 +99,9 @@ def set_log_level(desired_log_level: str, log_to_file: bool,
         log_output_path (str): Where to output the log file to.
         log_output_filename (str): What output log filename to use.
 
+    Returns:
+        str: The path to the log file, None if not logging to a file.
+
     """
     # First lets handle setting up the Log Level correctly.
     log_level = logging.INFO
@@ -107,3 +150,6 @@ def set_log_level(desired_log_level: str, log_to_file: bool,
                 datefmt='%Y-%m-%d %H:%M:%S')
         file_logger.setFormatter(file_formatter)
         root_logger.addHandler(file_logger)
+        return file_logger_absolute_path
+
+    return None
@@ -17,12 +17,15 @@ Attributes:
 import logging
 import os
 
+from . import async_process_utility
 from . import config
 from . import console_utility
 from . import external_process_utility
 from . import git_utility
 from . import project_utility
 from . import string_utility
+from . import timing_utility
+from . import trace_utility
 # ============================================================================
 # Global Variables.
 
@@ -111,6 +114,7 @@ def _parse_delete_message(msg: str):
     return 'unknown'
 
 
+@timing_utility.phase('revert unchanged')
 def _revert_unchanged_files_in_p4():
     """
     Trigger a revert of all unchanged files on our changelists.
@@ -119,10 +123,9 @@ def _revert_unchanged_files_in_p4():
         None.
 
     """
-    command = project_utility.get_p4_tool_path() + ' revert -a'
+    command = [project_utility.get_p4_tool_path(), 'revert', '-a']
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(command)
     if not successfull_command_call:
         error_msg = (f'Encountered an error when'
                      f' reverting unchanged files: {command_results}')
@@ -137,16 +140,44 @@ def _revert_config_file_changes():
         None.
 
     """
-    command = 'git checkout -- bin/GitterDone/Config.py'
+    command = ['git', 'checkout', '--', 'bin/GitterDone/Config.py']
     successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
+        command_results = external_process_utility.run_command(command)
     if not successfull_command_call:
         error_msg = (f'Encountered an error reverting Config.py changes.'
                      f' Response: {command_results}')
         logging.error(error_msg)
 
 
+def _run_p4_file_commands(p4_command: str, file_list: list):
+    """
+    Run a p4 command once for every file of a list, concurrently.
+
+    Args:
+        p4_command (str): The p4 command to run, e.g. 'edit'.
+        file_list (list): The files to run the command on.
+
+    Returns:
+        list: The (file, success, results) of every non empty file path, in
+            order.
+
+    """
+    files = []
+    for file in file_list:
+        if file:
+            files.append(file)
+        else:
+            logging.error(('Attempted to trigger an empty p4 %s command.'
+                           ' Please troubleshoot file list.'), p4_command)
+
+    p4_tool_path = project_utility.get_p4_tool_path()
+    results = async_process_utility.run_commands(
+        [[p4_tool_path, p4_command, x] for x in files])
+    trace_utility.add_count('p4 files', p4_command, len(files))
+    return [(file, *result) for file, result in zip(files, results)]
+
+
+@timing_utility.phase('open files')
 def _checkout_files_in_p4(file_list: list):
     """
     Walk through a list of files and checks them out in p4.
@@ -159,15 +190,18 @@ def _checkout_files_in_p4(file_list: list):
               and must passed to the Add command.
 
     """
-    pretty_checkout_list = string_utility.friendly_list_to_str(file_list)
-    logging.info('Checking out the following files: %s', pretty_checkout_list)
+    logging.info('Checking out the following files: %s',
+                 string_utility.lazy_friendly_list_to_str(file_list))
     files_to_add = []
-    for file in file_list:
-        if file not in IGNORED_P4_FILE_LIST:
-            successful_checkout, file_to_add = _checkout_file_in_p4(file)
-            if successful_checkout:
-                if file_to_add and (file_to_add not in files_to_add):
-                    files_to_add.append(file_to_add)
+    for file, successfull_command_call, command_results in \
+            _run_p4_file_commands(
+                'edit',
+                [x for x in file_list if x not in IGNORED_P4_FILE_LIST]):
+        successful_checkout, file_to_add = _handle_checkout_results(
+            file, successfull_command_call, command_results)
+        if successful_checkout:
+            if file_to_add and (file_to_add not in files_to_add):
+                files_to_add.append(file_to_add)
 
     if files_to_add:
         return files_to_add
@@ -175,12 +209,17 @@ def _checkout_files_in_p4(file_list: list):
     return None
 
 
-def _checkout_file_in_p4(file_path: str):
+def _handle_checkout_results(file_path: str,
+                             successfull_command_call: bool,
+                             command_results):
     """
-    Trigger an P4 Checkout for an individual file.
+    Handle the results of a P4 Checkout of an individual file.
 
     Args:
-        file_path (str): The path of the file to be checked out.
+        file_path (str): The path of the file checked out.
+        successfull_command_call (bool): Whether the p4 edit command ran.
+        command_results (str): The output of the p4 edit command, or the
+            error it failed with.
 
     Returns:
         bool: Flag determining whether if the file was checked out or slotted
@@ -189,21 +228,6 @@ def _checkout_file_in_p4(file_path: str):
             exist on P4 and must be added.
 
     """
-    if not file_path:
-        logging.error(
-            ('Attempted to trigger an empty p4 edit command.'
-             ' Please troubleshoot file list.'))
-        return False, None
-
-    command = (project_utility.get_p4_tool_path() +
-               ' edit \"' +
-               file_path +
-               '\"')
-
-    successfull_command_call, \
-        command_results = external_process_utility.trigger_external_subprocess(
-            command)
-
     if not successfull_command_call:
         logging.error('An error occurred: %s', command_results.output)
         return False, None
@@ -216,13 +240,14 @@ def _checkout_file_in_p4(file_path: str):
         return True, file_path
 
     if result == 'unknown':
-        logging.error(('An unknown error occurred when'
-                       ' attempting to check out %s', file_path))
+        logging.error('An unknown error occurred when'
+                      ' attempting to check out %s', file_path)
         return False, None
 
     return True, None
 
 
+@timing_utility.phase('open files')
 def _add_files_to_p4(file_list: list):
     """
     Walk through a list of files and adds them out in P4.
@@ -231,53 +256,45 @@ def _add_files_to_p4(file_list: list):
         file_list (list): The list of files to be added to P4.
 
     """
-    pretty_add_list = string_utility.friendly_list_to_str(file_list)
-    logging.info(('Found files that were not on P4.'
-                  ' Adding the following files: %s', pretty_add_list))
+    logging.info('Found files that were not on P4.'
+                 ' Adding the following files: %s',
+                 string_utility.lazy_friendly_list_to_str(file_list))
 
-    for file in file_list:
-        _add_file_to_p4(file)
+    for file, successfull_command_call, command_results in \
+            _run_p4_file_commands('add', file_list):
+        _handle_add_results(file, successfull_command_call, command_results)
 
 
-def _add_file_to_p4(file_path: str):
+def _handle_add_results(file_path: str,
+                        successfull_command_call: bool,
+                        command_results):
     """
-    Trigger an P4 add command for an individual file.
+    Handle the results of a P4 add command for an individual file.
 
     Args:
-        file_path (str): The path of the file to be added.
+        file_path (str): The path of the file added.
+        successfull_command_call (bool): Whether the p4 add command ran.
+        command_results (str): The output of the p4 add command, or the
+            error it failed with.
 
     Returns:
         None.
 
     """
-    if not file_path:
-        logging.error(('Attempted to trigger an empty p4'
-                       ' add command. Please troubleshoot file list.'))
-
-    else:
-        command = (project_utility.get_p4_tool_path() +
-                   ' add \"' +
-                   file_path +
-                   '\"')
-
-        successfull_command_call, \
-            command_results = (external_process_utility.
-                               trigger_external_subprocess(
-                                command))
-
-        if not successfull_command_call:
-            logging.error('An error occurred: %s', command_results.output)
-            return
+    if not successfull_command_call:
+        logging.error('An error occurred: %s', command_results.output)
+        return
 
-        first_line = (command_results.splitlines())[0]
+    first_line = (command_results.splitlines())[0]
 
-        result = _parse_add_message(first_line)
+    result = _parse_add_message(first_line)
 
-        if result == 'unknown':
-            logging.error(('An unknown error occurred when'
-                           ' attempting to add  %s', file_path))
+    if result == 'unknown':
+        logging.error('An unknown error occurred when'
+                      ' attempting to add  %s', file_path)
 
 
+@timing_utility.phase('open files')
 def _delete_files_from_p4(file_list: str):
     """
     Walk through a list of files and check'em out and deletes them from P4.
@@ -286,50 +303,42 @@ def _delete_files_from_p4(file_list: str):
         file_list (str): The list of files to be deleted from P4.
 
     """
-    pretty_file_list = string_utility.friendly_list_to_str(file_list)
-    logging.info('Deleting the following files from P4: %s', pretty_file_list)
+    logging.info('Deleting the following files from P4: %s',
+                 string_utility.lazy_friendly_list_to_str(file_list))
 
-    for file in file_list:
-        _delete_file_from_p4(file)
+    for file, successfull_command_call, command_results in \
+            _run_p4_file_commands('delete', file_list):
+        _handle_delete_results(file, successfull_command_call,
+                               command_results)
 
 
-def _delete_file_from_p4(file_path: str):
+def _handle_delete_results(file_path: str,
+                           successfull_command_call: bool,
+                           command_results):
     """
-    Trigger an P4 delete command for an individual file.
+    Handle the results of a P4 delete command for an individual file.
 
     Args:
-        file_path (str): The path of the file to be deleted.
+        file_path (str): The path of the file deleted.
+        successfull_command_call (bool): Whether the p4 delete command ran.
+        command_results (str): The output of the p4 delete command, or the
+            error it failed with.
 
     Returns:
         None.
 
     """
-    if not file_path:
-        logging.error(('Attempted to trigger an empty p4 delete'
-                       ' command. Please troubleshoot file list.'))
-
-    else:
-        command = (project_utility.get_p4_tool_path() +
-                   ' delete \"' +
-                   file_path +
-                   '\"')
-
-        successfull_command_call, \
-            command_results = (external_process_utility.
-                               trigger_external_subprocess(
-                                   command))
-
-        if not successfull_command_call:
-            logging.error('An error occurred: %s', command_results.output)
-            return
+    if not successfull_command_call:
+        logging.error('An error occurred: %s', command_results.output)
+        return
 
-        first_line = (command_results.splitlines())[0]
+    first_line = (command_results.splitlines())[0]
 
-        result = _parse_delete_message(first_line)
+    result = _parse_delete_message(first_line)
 
-        if result == 'unknown':
-            logging.error(('An unknown error occurred when attempting'
-                           ' to delete %s', file_path))
+    if result == 'unknown':
+        logging.error('An unknown error occurred when attempting'
+                      ' to delete %s', file_path)
 
 
 def execute_p4_offline_sync(
@@ -420,18 +429,18 @@ def _execute_p4_offline_sync(  # pylint:disable=R0912
             desired_branch,
             available_git_branches):
         branches = string_utility.friendly_list_to_str(available_git_branches)
-        logging.fatal(('Input branch \'%s\' does not match any of'
-                       ' the desired names: %s',
-                       desired_branch,
-                       branches))
+        logging.fatal('Input branch \'%s\' does not match any of'
+                      ' the desired names: %s',
+                      desired_branch,
+                      branches)
         return
 
     if not git_utility.verify_branch_exists_in_git(
             TRUNK_BRANCH_NAME,
             available_git_branches):
         branches = string_utility.friendly_list_to_str(available_git_branches)
-        logging.fatal(('Sync branch in Config.py: \'%s\' does not exist'
-                       ' in the repository: %s', TRUNK_BRANCH_NAME, branches))
+        logging.fatal('Sync branch in Config.py: \'%s\' does not exist'
+                      ' in the repository: %s', TRUNK_BRANCH_NAME, branches)
         return
 
     files_to_add_or_edit, files_to_delete = (
@@ -474,8 +483,10 @@ def _execute_forced_sync_in_p4_to_cl(change_list_number: str,
     p4_tool_path = project_utility.get_p4_tool_path()
 
     logging.debug('Forcefully syncing: %s',
-                  string_utility.friendly_list_to_str(files_to_sync))
+                  string_utility.lazy_friendly_list_to_str(files_to_sync))
 
+    # The entries are independent, so their syncs run concurrently.
+    absolute_paths = []
     for entry in files_to_sync:
 
         path = string_utility.normalize_string(os.path.join(
@@ -483,40 +494,39 @@ def _execute_forced_sync_in_p4_to_cl(change_list_number: str,
                         entry),
                                             remove_wildcards=True)
 
-        if os.path.exists(path):
-            if os.path.isdir(path):
-                if path.endswith('/'):
-                    absolute_path = path + '...'
-                else:
-                    absolute_path = path + '/...'
-            elif os.path.isfile(path):
-                absolute_path = path
-
-            # check if the absolute path exist!
-            logging.info('Executing a forced sync of %s', absolute_path)
-
-            command = p4_tool_path + ' sync -f '\
-                + string_utility.normalize_string(
-                    absolute_path + '@' + change_list_number)
-
-            successfull_command_call, \
-                command_results = (external_process_utility.
-                                   trigger_external_subprocess(
-                                       command))
-
-            if successfull_command_call:
-                logging.info('%s Forced sync completed.', absolute_path)
-            else:
-                logging.error('%s Forced sync unsuccessful. Response:\n %s',
-                              absolute_path,
-                              command_results)
-                return False
-        else:
-            error_msg = (f'File \"{absolute_path}\" no longer exists.'
+        if not os.path.exists(path):
+            error_msg = (f'File \"{path}\" no longer exists.'
                          f' Ignoring sync')
             logging.error(error_msg)
-            return True
-    return True
+            continue
+
+        absolute_path = path
+        if os.path.isdir(path):
+            if path.endswith('/'):
+                absolute_path = path + '...'
+            else:
+                absolute_path = path + '/...'
+
+        logging.info('Executing a forced sync of %s', absolute_path)
+        absolute_paths.append(absolute_path)
+
+    results = async_process_utility.run_commands(
+        [[p4_tool_path, 'sync', '-f',
+          string_utility.normalize_string(x + '@' + change_list_number)]
+         for x in absolute_paths])
+    trace_utility.add_count('p4 files', 'forced sync', len(absolute_paths))
+
+    all_synced = True
+    for absolute_path, (successfull_command_call, command_results) in \
+            zip(absolute_paths, results):
+        if successfull_command_call:
+            logging.info('%s Forced sync completed.', absolute_path)
+        else:
+            logging.error('%s Forced sync unsuccessful. Response:\n %s',
+                          absolute_path,
+                          command_results)
+            all_synced = False
+    return all_synced
 
 
 def _execute_p4_smart_sync_to_cl(change_list_number: str, file_path: str):
@@ -535,26 +545,25 @@ def _execute_p4_smart_sync_to_cl(change_list_number: str, file_path: str):
                  file_path,
                  change_list_number)
 
+    absolute_path = file_path
     if os.path.isdir(file_path):
         if file_path.endswith('/'):
             absolute_path = file_path + '...'
         else:
             absolute_path = file_path + '/...'
 
-    if not os.path.exists(absolute_path):
+    if not os.path.exists(file_path):
         error_msg = f'File \"{absolute_path}\" no longer exists. Ignoring sync'
         logging.error(error_msg)
         return True
 
-    command = project_utility.get_p4vfs_tool_path() + " sync -f " + \
-        string_utility.normalize_string(absolute_path +
-                                        "@" +
-                                        change_list_number)
+    command = [project_utility.get_p4vfs_tool_path(), 'sync', '-f',
+               string_utility.normalize_string(absolute_path +
+                                               "@" +
+                                               change_list_number)]
 
     successfull_command_call, \
-        command_results = (external_process_utility.
-                           trigger_external_subprocess(
-                               command))
+        command_results = external_process_utility.run_command(command)
 
     if successfull_command_call:
         logging.info('%s Sync completed successfully.', absolute_path)
@@ -567,6 +576,7 @@ def _execute_p4_smart_sync_to_cl(change_list_number: str, file_path: str):
     return True
 
 
+@timing_utility.phase('p4 sync')
 def _sync_p4_to_changelist(desired_cl: str, force_all: bool = False):
     """
     Trigger all the sync steps to sync P4 to a changelist.
@@ -0,0 +1,351 @@
+"""A module compiling git ignore patterns into a fast entry matcher.
+
+Patterns are sorted into buckets so that matching an entry costs a handful of
+hash lookups instead of a regex search per pattern:
+    - "*.ext" patterns go into an extension hash set.
+    - Patterns without wildcards or slashes go into an exact basename set.
+    - Patterns holding a slash are anchored to the root and go into a trie
+        keyed by their literal leading directories.
+    - Anything else is folded into a single alternation regex.
+
+Matching is case insensitive and follows the git ignore conventions: a
+trailing slash only matches directories.
+
+Attributes:
+    BUCKET_EXTENSION (str): Name of the extension hash set bucket.
+    BUCKET_BASENAME (str): Name of the exact basename set bucket.
+    BUCKET_ANCHORED (str): Name of the anchored pattern trie bucket.
+    BUCKET_GLOB (str): Name of the alternation regex bucket.
+
+"""
+import re
+import threading
+import time
+
+from . import string_utility
+
+_GLOB_CHARACTERS = frozenset('*?[')
+BUCKET_EXTENSION = 'extension'
+BUCKET_BASENAME = 'basename'
+BUCKET_ANCHORED = 'anchored'
+BUCKET_GLOB = 'glob'
+
+
+# ============================================================================
+class _PrefixNode:  # pylint:disable=R0903
+    """
+    Node of the directory prefix trie used for anchored patterns.
+
+    Attributes:
+        children (dict): Literal path components mapped to child nodes.
+        rule (str): The pattern matching exactly the path ending here.
+        patterns (list): (compiled regex, rule) pairs matched against the
+            remainder of the path below this node.
+
+    """
+
+    __slots__ = ('children', 'rule', 'patterns')
+
+    def __init__(self):
+        """Object constructor."""
+        self.children = {}
+        self.rule = None
+        self.patterns = []
+
+
+class _PatternBuckets:
+    """
+    The compiled buckets for one set of patterns.
+
+    Attributes:
+        extensions (dict): Lowercase extensions mapped to their rule.
+        basenames (dict): Lowercase basenames mapped to their rule.
+        prefix_trie (_PrefixNode): The root of the anchored pattern trie.
+        fallback (re.Pattern): The combined regex for the remaining rules.
+        fallback_rules (dict): Regex group names mapped to their rule.
+
+    """
+
+    def __init__(self):
+        """Object constructor."""
+        self.extensions = {}
+        self.basenames = {}
+        self.prefix_trie = _PrefixNode()
+        self.fallback = None
+        self.fallback_rules = {}
+        self._fallback_sources = []
+
+    def add(self, pattern: str, rule: str):
+        """
+        Sort a single pattern into the bucket that can match it the fastest.
+
+        Args:
+            pattern (str): The normalized, lowercase pattern without any
+                trailing slash.
+            rule (str): The original entry reported back on a match.
+
+        Returns:
+            str: The name of the bucket the pattern went into.
+
+        """
+        if '/' in pattern:
+            self._add_anchored(pattern, rule)
+            return BUCKET_ANCHORED
+        if not _has_glob(pattern):
+            self.basenames.setdefault(pattern, rule)
+            return BUCKET_BASENAME
+        if pattern.startswith('*.') and not _has_glob(pattern[2:]):
+            self.extensions.setdefault(pattern[2:], rule)
+            return BUCKET_EXTENSION
+
+        group_name = f'r{len(self._fallback_sources)}'
+        self.fallback_rules[group_name] = rule
+        self._fallback_sources.append(
+            f'(?P<{group_name}>{_translate_glob(pattern)})')
+        return BUCKET_GLOB
+
+    def _add_anchored(self, pattern: str, rule: str):
+        components = pattern.lstrip('/').split('/')
+        node = self.prefix_trie
+        while components and not _has_glob(components[0]):
+            node = node.children.setdefault(components.pop(0), _PrefixNode())
+
+        if not components:
+            if node.rule is None:
+                node.rule = rule
+            return
+
+        regex = re.compile(_translate_glob('/'.join(components)) + r'\Z',
+                           re.I)
+        node.patterns.append((regex, rule))
+
+    def compile(self):
+        """Combine the fallback rules into a single alternation regex."""
+        if self._fallback_sources:
+            self.fallback = re.compile(
+                '(?:' + '|'.join(self._fallback_sources) + r')\Z', re.I)
+
+    def match(self, path: str, name: str):
+        """
+        Find the first rule matching an entry.
+
+        Args:
+            path (str): The lowercase path of the entry relative to the root.
+            name (str): The lowercase basename of the entry.
+
+        Returns:
+            str: The matching rule. None if nothing matched.
+
+        """
+        rule = self.basenames.get(name)
+        if rule is not None:
+            return rule
+
+        if self.extensions:
+            dot = name.find('.')
+            while dot != -1:
+                rule = self.extensions.get(name[dot + 1:])
+                if rule is not None:
+                    return rule
+                dot = name.find('.', dot + 1)
+
+        rule = self._match_anchored(path)
+        if rule is not None:
+            return rule
+
+        if self.fallback is not None:
+            match = self.fallback.match(name)
+            if match:
+                return self.fallback_rules[match.lastgroup]
+
+        return None
+
+    def _match_anchored(self, path: str):
+        node = self.prefix_trie
+        components = path.split('/')
+        for depth, component in enumerate(components):
+            if node.patterns:
+                remainder = '/'.join(components[depth:])
+                for regex, rule in node.patterns:
+                    if regex.match(remainder):
+                        return rule
+            node = node.children.get(component)
+            if node is None:
+                return None
+        return node.rule
+# ============================================================================
+
+
+# ============================================================================
+class IgnoreMatcher:
+    """
+    Compiled matcher answering which ignore rule applies to an entry.
+
+    Attributes:
+        rules (list): The normalized rules the matcher was built from.
+        buckets (dict): Each rule mapped to the name of the bucket matching
+            it.
+
+    """
+
+    def __init__(self, patterns: list):
+        """
+        Object constructor.
+
+        Args:
+            patterns (list): The git ignore patterns to compile.
+
+        """
+        self.rules = []
+        self.buckets = {}
+        self._any_entry = _PatternBuckets()
+        self._directories_only = _PatternBuckets()
+
+        for rule in string_utility.normalize_strings(patterns):
+            if not rule or rule.startswith('#'):
+                continue
+            self.rules.append(rule)
+            pattern = rule.lower()
+            if pattern.endswith('/'):
+                bucket = self._directories_only.add(pattern.rstrip('/'), rule)
+            else:
+                bucket = self._any_entry.add(pattern, rule)
+            self.buckets.setdefault(rule, bucket)
+
+        self._any_entry.compile()
+        self._directories_only.compile()
+
+    def match(self, path: str, is_dir: bool = False):
+        """
+        Find the ignore rule matching an entry, if any.
+
+        Args:
+            path (str): The path of the entry relative to the root of the
+                repository. A leading './' is tolerated.
+            is_dir (bool, optional): Whether the entry is a directory.
+
+        Returns:
+            str: The rule that matched. None if the entry is not ignored.
+
+        """
+        path = string_utility.normalize_string(path, lower=True)
+        if path.startswith('./'):
+            path = path[2:]
+        path = path.strip('/')
+        name = path.rsplit('/', 1)[-1]
+
+        rule = self._any_entry.match(path, name)
+        if rule is None and is_dir:
+            rule = self._directories_only.match(path, name)
+        return rule
+
+
+class ProfilingMatcher:
+    """
+    Matcher wrapper counting the hits and the time spent on each rule.
+
+    A combined regex matches all of its rules in a single call, so the time
+    of every call is charged to the rule that matched, or to None when
+    nothing did. Safe to share between the walker threads.
+
+    Attributes:
+        rules (list): The rules of the wrapped matcher.
+        buckets (dict): The buckets of the wrapped matcher.
+        hits (dict): Each rule mapped to the number of entries it matched.
+        seconds (dict): Each rule, or None, mapped to the time spent on the
+            calls it answered.
+
+    """
+
+    def __init__(self, matcher: IgnoreMatcher):
+        """
+        Object constructor.
+
+        Args:
+            matcher (IgnoreMatcher): The matcher to profile.
+
+        """
+        self.rules = matcher.rules
+        self.buckets = matcher.buckets
+        self.hits = {}
+        self.seconds = {}
+        self._matcher = matcher
+        self._lock = threading.Lock()
+
+    def match(self, path: str, is_dir: bool = False):
+        """
+        Find the ignore rule matching an entry, recording the call.
+
+        Args:
+            path (str): The path of the entry relative to the root.
+            is_dir (bool, optional): Whether the entry is a directory.
+
+        Returns:
+            str: The rule that matched. None if the entry is not ignored.
+
+        """
+        start = time.perf_counter()
+        rule = self._matcher.match(path, is_dir)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.seconds[rule] = self.seconds.get(rule, 0.0) + elapsed
+            if rule is not None:
+                self.hits[rule] = self.hits.get(rule, 0) + 1
+        return rule
+# ============================================================================
+
+
+def _has_glob(pattern: str):
+    """
+    Check if a pattern holds any git ignore wildcard.
+
+    Args:
+        pattern (str): The pattern to check.
+
+    Returns:
+        bool: True if the pattern can't be compared literally.
+
+    """
+    return not _GLOB_CHARACTERS.isdisjoint(pattern)
+
+
+def _translate_glob(pattern: str):
+    """
+    Translate a git ignore glob into a regex string.
+
+    Args:
+        pattern (str): The glob to translate. '*' and '?' never cross a
+            directory boundary while '**' does.
+
+    Returns:
+        str: A regex compliant string.
+
+    """
+    result = []
+    i = 0
+    while i < len(pattern):
+        character = pattern[i]
+        i += 1
+        if character == '*':
+            if pattern.startswith('*', i):
+                i += 1
+                if pattern.startswith('/', i):
+                    i += 1
+                    result.append('(?:.*/)?')
+                else:
+                    result.append('.*')
+            else:
+                result.append('[^/]*')
+        elif character == '?':
+            result.append('[^/]')
+        elif character == '[' and pattern.find(']', i + 1) != -1:
+            end = pattern.find(']', i + 1)
+            body = pattern[i:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            result.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        else:
+            result.append(re.escape(character))
+    return ''.join(result)
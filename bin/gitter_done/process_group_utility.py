@@ -0,0 +1,121 @@
+"""Stop external commands along with every process they started.
+
+Commands of unattended runs are started in a process group of their own, so
+stopping the group also stops what the command started, e.g. the ssh of a
+git fetch. A command is first asked to exit, and given a grace period to
+clean up, e.g. release a git index.lock, before whatever is left of its
+group is killed.
+
+Attributes:
+    KILL_GRACE_SECONDS (float): How long a command asked to exit is given
+        before it is killed.
+
+"""
+import os
+import signal
+import subprocess
+import sys
+
+# ============================================================================
+# Global Variables.
+KILL_GRACE_SECONDS = 5.0
+# ============================================================================
+
+
+def get_process_group_options():
+    """
+    Get the options starting a command in its own process group.
+
+    Stopping the group on a timeout then also stops whatever the command
+    started, e.g. the ssh of a git fetch. Commands of interactive runs stay
+    in the terminal's group, so their prompts, e.g. for git credentials, and
+    Ctrl+C keep working.
+
+    Returns:
+        dict: The keyword arguments to start the process with.
+
+    """
+    if sys.stdin is not None and sys.stdin.isatty():
+        return {}
+    if sys.platform == 'win32':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def terminate_process_group(process):
+    """
+    Ask a command to exit, along with the processes it started.
+
+    Its process group is sent SIGTERM, or CTRL_BREAK_EVENT on Windows, so
+    the command can clean up, e.g. release a git index.lock. A command
+    without a group of its own is terminated alone, except on Windows, where
+    its process tree is only found through it, and it is left to
+    kill_process_group.
+
+    Args:
+        process (subprocess.Popen or asyncio.subprocess.Process): The
+            process of the command.
+
+    """
+    try:
+        if not get_process_group_options():
+            if sys.platform != 'win32':
+                process.terminate()
+        elif sys.platform == 'win32':
+            process.send_signal(
+                signal.CTRL_BREAK_EVENT)  # pylint: disable=no-member
+        else:
+            os.killpg(process.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        # The command exited already.
+        pass
+
+
+def kill_process_group(process):
+    """
+    Kill a command along with the processes it started.
+
+    The process group of the command is sent SIGKILL, even once the command
+    exited, so the processes it started are killed too. On Windows its
+    process tree is killed with taskkill while the command still runs.
+
+    Args:
+        process (subprocess.Popen or asyncio.subprocess.Process): The
+            process of the command.
+
+    """
+    if sys.platform == 'win32':
+        if process.returncode is None:
+            subprocess.run(['taskkill', '/T', '/F', '/PID', str(process.pid)],
+                           stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL,
+                           check=False)
+        return
+
+    try:
+        if get_process_group_options():
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        # The command, and every process it started, exited already.
+        pass
+
+
+def stop_process_group(process: subprocess.Popen):
+    """
+    Ask a command to exit, then kill it once the grace period is over.
+
+    Blocks for up to KILL_GRACE_SECONDS, so event loops wait on the process
+    themselves between terminate_process_group and kill_process_group.
+
+    Args:
+        process (subprocess.Popen): The process of the command.
+
+    """
+    terminate_process_group(process)
+    try:
+        process.wait(KILL_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        pass
+    kill_process_group(process)
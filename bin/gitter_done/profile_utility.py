@@ -0,0 +1,120 @@
+"""A module profiling the python side of a run.
+
+The run is profiled with cProfile, and optionally traced with tracemalloc,
+and the results are saved next to its log file so that they can be sent
+along with it:
+    <log>.prof                The cProfile stats, for snakeviz or pstats.
+    <log>_profile.txt         The functions taking the most time.
+    <log>_allocations.txt     The lines holding the most memory at the end
+                              of the run, and the peak memory traced.
+
+Attributes:
+    PROFILE_SUFFIX (str): The suffix of the cProfile stats file.
+    PROFILE_REPORT_SUFFIX (str): The suffix of the cProfile report.
+    ALLOCATIONS_REPORT_SUFFIX (str): The suffix of the tracemalloc report.
+
+"""
+import cProfile
+import io
+import logging
+import pstats
+import tracemalloc
+
+from . import string_utility
+
+# ============================================================================
+# Global Variables.
+PROFILE_SUFFIX = '.prof'
+PROFILE_REPORT_SUFFIX = '_profile.txt'
+ALLOCATIONS_REPORT_SUFFIX = '_allocations.txt'
+# ============================================================================
+
+
+# ============================================================================
+def profile_call(output_prefix: str,
+                 function,
+                 *args,
+                 trace_memory: bool = False,
+                 top: int = 40):
+    """
+    Call a function under cProfile and save the reports of the call.
+
+    The reports are saved even when the function raises.
+
+    Args:
+        output_prefix (str): The path the reports are saved to, without
+            their suffix, e.g. the path to the log file without extension.
+        function (function): The function to profile.
+        *args: The arguments to call the function with.
+        trace_memory (bool, optional): Whether the allocations are also
+            traced with tracemalloc, at the expense of a much slower run.
+        top (int, optional): The number of functions and lines listed in the
+            reports.
+
+    Returns:
+        list: The paths to the saved reports.
+
+    """
+    profiler = cProfile.Profile()
+    if trace_memory:
+        tracemalloc.start()
+    profiler.enable()
+    try:
+        function(*args)
+    finally:
+        profiler.disable()
+        paths = [output_prefix + PROFILE_SUFFIX,
+                 output_prefix + PROFILE_REPORT_SUFFIX]
+        profiler.dump_stats(paths[0])
+        _save_report(paths[1], _build_profile_report(profiler, top))
+
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            paths.append(output_prefix + ALLOCATIONS_REPORT_SUFFIX)
+            _save_report(paths[2],
+                         _build_allocations_report(snapshot, peak, top))
+
+        logging.info('Saved the profile of the run to: %s',
+                     string_utility.lazy_friendly_list_to_str(paths))
+    return paths
+
+
+def _build_profile_report(profiler: cProfile.Profile, top: int):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+    return stream.getvalue()
+
+
+def _build_allocations_report(snapshot: tracemalloc.Snapshot,
+                              peak: int,
+                              top: int):
+    # Leave out the memory tracemalloc and the import machinery hold.
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>')))
+    statistics = snapshot.statistics('lineno')
+    held = sum(x.size for x in statistics)
+    lines = [f'Peak traced memory: {string_utility.friendly_size_to_str(peak)}'
+             f', still held at the end: '
+             f'{string_utility.friendly_size_to_str(held)}',
+             '',
+             f'Top {top} lines by memory held at the end of the run:',
+             f"{'size':>12} {'blocks':>10}  line"]
+    for statistic in statistics[:top]:
+        frame = statistic.traceback[0]
+        lines.append(
+            f'{string_utility.friendly_size_to_str(statistic.size):>12} '
+            f'{statistic.count:>10}  {frame.filename}:{frame.lineno}')
+    return '\n'.join(lines) + '\n'
+
+
+def _save_report(path: str, report: str):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(report)
+# ============================================================================
@@ -1,10 +1,7 @@
 """A module used to access all the project specific information."""
 
 import logging
-import sys
-
-from . import external_process_utility
-from . import string_utility
+import shutil
 
 
 # ============================================================================
@@ -55,22 +52,16 @@ def get_p4_tool_path():
     Get the path to the SourceDepot executable for force syncing.
 
     Returns:
-        str: The absolute path to the sd.exe.
+        str: The absolute path to the p4 executable, unquoted as it is meant
+            to be the first argument of external_process_utility.run_command.
 
     """
-    if sys.platform == 'win32':
-        command = "where.exe p4.exe"
-    else:
-        command = "which p4"
-
-    success, command_results = (external_process_utility.
-                                trigger_external_subprocess(
-                                    command))
-
-    if success:
-        logging.info("Found the location of the P4 tool at: %s",
-                     command_results)
-        return string_utility.ensure_path_compliance(command_results)
+    # Looked up in-process, sparing a where/which subprocess per p4 command.
+    path = shutil.which('p4')
+
+    if path:
+        logging.info("Found the location of the P4 tool at: %s", path)
+        return path
 
     logging.error(("Could not locate P tool."
                    " Defaulting to root System."))
@@ -0,0 +1,136 @@
+"""A module caching the results of idempotent queries for a single run.
+
+Within a run the same read-only commands, e.g. "git branch -a", are asked
+several times. Commands declared idempotent are answered from the cache from
+their second call on, keyed on their arguments and working directory. The
+commands mutating what a query reads, e.g. "git fetch" for the branches,
+drop the affected entries as they run.
+
+Attributes:
+    ALL_QUERIES (str): Marker of a mutating command invalidating every query
+        of its tool.
+    INVALIDATED_QUERIES (dict): For every tool, the sub commands of the
+        queries each of its mutating sub commands invalidates. Sub commands
+        missing from it mutate nothing the queries read, e.g. "git add",
+        unless their tool is missing from it too.
+
+"""
+import collections
+import logging
+import threading
+
+# ============================================================================
+# Global Variables.
+ALL_QUERIES = '*'
+_GIT_REF_QUERIES = frozenset({'branch', 'describe', 'log', 'rev-list',
+                              'rev-parse', 'show'})
+INVALIDATED_QUERIES = {
+    'git': {'branch': _GIT_REF_QUERIES,
+            'checkout': _GIT_REF_QUERIES,
+            'cherry-pick': _GIT_REF_QUERIES,
+            'commit': _GIT_REF_QUERIES,
+            'fetch': _GIT_REF_QUERIES,
+            'merge': _GIT_REF_QUERIES,
+            'pull': _GIT_REF_QUERIES,
+            'push': _GIT_REF_QUERIES,
+            'rebase': _GIT_REF_QUERIES,
+            'remote': ALL_QUERIES,
+            'reset': _GIT_REF_QUERIES,
+            'revert': _GIT_REF_QUERIES,
+            'stash': _GIT_REF_QUERIES,
+            'switch': _GIT_REF_QUERIES,
+            'tag': _GIT_REF_QUERIES},
+}
+# ============================================================================
+
+
+# ============================================================================
+class QueryCache:
+    """
+    The results of the idempotent queries of a run.
+
+    Only successful results are cached, so a failing query is asked again.
+
+    Attributes:
+        hits (int): The number of queries answered from the cache.
+        misses (int): The number of queries that had to run.
+        invalidations (int): The number of entries dropped by mutating
+            commands.
+
+    """
+
+    def __init__(self):
+        """Initialize an empty cache."""
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        # (tool, sub command) -> {(arguments, cwd): result}
+        self._entries = collections.defaultdict(dict)
+
+    def get(self, query: tuple, arguments: list, cwd: str):
+        """
+        Get the cached result of a query.
+
+        Args:
+            query (tuple): The tool and sub command of the query.
+            arguments (list): The program followed by its arguments.
+            cwd (str): The absolute directory the query runs from.
+
+        Returns:
+            object: The cached result, None on a miss.
+
+        """
+        with self._lock:
+            result = self._entries.get(query, {}).get((tuple(arguments),
+                                                       cwd))
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return result
+
+    def store(self, query: tuple, arguments: list, cwd: str, result):
+        """
+        Cache the result of a query.
+
+        Args:
+            query (tuple): The tool and sub command of the query.
+            arguments (list): The program followed by its arguments.
+            cwd (str): The absolute directory the query ran from.
+            result (object): What the query returned.
+
+        """
+        with self._lock:
+            self._entries[query][(tuple(arguments), cwd)] = result
+
+    def invalidate(self, tool: str, sub_command: str):
+        """
+        Drop the queries a mutating command may have changed the answer of.
+
+        Args:
+            tool (str): The tool of the mutating command, e.g. "git".
+            sub_command (str): Its sub command, e.g. "fetch".
+
+        """
+        if tool in INVALIDATED_QUERIES:
+            invalidated = INVALIDATED_QUERIES[tool].get(sub_command)
+            if not invalidated:
+                return
+        else:
+            invalidated = ALL_QUERIES
+
+        with self._lock:
+            for query in list(self._entries):
+                if query[0] == tool and (invalidated == ALL_QUERIES or
+                                         query[1] in invalidated):
+                    self.invalidations += len(self._entries.pop(query))
+
+    def log_summary(self):
+        """Log how many queries the cache answered."""
+        logging.info("Query cache: %d hits, %d misses, %d invalidated "
+                     "entries.",
+                     self.hits,
+                     self.misses,
+                     self.invalidations)
+# ============================================================================
@@ -141,12 +141,89 @@ def friendly_list_to_str(some_list: list):
         string: A new string representing an indented array.
 
     """
-    temp_string = '\n['
-    for i in some_list:
-        temp_string += f'\n\t\"{i}\"'
+    # Joined in a single pass over the entries themselves, so no formatted
+    # copy of every entry is held next to the result.
+    entries = [str(x) for x in some_list]
+    if not entries:
+        return '\n[\n]'
+    entries[0] = '\n[\n\t"' + entries[0]
+    entries[-1] += '"\n]'
+    return '"\n\t"'.join(entries)
 
-    temp_string += '\n]'
-    return temp_string
+
+def lazy_friendly_list_to_str(some_list: list):
+    """
+    Fixup arrays into pretty indented lists, only once printed.
+
+    Meant as an argument of the logging calls, so that large lists are only
+    rendered when a handler emits the record. Runs logging to a file at
+    DEBUG emit every record, and render them all the same.
+
+    Args:
+        some_list (list): a list containing strings.
+
+    Returns:
+        LazyString: The indented array, rendered when formatted.
+
+    """
+    return LazyString(friendly_list_to_str, some_list)
+
+
+class LazyString:
+    """
+    A string rendered by a function the first time it is formatted.
+
+    Passed to logging in place of the string, it defers the rendering to
+    the handlers emitting the record, if any, and renders once however many
+    of them format it. It saves nothing when a handler emits every record,
+    like the DEBUG log file of gitter_done.py runs. The arguments are held
+    as they are, so they must not change before the record is emitted.
+
+    """
+
+    __slots__ = ('_function', '_args', '_string')
+
+    def __init__(self, function, *args):
+        """
+        Initialize the string, without rendering it.
+
+        Args:
+            function (function): The function rendering the string.
+            *args: The arguments to render the string with.
+
+        """
+        self._function = function
+        self._args = args
+        self._string = None
+
+    def __str__(self):
+        if self._string is None:
+            self._string = str(self._function(*self._args))
+            self._function = self._args = None
+        return self._string
+
+
+def friendly_size_to_str(size: int):
+    """
+    Turn a size in bytes into a short human readable string.
+
+    Args:
+        size (int): a size in bytes.
+
+    Returns:
+        string: The size in the largest unit keeping it above one, e.g.
+            '1.5 GB'.
+
+    """
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = 'TB'
+    if unit == 'B':
+        return f'{size} B'
+    return f'{size:.1f} {unit}'
 
 
 def ensure_path_compliance(path: str):
@@ -0,0 +1,229 @@
+"""A module timing the external commands of a run, tagged with their phase.
+
+Phases are nested with the phase context manager, and every command timed
+while one is active is tagged with the names of the enclosing phases, e.g.
+"update trunk/p4 sync". The report sums the commands per phase and per
+command type, e.g. "git fetch", and lists the slowest ones, along with the
+time spent in python outside of any command. Phases are also added to the
+trace of the run, when it is traced.
+
+Attributes:
+    UNTAGGED_PHASE (str): The phase of commands run outside of any phase.
+    PYTHON_LABEL (str): The label of the time spent outside of commands.
+
+"""
+import collections
+import contextlib
+import contextvars
+import threading
+import time
+
+from . import trace_utility
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# ============================================================================
+# Global Variables.
+UNTAGGED_PHASE = '(untagged)'
+PYTHON_LABEL = '(python)'
+_PHASE = contextvars.ContextVar('phase', default=UNTAGGED_PHASE)
+# ============================================================================
+
+
+# ============================================================================
+@contextlib.contextmanager
+def phase(name: str):
+    """
+    Tag the commands run within the block with a phase.
+
+    Args:
+        name (str): The name of the phase, nested under the enclosing one.
+
+    """
+    current = _PHASE.get()
+    full_name = name if current == UNTAGGED_PHASE else f'{current}/{name}'
+    token = _PHASE.set(full_name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _PHASE.reset(token)
+        tracer = trace_utility.get_tracer()
+        if tracer is not None:
+            tracer.add_span(name, start, time.perf_counter() - start,
+                            {'phase': full_name})
+
+
+def get_phase():
+    """
+    Get the phase the commands run now are tagged with.
+
+    Returns:
+        str: The names of the enclosing phases, separated by slashes.
+
+    """
+    return _PHASE.get()
+
+
+def get_children_cpu_time():
+    """
+    Get the CPU time used by the finished child processes so far.
+
+    Returns:
+        float: The user and system time in seconds, None where the platform
+            doesn't tell.
+
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class CommandTiming:  # pylint: disable=too-few-public-methods
+    """
+    The timing of a single external command.
+
+    Attributes:
+        command (str): The command line.
+        command_type (str): The tool and sub command, e.g. "git fetch".
+        phase (str): The phase the command ran in.
+        start (float): When the command started, from time.perf_counter.
+        wall_seconds (float): How long the command took.
+        cpu_seconds (float): The CPU time the command used, None if unknown,
+            e.g. for commands running concurrently.
+        output_bytes (int): The size of its output.
+        exit_code (int): Its exit code.
+
+    """
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 command: str,
+                 command_type: str,
+                 start: float,
+                 cpu_seconds: float,
+                 output_bytes: int,
+                 exit_code: int):
+        """
+        Time a command which just finished, in the current phase.
+
+        Args:
+            command (str): The command line.
+            command_type (str): The tool and sub command.
+            start (float): When the command started.
+            cpu_seconds (float): The CPU time it used, None if unknown.
+            output_bytes (int): The size of its output.
+            exit_code (int): Its exit code.
+
+        """
+        self.command = command
+        self.command_type = command_type
+        self.phase = get_phase()
+        self.start = start
+        self.wall_seconds = time.perf_counter() - start
+        self.cpu_seconds = cpu_seconds
+        self.output_bytes = output_bytes
+        self.exit_code = exit_code
+
+
+class CommandTimer:
+    """
+    Collect the timings of the external commands of a run.
+
+    Attributes:
+        start (float): When the run started, from time.perf_counter.
+        timings (list): The CommandTiming of every command, in the order they
+            finished.
+
+    """
+
+    def __init__(self):
+        """Start timing a run."""
+        self.start = time.perf_counter()
+        self.timings = []
+        self._lock = threading.Lock()
+
+    def record(self, timing: CommandTiming):
+        """
+        Add the timing of a command.
+
+        Args:
+            timing (CommandTiming): The timing to add.
+
+        """
+        with self._lock:
+            self.timings.append(timing)
+
+    def get_command_seconds(self):
+        """
+        Get the time spent waiting on commands, counting overlaps once.
+
+        Returns:
+            float: The time in seconds during which any command ran.
+
+        """
+        total = 0.0
+        end = None
+        for timing in sorted(self.timings, key=lambda x: x.start):
+            timing_end = timing.start + timing.wall_seconds
+            if end is None or timing.start > end:
+                total += timing.wall_seconds
+                end = timing_end
+            elif timing_end > end:
+                total += timing_end - end
+                end = timing_end
+        return total
+
+    def build_report(self, slowest: int = 5):
+        """
+        Build a table of the command timings of the run.
+
+        Args:
+            slowest (int, optional): The number of slowest commands to list.
+
+        Returns:
+            str: The report, with totals per phase, per command type and the
+                slowest commands.
+
+        """
+        run_seconds = time.perf_counter() - self.start
+        command_seconds = self.get_command_seconds()
+        lines = [f'{len(self.timings)} external commands took '
+                 f'{command_seconds:.2f} s of the {run_seconds:.2f} s run, '
+                 f'{max(0.0, run_seconds - command_seconds):.2f} s were '
+                 f'spent in {PYTHON_LABEL}.']
+
+        for title, key in (('phase', lambda x: x.phase),
+                           ('command', lambda x: x.command_type)):
+            lines.append('')
+            lines.append(f"{'calls':>7} {'wall s':>9} {'cpu s':>9} "
+                         f"{'output KB':>10} {'failed':>7}  {title}")
+            groups = collections.defaultdict(list)
+            for timing in self.timings:
+                groups[key(timing)].append(timing)
+            for name, timings in sorted(
+                    groups.items(),
+                    key=lambda x: -sum(y.wall_seconds for y in x[1])):
+                cpu_seconds = [x.cpu_seconds for x in timings
+                               if x.cpu_seconds is not None]
+                cpu = f'{sum(cpu_seconds):.2f}' if cpu_seconds else '-'
+                lines.append(
+                    f'{len(timings):>7} '
+                    f'{sum(x.wall_seconds for x in timings):>9.2f} '
+                    f'{cpu:>9} '
+                    f'{sum(x.output_bytes for x in timings) / 1024:>10.1f} '
+                    f'{sum(1 for x in timings if x.exit_code):>7}  {name}')
+
+        lines.append('')
+        lines.append(f'Top {slowest} slowest commands:')
+        lines.append(f"{'wall s':>9} {'exit':>5}  {'phase':<24} command")
+        for timing in sorted(self.timings,
+                             key=lambda x: -x.wall_seconds)[:slowest]:
+            lines.append(f'{timing.wall_seconds:>9.2f} '
+                         f'{timing.exit_code:>5}  {timing.phase:<24} '
+                         f'{timing.command}')
+        return '\n'.join(lines)
+# ============================================================================
@@ -0,0 +1,199 @@
+"""A module exporting the timeline of a run in the Trace Event Format.
+
+The trace holds a span for every phase and external command of the run,
+along with counters of the files processed, and opens in chrome://tracing
+or https://ui.perfetto.dev to show where a run waits and what overlaps.
+Commands running at the same time are spread over lanes, the first lane
+being the one of the phases so that sequential commands nest in them.
+
+Attributes:
+    PHASE_CATEGORY (str): The category of the phase spans.
+    COMMAND_CATEGORY (str): The category of the external command spans.
+
+"""
+import json
+import os
+import threading
+import time
+
+# ============================================================================
+# Global Variables.
+PHASE_CATEGORY = 'phase'
+COMMAND_CATEGORY = 'command'
+_TRACER = None
+# ============================================================================
+
+
+# ============================================================================
+def set_tracer(tracer):
+    """
+    Trace the phases, commands and counters of the run with a tracer.
+
+    Args:
+        tracer (Tracer): The tracer of the run, or None to stop tracing.
+
+    """
+    global _TRACER  # pylint: disable=global-statement
+    _TRACER = tracer
+
+
+def get_tracer():
+    """
+    Get the tracer of the run.
+
+    Returns:
+        Tracer: The tracer of the run, None if the run isn't traced.
+
+    """
+    return _TRACER
+
+
+def add_count(name: str, series: str, increment: int = 1):
+    """
+    Add to a counter of the trace of the run, if it is traced.
+
+    Args:
+        name (str): The name of the counter, e.g. "p4 files".
+        series (str): The series of the counter, e.g. "edit".
+        increment (int, optional): How much to add to the series.
+
+    """
+    tracer = get_tracer()
+    if tracer is not None:
+        tracer.add_count(name, series, increment)
+
+
+class Tracer:
+    """
+    Collect the events of a run, to write them as a trace.
+
+    Attributes:
+        path (str): The path the trace is written to.
+        start (float): When the trace started, from time.perf_counter.
+
+    """
+
+    def __init__(self, path: str):
+        """
+        Start tracing a run.
+
+        Args:
+            path (str): The path to write the trace to.
+
+        """
+        self.path = path
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._events = []
+        self._commands = []
+        self._counters = {}
+
+    def _get_timestamp(self, start: float):
+        # Trace events count microseconds from the start of the trace.
+        return round((start - self.start) * 1e6, 1)
+
+    def add_span(self, name: str, start: float, seconds: float, args=None):
+        """
+        Add the span of a phase.
+
+        Args:
+            name (str): The name of the phase.
+            start (float): When it started, from time.perf_counter.
+            seconds (float): How long it took.
+            args (dict, optional): Details shown along with the span.
+
+        """
+        event = {'name': name,
+                 'cat': PHASE_CATEGORY,
+                 'ph': 'X',
+                 'ts': self._get_timestamp(start),
+                 'dur': round(seconds * 1e6, 1),
+                 'pid': os.getpid(),
+                 'tid': 0,
+                 'args': args or {}}
+        with self._lock:
+            self._events.append(event)
+
+    def add_command(self, timing):
+        """
+        Add the span of an external command.
+
+        Args:
+            timing (timing_utility.CommandTiming): The timing of the command.
+
+        """
+        with self._lock:
+            self._commands.append(timing)
+
+    def add_count(self, name: str, series: str, increment: int = 1):
+        """
+        Add to a counter, recording its new values at the current time.
+
+        Args:
+            name (str): The name of the counter.
+            series (str): The series of the counter to add to.
+            increment (int, optional): How much to add to the series.
+
+        """
+        timestamp = self._get_timestamp(time.perf_counter())
+        with self._lock:
+            values = self._counters.setdefault(name, {})
+            values[series] = values.get(series, 0) + increment
+            self._events.append({'name': name,
+                                 'ph': 'C',
+                                 'ts': timestamp,
+                                 'pid': os.getpid(),
+                                 'args': dict(values)})
+
+    def get_events(self):
+        """
+        Get the events of the trace, with the commands spread over lanes.
+
+        Returns:
+            list: The trace events.
+
+        """
+        with self._lock:
+            events = list(self._events)
+            commands = sorted(self._commands, key=lambda x: x.start)
+
+        # Put every command on the first lane free when it starts.
+        lane_ends = []
+        for timing in commands:
+            end = timing.start + timing.wall_seconds
+            for lane, lane_end in enumerate(lane_ends):
+                if lane_end <= timing.start:
+                    lane_ends[lane] = end
+                    break
+            else:
+                lane = len(lane_ends)
+                lane_ends.append(end)
+            events.append({'name': timing.command_type or timing.command,
+                           'cat': COMMAND_CATEGORY,
+                           'ph': 'X',
+                           'ts': self._get_timestamp(timing.start),
+                           'dur': round(timing.wall_seconds * 1e6, 1),
+                           'pid': os.getpid(),
+                           'tid': lane,
+                           'args': {'command': timing.command,
+                                    'phase': timing.phase,
+                                    'exit_code': timing.exit_code,
+                                    'output_bytes': timing.output_bytes,
+                                    'cpu_seconds': timing.cpu_seconds}})
+
+        for lane in range(max(1, len(lane_ends))):
+            events.append({'name': 'thread_name',
+                           'ph': 'M',
+                           'pid': os.getpid(),
+                           'tid': lane,
+                           'args': {'name': 'phases' if not lane
+                                    else f'concurrent commands {lane}'}})
+        return events
+
+    def write(self):
+        """Write the trace to its path."""
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': self.get_events(),
+                       'displayTimeUnit': 'ms'},
+                      file)
+# ============================================================================
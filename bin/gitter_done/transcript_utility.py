@@ -0,0 +1,169 @@
+"""A module recording external commands to transcripts and replaying them.
+
+A transcript is a JSON lines file holding, for every external command, its
+input, output, exit code and how long it took. Replaying one serves the
+recorded results back in order, without running anything, so a run can be
+reproduced offline and its python side profiled in isolation.
+
+Attributes:
+    MODE_RECORD (str): Transcript mode appending every command to the file.
+    MODE_REPLAY (str): Transcript mode serving commands from the file.
+
+"""
+import collections
+import json
+import logging
+import subprocess
+import threading
+
+# ============================================================================
+# Global Variables.
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+# ============================================================================
+
+
+# ============================================================================
+class Transcript:
+    """
+    A transcript of external commands, either being recorded or replayed.
+
+    Replayed commands are matched on their command line and input. Commands
+    run more than once are served their recorded results in order.
+
+    Attributes:
+        path (str): The path to the transcript file.
+        mode (str): MODE_RECORD or MODE_REPLAY.
+        count (int): The number of commands recorded or replayed so far.
+        seconds (float): The time the recorded or replayed commands took
+            when they were recorded.
+
+    """
+
+    def __init__(self, path: str, mode: str):
+        """
+        Open a transcript.
+
+        Args:
+            path (str): The path to the transcript file. It is overwritten
+                when recording.
+            mode (str): MODE_RECORD or MODE_REPLAY.
+
+        """
+        self.path = path
+        self.mode = mode
+        self.count = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        self._file = None
+        self._entries = collections.defaultdict(collections.deque)
+
+        if mode == MODE_RECORD:
+            self._file = open(path, 'w', encoding='utf-8')
+            return
+
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                entry = json.loads(line)
+                self._entries[(entry['command'],
+                               entry['input'])].append(entry)
+
+    def record(self,
+               command: str,
+               input_text: str,
+               exit_code: int,
+               output: str,
+               seconds: float):
+        """
+        Append a command to the transcript.
+
+        Args:
+            command (str): The command line.
+            input_text (str): The text fed to its stdin, if any.
+            exit_code (int): Its exit code.
+            output (str): Its output, as returned to the caller.
+            seconds (float): How long it took.
+
+        """
+        self.record_chunks(command, input_text, exit_code, (output,), seconds)
+
+    def record_chunks(self,  # pylint: disable=too-many-arguments
+                      command: str,
+                      input_text: str,
+                      exit_code: int,
+                      chunks,
+                      seconds: float):
+        """
+        Append a command to the transcript, writing its output in chunks.
+
+        Args:
+            command (str): The command line.
+            input_text (str): The text fed to its stdin, if any.
+            exit_code (int): Its exit code.
+            chunks (iterable): The pieces of its output, as returned to the
+                caller once joined.
+            seconds (float): How long it took.
+
+        """
+        # The output goes last, escaped one chunk at a time into the string
+        # closing the entry.
+        entry = json.dumps({'command': command,
+                            'input': input_text,
+                            'exit_code': exit_code,
+                            'seconds': seconds,
+                            'output': ''})
+        with self._lock:
+            self._file.write(entry[:-2])
+            for chunk in chunks:
+                self._file.write(json.dumps(chunk)[1:-1])
+            self._file.write(entry[-2:] + '\n')
+            # Keep the transcript of a crashing run usable.
+            self._file.flush()
+            self.count += 1
+            self.seconds += seconds
+
+    def replay(self, command: str, input_text: str = None):
+        """
+        Serve the next recorded result of a command.
+
+        Args:
+            command (str): The command line.
+            input_text (str, optional): The text fed to its stdin, if any.
+
+        Returns:
+            bool: Value determining wether the command failed.
+            string: The command's output, or a subprocess.CalledProcessError
+                if it failed, as trigger_external_subprocess returns them.
+
+        """
+        with self._lock:
+            entries = self._entries.get((command, input_text))
+            if not entries:
+                logging.error("The command is not in the transcript '%s': %s",
+                              self.path,
+                              command)
+                return False, subprocess.CalledProcessError(
+                    1, command, output=b'Not found in the transcript.')
+            entry = entries.popleft()
+            self.count += 1
+            self.seconds += entry['seconds']
+
+        if entry['exit_code']:
+            return False, subprocess.CalledProcessError(
+                entry['exit_code'],
+                command,
+                output=entry['output'].encode(encoding='utf-8'))
+        return True, entry['output']
+
+    def close(self):
+        """Close the transcript and log what went through it."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        logging.info("%s %d commands taking %.3f seconds with the transcript "
+                     "'%s'.",
+                     'Recorded' if self.mode == MODE_RECORD else 'Replayed',
+                     self.count,
+                     self.seconds,
+                     self.path)
+# ============================================================================
@@ -0,0 +1,62 @@
+"""Unit Test Suite targetting async_process_utility.py."""
+import asyncio
+import sys
+import time
+
+from .. import async_process_utility
+from .. import config
+from .. import external_process_utility
+
+
+def test_run_commands():
+    """Test results come back in order, with the output lines streamed."""
+    lines = []
+    results = async_process_utility.run_commands(
+        [[sys.executable, '-c', 'print("first"); print("second")'],
+         [sys.executable, '-c', 'import sys; print("oops", file=sys.stderr);'
+          ' sys.exit(2)'],
+         [sys.executable, '-c', 'import sys; print(sys.stdin.read())']],
+        limits={'default': 2},
+        input_text='piped',
+        on_line=lambda command, stream, line: lines.append((stream, line)))
+
+    assert results[0] == (True, 'first\nsecond')
+    assert not results[1][0]
+    assert results[1][1].returncode == 2
+    assert results[1][1].output.strip() == b'oops'
+    assert results[2] == (True, 'piped')
+    assert sorted(lines) == [('stderr', 'oops'), ('stdout', 'first'),
+                             ('stdout', 'piped'), ('stdout', 'second')]
+
+
+def test_cancel_kills_command():
+    """Test cancelling a running command kills it right away."""
+    async def _run_and_cancel():
+        executor = async_process_utility.AsyncCommandExecutor()
+        task = asyncio.ensure_future(executor.run(
+            [sys.executable, '-c', 'import time; time.sleep(30)']))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    start = time.perf_counter()
+    assert asyncio.run(_run_and_cancel())
+    assert time.perf_counter() - start < 10
+
+
+def test_timeout(monkeypatch):
+    """Test commands running past their timeout fail."""
+    monkeypatch.setattr(config, 'COMMAND_TIMEOUTS', {'query': 0.5})
+
+    results = async_process_utility.run_commands(
+        [[sys.executable, '-c', 'import time; time.sleep(30)'],
+         [sys.executable, '-c', 'print("fast")']])
+
+    assert not results[0][0]
+    assert results[0][1].returncode == \
+        external_process_utility.TIMEOUT_EXIT_CODE
+    assert results[1] == (True, 'fast')
@@ -0,0 +1,44 @@
+"""Unit Test Suite targetting explain_utility.py."""
+import os
+
+from .. import explain_utility
+from .. import file_utility
+from .. import pattern_utility
+
+WISHLIST = ["bin/gitterdone", "license", "source/engine", "art/*"]
+IGNORE_LIST = ["*.log", "temp*", "build/"]
+
+
+def test_why():
+    """Test the decision on a path is explained by the rule or entry."""
+    wishlist_trie = file_utility.generate_wishlist_trie(WISHLIST)
+    ignore_matcher = pattern_utility.IgnoreMatcher(IGNORE_LIST)
+
+    def why(path):
+        return explain_utility.why(path, wishlist_trie, ignore_matcher)
+
+    assert "'*.log' rule (extension bucket)" in why("source/engine/a.log")
+    assert "not in the wishlist under 'source'" in why("source/game/a.cpp")
+    assert "under the 'source/engine' wishlist entry" in \
+        why("source/engine/x/y.cpp")
+    assert "'art/*' wishlist entry" in why("art/a.psd")
+    assert why("source").endswith("is walked: wishlist entries lie below it.")
+
+
+def test_build_report(tmp_path):
+    """Test rule hits and pruned directories are counted."""
+    os.makedirs(os.path.join(str(tmp_path), "source", "game"))
+    wishlist_trie = file_utility.generate_wishlist_trie(WISHLIST)
+    profiler = pattern_utility.ProfilingMatcher(
+        pattern_utility.IgnoreMatcher(IGNORE_LIST))
+    for path in ["a.log", "b.log", "temp1", "x.cpp"]:
+        profiler.match(path)
+
+    assert profiler.hits == {"*.log": 2, "temp*": 1}
+    pruned = explain_utility.get_pruned_directories(
+        str(tmp_path), ["source/game", "x.cpp"], wishlist_trie)
+    assert pruned == {"source": 1}
+
+    report = explain_utility.build_report(profiler, pruned, 2)
+    assert "1 of 3 rules never matched." in report
+    assert "         1  source" in report
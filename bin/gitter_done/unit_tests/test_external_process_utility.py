@@ -0,0 +1,234 @@
+"""Unit Test Suite targetting external_process_utility.py."""
+import asyncio
+import os
+import shlex
+import subprocess
+import sys
+import time
+from unittest import mock
+
+import pytest
+
+from .. import async_process_utility
+from .. import config
+from .. import external_process_utility
+from .. import process_group_utility
+from .. import transcript_utility
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='uses a posix shell')
+def test_record_and_replay_transcript(tmp_path):
+    """Test replayed commands return what was recorded without running."""
+    path = str(tmp_path / 'transcript.jsonl')
+    commands = [('echo first', None), ('cat', 'piped'), ('echo second', None),
+                ('echo failed; exit 3', None)]
+
+    transcript = transcript_utility.Transcript(
+        path, transcript_utility.MODE_RECORD)
+    external_process_utility.set_transcript(transcript)
+    try:
+        recorded = [external_process_utility.trigger_external_subprocess(
+            command, input_text) for command, input_text in commands]
+        recorded_async = async_process_utility.run_commands(
+            [['echo', 'async']])
+    finally:
+        external_process_utility.set_transcript(None)
+        transcript.close()
+
+    transcript = transcript_utility.Transcript(
+        path, transcript_utility.MODE_REPLAY)
+    external_process_utility.set_transcript(transcript)
+    try:
+        with mock.patch.object(subprocess, 'Popen') as popen, \
+                mock.patch.object(asyncio, 'create_subprocess_exec') as spawn:
+            replayed = [external_process_utility.trigger_external_subprocess(
+                command, input_text) for command, input_text in commands]
+            replayed_async = async_process_utility.run_commands(
+                [['echo', 'async']])
+            missing = external_process_utility.trigger_external_subprocess(
+                'echo first')
+        popen.assert_not_called()
+        spawn.assert_not_called()
+    finally:
+        external_process_utility.set_transcript(None)
+        transcript.close()
+
+    assert [x for x, _ in recorded] == [True, True, True, False]
+    assert replayed[:3] == recorded[:3] == [(True, 'first'), (True, 'piped'),
+                                            (True, 'second')]
+    assert not replayed[3][0]
+    assert replayed[3][1].returncode == 3
+    assert replayed[3][1].output == recorded[3][1].output == b'failed\n'
+    assert replayed_async == recorded_async == [(True, 'async')]
+    assert not missing[0]
+    assert transcript.count == 5
+
+
+def test_run_command_without_shell(tmp_path):
+    """Test arguments reach the program untouched, without any quoting."""
+    directory = tmp_path / 'with space'
+    directory.mkdir()
+    (directory / 'it\'s "quoted".txt').write_text('contents')
+    script = ('import os, sys; '
+              'print(os.listdir(sys.argv[1])[0], os.getcwd() == sys.argv[1], '
+              'os.environ.get("GITTER_DONE_TEST"))')
+
+    success, output = external_process_utility.run_command(
+        [sys.executable, '-c', script, str(directory)],
+        cwd=str(directory),
+        env={**os.environ, 'GITTER_DONE_TEST': 'set'})
+
+    assert success
+    assert output == 'it\'s "quoted".txt True set'
+
+    success, error = external_process_utility.run_command(
+        [str(tmp_path / 'missing program')])
+    assert not success
+    assert error.returncode == 127
+
+
+def test_stream_command(monkeypatch):
+    """Test lines are streamed and large outputs spill to a temporary file."""
+    monkeypatch.setattr(config, 'COMMAND_OUTPUT_SPILL_SIZE', 1024)
+    script = ('import sys; print(sys.stdin.read()); '
+              'print("\\n".join(str(x) for x in range(1000)), end="")')
+    lines = []
+
+    success, output = external_process_utility.stream_command(
+        [sys.executable, '-c', script], lines.append, input_text='piped')
+
+    assert success
+    with output:
+        assert output.spilled
+        expected = ['piped'] + [str(x) for x in range(1000)]
+        assert lines == list(output.lines()) == expected
+        assert output.read() == '\n'.join(expected)
+
+    success, error = external_process_utility.stream_command(
+        [sys.executable, '-c', 'print("failed"); exit(3)'])
+    assert not success
+    assert error.returncode == 3
+    assert error.output.strip() == b'failed'
+    error.command_output.close()
+
+
+def test_stream_command_error_keeps_tail(monkeypatch):
+    """Test failed commands only read the end of a spilled output back."""
+    monkeypatch.setattr(config, 'COMMAND_OUTPUT_SPILL_SIZE', 1024)
+    monkeypatch.setattr(external_process_utility, 'ERROR_OUTPUT_SIZE', 20)
+    script = 'print("x" * 5000); print("fatal: bad"); exit(1)'
+
+    success, error = external_process_utility.stream_command(
+        [sys.executable, '-c', script])
+
+    assert not success
+    assert len(error.output) == 20
+    assert error.output.rstrip().endswith(b'x\nfatal: bad')
+    with error.command_output as output:
+        assert output.spilled
+        assert output.read() == 'x' * 5000 + '\nfatal: bad'
+
+
+def test_stream_command_bounds_lines(monkeypatch, tmp_path):
+    """Test long lines are split and spilled outputs recorded in chunks."""
+    monkeypatch.setattr(config, 'COMMAND_OUTPUT_SPILL_SIZE', 1024)
+    monkeypatch.setattr(external_process_utility, 'MAX_LINE_SIZE', 1000)
+    monkeypatch.setattr(external_process_utility, 'CHUNK_SIZE', 300)
+    path = str(tmp_path / 'transcript.jsonl')
+    script = 'print("x" * 2500); print("é\\"end\\" ")'
+    lines = []
+
+    transcript = transcript_utility.Transcript(
+        path, transcript_utility.MODE_RECORD)
+    external_process_utility.set_transcript(transcript)
+    try:
+        success, output = external_process_utility.stream_command(
+            [sys.executable, '-c', script], lines.append,
+            env={**os.environ, 'PYTHONIOENCODING': 'utf-8'})
+    finally:
+        external_process_utility.set_transcript(None)
+        transcript.close()
+
+    assert success
+    with output:
+        assert output.spilled
+        recorded = output.read()
+    assert lines == ['x' * 1000, 'x' * 1000, 'x' * 500, 'é"end" ']
+    assert recorded == 'x' * 2500 + '\né"end"'
+
+    transcript = transcript_utility.Transcript(
+        path, transcript_utility.MODE_REPLAY)
+    assert transcript.replay(shlex.join([sys.executable, '-c', script])) == \
+        (True, recorded)
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='uses process groups')
+def test_timeout_terminates_before_killing(monkeypatch, tmp_path):
+    """Test timed out commands get a grace period before being killed."""
+    monkeypatch.setattr(config, 'COMMAND_TIMEOUTS', {'query': 0.5})
+    monkeypatch.setattr(process_group_utility, 'KILL_GRACE_SECONDS', 1)
+    pid_file = tmp_path / 'child.pid'
+    # The child ignores SIGTERM, and is only stopped by the SIGKILL after the
+    # grace period, while the command cleans up on SIGTERM.
+    script = ('import signal, subprocess, sys, time; '
+              'child = subprocess.Popen([sys.executable, "-c", '
+              '"import signal, time; '
+              'signal.signal(signal.SIGTERM, signal.SIG_IGN); '
+              'time.sleep(60)"]); '
+              f'open({str(pid_file)!r}, "w").write(str(child.pid)); '
+              'signal.signal(signal.SIGTERM, '
+              'lambda *_: (print("cleaned up", flush=True), sys.exit(1))); '
+              'print("started", flush=True); time.sleep(60)')
+
+    start = time.perf_counter()
+    success, error = external_process_utility.run_command(
+        [sys.executable, '-c', script])
+
+    assert time.perf_counter() - start < 10
+    assert not success
+    assert error.returncode == external_process_utility.TIMEOUT_EXIT_CODE
+    assert error.output.startswith(b'started\ncleaned up')
+    _assert_exits(int(pid_file.read_text()))
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='uses process groups')
+def test_timeout_kills_process_group(monkeypatch, tmp_path):
+    """Test commands running past their timeout are killed with children."""
+    monkeypatch.setattr(config, 'COMMAND_TIMEOUTS', {'query': 0.5})
+    pid_file = tmp_path / 'child.pid'
+    script = ('import subprocess, sys, time; '
+              'child = subprocess.Popen([sys.executable, "-c", '
+              '"import time; time.sleep(60)"]); '
+              f'open({str(pid_file)!r}, "w").write(str(child.pid)); '
+              'print("started", flush=True); time.sleep(60)')
+
+    start = time.perf_counter()
+    success, error = external_process_utility.run_command(
+        [sys.executable, '-c', script])
+
+    assert time.perf_counter() - start < 10
+    assert not success
+    assert error.returncode == external_process_utility.TIMEOUT_EXIT_CODE
+    assert error.output.startswith(b'started')
+    _assert_exits(int(pid_file.read_text()))
+
+
+def _assert_exits(pid: int):
+    for _ in range(50):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return
+        time.sleep(0.1)
+    pytest.fail('the child of the command is still running')
+
+
+def test_get_command_class():
+    """Test commands are classed by tool and sub command."""
+    get_command_class = external_process_utility.get_command_class
+    assert get_command_class(['git', '-C', 'fetch', 'status']) == 'query'
+    assert get_command_class(['git', 'push', 'origin']) == 'network'
+    assert get_command_class(['git', 'checkout', 'main']) == 'sync'
+    assert get_command_class(['C:/bin/P4.exe', '-x', '-', 'edit']) == \
+        'network'
+    assert get_command_class(['/usr/bin/p4', 'sync', '-f', '...']) == 'sync'
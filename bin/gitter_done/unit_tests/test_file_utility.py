@@ -0,0 +1,153 @@
+"""Unit Test Suite targetting file_utility.py."""
+import os
+
+from .. import file_utility
+from .. import pattern_utility
+from .. import string_utility
+
+WISHLIST = ["bin/gitterdone", "gitterdone.py", "license", "source/engine",
+            "art/*"]
+IGNORE_LIST = ["*.log", "*.obj", "temp*", "GitterDoneLogs"]
+
+
+def _build_tree(root):
+    for directory in ["bin/gitterdone/githooks", "bin/tools", "source/engine",
+                      "source/Game", "GitterDoneLogs", "temp1", "art/hi"]:
+        os.makedirs(os.path.join(root, directory))
+    for file in ["bin/.pylintrc", "bin/gitterdone/a.py", "bin/tools/t.py",
+                 "source/engine/x.obj", "source/Game/g.cpp", "source/r.log",
+                 "gitterdone.py", "license", "setup.py", "art/a.psd"]:
+        with open(os.path.join(root, file), 'w'):
+            pass
+
+
+def _get_ignored():
+    wish_list = string_utility.normalize_strings(WISHLIST)
+    ignore_matcher = pattern_utility.IgnoreMatcher(IGNORE_LIST)
+    wishlist_trie = file_utility.generate_wishlist_trie(wish_list)
+    return file_utility.recursely_get_ignored(".", wishlist_trie,
+                                              ignore_matcher)
+
+
+def test_recursely_get_ignored(tmp_path, monkeypatch):
+    """Test the walker prunes and ignores everything outside the wishlist."""
+    _build_tree(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+
+    expected = ["art/hi", "bin/.pylintrc", "bin/tools", "gitterdonelogs",
+                "setup.py", "source/game", "temp1"]
+    assert expected == _get_ignored()
+
+
+def test_generate_wishlist_trie():
+    """Test the wishlist is folded into a case insensitive trie."""
+    root = file_utility.generate_wishlist_trie(["Bin/GitterDone", "bin",
+                                                "art/*"])
+    assert sorted(root.children) == ["art", "bin"]
+    assert root.children["bin"].is_leaf
+    assert root.children["bin"].children["gitterdone"].path == \
+        "Bin/GitterDone"
+    assert not root.children["art"].is_leaf
+    assert file_utility.WISHLIST_FILES_TOKEN in root.children["art"].children
+
+
+def test_recursely_get_ignored_with_walk_cache(tmp_path, monkeypatch):
+    """Test cached directories are reused until their mtime changes."""
+    _build_tree(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    wishlist_trie = file_utility.generate_wishlist_trie(WISHLIST)
+    ignore_matcher = pattern_utility.IgnoreMatcher(IGNORE_LIST)
+
+    walk_cache = {}
+    options = file_utility.WalkOptions(walk_cache)
+    expected = file_utility.recursely_get_ignored(".", wishlist_trie,
+                                                  ignore_matcher, options)
+    assert "bin" in walk_cache
+
+    # A stale cache entry is trusted as long as the mtime matches.
+    walk_cache["bin"]["ignored"] = ["bin/stale"]
+    actual = file_utility.recursely_get_ignored(".", wishlist_trie,
+                                                ignore_matcher, options)
+    assert "bin/stale" in actual
+
+    walk_cache["bin"]["mtime"] -= 1
+    actual = file_utility.recursely_get_ignored(".", wishlist_trie,
+                                                ignore_matcher, options)
+    assert expected == actual
+
+
+def test_walk_cache_hits_mixed_case_directories(tmp_path, monkeypatch):
+    """Test an unchanged tree with mixed case names is never listed again."""
+    for directory in ["Art", "Code/Src", "Code/Tools"]:
+        os.makedirs(os.path.join(str(tmp_path), directory))
+    monkeypatch.chdir(tmp_path)
+    wishlist_trie = file_utility.generate_wishlist_trie(["Code/Src", "Art"])
+    ignore_matcher = pattern_utility.IgnoreMatcher(IGNORE_LIST)
+    walk_cache = {}
+    expected = file_utility.recursely_get_ignored(
+        ".", wishlist_trie, ignore_matcher,
+        file_utility.WalkOptions(walk_cache))
+
+    scanned = []
+    scan_directory = file_utility._scan_directory
+
+    def _record_scan(directory):
+        scanned.append(directory)
+        return scan_directory(directory)
+
+    monkeypatch.setattr(file_utility, '_scan_directory', _record_scan)
+    actual = file_utility.recursely_get_ignored(
+        ".", wishlist_trie, ignore_matcher,
+        file_utility.WalkOptions(walk_cache))
+
+    assert expected == actual == ["code/tools"]
+    assert not scanned
+
+
+def test_recursely_get_ignored_in_parallel(tmp_path, monkeypatch):
+    """Test a parallel walk returns the same results as a serial one."""
+    _build_tree(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    wishlist_trie = file_utility.generate_wishlist_trie(WISHLIST)
+    ignore_matcher = pattern_utility.IgnoreMatcher(IGNORE_LIST)
+
+    assert _get_ignored() == file_utility.recursely_get_ignored(
+        ".", wishlist_trie, ignore_matcher,
+        file_utility.WalkOptions(workers=4))
+
+
+def test_compact_ignore_list(tmp_path):
+    """Test mostly ignored directories fold into a wildcard and negations."""
+    for file in ["a/keep.txt", "a/x.log", "b/one.txt", "b/two.txt"] + \
+            [f"a/f{i}.txt" for i in range(4)]:
+        path = os.path.join(str(tmp_path), file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w'):
+            pass
+    ignore_list = [f"a/f{i}.txt" for i in range(4)] + ["b/one.txt"]
+    ignore_matcher = pattern_utility.IgnoreMatcher(IGNORE_LIST)
+
+    assert file_utility.compact_ignore_list(
+        str(tmp_path), ignore_list, ignore_matcher) == \
+        [("a/*", False), ("a/keep.txt", True), ("b/one.txt", False)]
+
+
+def test_recursely_get_ignored_with_size_limit(tmp_path, monkeypatch):
+    """Test kept files over the size limit are reported, even deep down."""
+    _build_tree(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    for file, size in [("license", 10), ("source/engine/big.uasset", 100),
+                       ("source/engine/x.obj", 100), ("setup.py", 100)]:
+        with open(file, 'w') as handle:
+            handle.write('x' * size)
+    os.makedirs("source/engine/deep")
+    with open("source/engine/deep/big.psd", 'w') as handle:
+        handle.write('x' * 100)
+
+    options = file_utility.WalkOptions(size_limit=50)
+    assert file_utility.recursely_get_ignored(
+        ".", file_utility.generate_wishlist_trie(WISHLIST),
+        pattern_utility.IgnoreMatcher(IGNORE_LIST),
+        options) == _get_ignored()
+    assert options.oversized == {"source/engine/big.uasset": 100,
+                                 "source/engine/deep/big.psd": 100}
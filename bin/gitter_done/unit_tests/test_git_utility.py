@@ -0,0 +1,21 @@
+"""Unit Test Suite targetting git_utility.py."""
+import subprocess
+
+from .. import external_process_utility
+from .. import git_utility
+
+
+def test_delete_tag_stops_on_failure(monkeypatch):
+    """Test the remote tag is left alone when the local one can't go."""
+    commands = []
+
+    def run_command(command, *args, **kwargs):
+        commands.append(command)
+        if command[1] == 'tag':
+            return False, subprocess.CalledProcessError(1, command)
+        return True, ''
+
+    monkeypatch.setattr(external_process_utility, 'run_command', run_command)
+
+    assert not git_utility.delete_tag('v1', True, 'origin')
+    assert commands == [['git', 'tag', '--delete', 'v1']]
@@ -0,0 +1,127 @@
+"""Unit Test Suite targetting gitignore_utility.py."""
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from .. import file_utility
+from .. import gitignore_utility
+from .. import pattern_utility
+
+WISHLIST = ["bin/gitterdone", "license", "source/engine", "art/new/keep.psd"]
+IGNORE_LIST = ["*.log", "*.obj", "temp*"]
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git is required')
+def test_discovery_backends_agree(tmp_path):
+    """Test the git discovery backend matches the python walker."""
+    for file in ["bin/gitterdone/a.py", "bin/tools/t.py", "source/engine/x.h",
+                 "source/game/g.cpp", "source/r.log", "license", "setup.py",
+                 "art/new/keep.psd", "art/new/drop.psd", "art/old/a.psd"]:
+        path = os.path.join(str(tmp_path), file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w'):
+            pass
+    subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+    subprocess.run(['git', 'add', 'bin', 'source'], cwd=str(tmp_path),
+                   check=True)
+
+    wishlist_trie = file_utility.generate_wishlist_trie(WISHLIST)
+    ignore_matcher = pattern_utility.IgnoreMatcher(IGNORE_LIST)
+    candidates = gitignore_utility.get_discovery_candidates(str(tmp_path))
+
+    assert "art/" in candidates
+    assert file_utility.recursely_get_ignored(
+        str(tmp_path), wishlist_trie, ignore_matcher) == \
+        file_utility.get_ignored_from_candidates(
+            str(tmp_path), candidates, wishlist_trie, ignore_matcher)
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git is required')
+def test_verify_ignored_paths(tmp_path):
+    """Test the ignore files on disk are checked in a single git call."""
+    subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+    with open(os.path.join(str(tmp_path), '.gitignore'), 'w') as file:
+        file.writelines(['/a/*\n', '!/a/keep.txt\n'])
+
+    assert gitignore_utility.verify_ignored_paths(["a/b.txt"], ["a/keep.txt"],
+                                                  str(tmp_path))
+    assert not gitignore_utility.verify_ignored_paths(["a/keep.txt"], [],
+                                                      str(tmp_path))
+    assert not gitignore_utility.verify_ignored_paths([], ["a/b.txt"],
+                                                      str(tmp_path))
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git is required')
+def test_generate_git_ignore_hierarchical(tmp_path, monkeypatch):
+    """Test nested ignore files are written and cleaned up once stale."""
+    for file in ["a/keep.txt", "a/drop.txt", "b/c/drop.txt", "license"]:
+        path = os.path.join(str(tmp_path), file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w'):
+            pass
+    subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+    monkeypatch.chdir(tmp_path)
+
+    options = gitignore_utility.GitIgnoreOptions(
+        use_walk_cache=False, compact=False,
+        output_layout=gitignore_utility.IGNORE_LAYOUT_HIERARCHICAL)
+    gitignore_utility.generate_git_ignore(
+        ["a/keep.txt", "b/c/keep.txt", "license", ".gitignore"], IGNORE_LIST,
+        options=options)
+    with open(os.path.join("a", ".gitignore")) as file:
+        assert "/drop.txt\n" in file.readlines()
+    assert os.path.isfile(os.path.join("b", "c", ".gitignore"))
+
+    gitignore_utility.generate_git_ignore(
+        ["a", "b/c/keep.txt", "license", ".gitignore"], IGNORE_LIST,
+        options=options)
+    assert not os.path.exists(os.path.join("a", ".gitignore"))
+    assert os.path.isfile(os.path.join("b", "c", ".gitignore"))
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git is required')
+def test_generate_git_ignore_hierarchical_mixed_case(tmp_path, monkeypatch,
+                                                     caplog):
+    """Test nested ignore files land in directories named in mixed case."""
+    for file in ["Code/keep.txt", "Code/drop.txt", "Code/Sub/drop.txt",
+                 "license"]:
+        path = os.path.join(str(tmp_path), file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w'):
+            pass
+    subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+    monkeypatch.chdir(tmp_path)
+
+    gitignore_utility.generate_git_ignore(
+        ["Code/keep.txt", "Code/Sub/keep.txt", "license", ".gitignore"],
+        IGNORE_LIST,
+        options=gitignore_utility.GitIgnoreOptions(
+            use_walk_cache=False, compact=False,
+            output_layout=gitignore_utility.IGNORE_LAYOUT_HIERARCHICAL))
+
+    with open(os.path.join("Code", ".gitignore")) as file:
+        assert "/drop.txt\n" in file.readlines()
+    with open(os.path.join("Code", "Sub", ".gitignore")) as file:
+        assert "/drop.txt\n" in file.readlines()
+    assert not [x for x in caplog.records if x.levelname == 'ERROR']
+
+
+def test_save_git_ignore_keeps_user_rules(tmp_path):
+    """Test only the generated block is replaced and only when it changes."""
+    path = os.path.join(str(tmp_path), gitignore_utility.GITIGNORE_FILENAME)
+    with open(path, 'w') as file:
+        file.writelines(["/mine\n", gitignore_utility.GITIGNORE_BEGIN_TOKEN,
+                         "/old\n", gitignore_utility.GITIGNORE_END_TOKEN,
+                         "/also_mine"])
+    block = [gitignore_utility.GITIGNORE_BEGIN_TOKEN, "/new\n",
+             gitignore_utility.GITIGNORE_END_TOKEN]
+
+    gitignore_utility._save_git_ignore_to_disk(block, str(tmp_path))
+    with open(path) as file:
+        assert file.read() == "/mine\n" + "".join(block) + "/also_mine\n"
+
+    os.utime(path, ns=(0, 0))
+    gitignore_utility._save_git_ignore_to_disk(block, str(tmp_path))
+    assert os.stat(path).st_mtime_ns == 0
@@ -0,0 +1,95 @@
+"""Unit Test Suite targetting p4_utility.py, against the fake p4 server."""
+import os
+import sys
+
+import pytest
+
+from .. import config
+from .. import external_process_utility
+from .. import p4_utility
+from .. import project_utility
+from ..benchmarks import fake_p4
+
+
+@pytest.fixture(name='depot_path')
+def fixture_depot_path(tmp_path, monkeypatch):
+    """Serve a fixture depot through a fake p4 put in front of the PATH."""
+    client_root = tmp_path / 'client'
+    for file, contents in {'a.txt': 'A\n', 'b.txt': 'B\n'}.items():
+        path = client_root / file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(contents)
+    depot_path = str(tmp_path / 'depot.json')
+    fake_p4.create_depot(depot_path, str(client_root),
+                         {'a.txt': 'A\n', 'b.txt': 'B\n'})
+    fake_p4.install_fake_p4(str(tmp_path / 'bin'), depot_path)
+    monkeypatch.setenv('PATH', str(tmp_path / 'bin') + os.pathsep +
+                       os.environ['PATH'])
+    monkeypatch.chdir(client_root)
+    return depot_path
+
+
+@pytest.mark.skipif(sys.platform == 'win32',
+                    reason='the fake p4 is a shell script')
+def test_offline_sync_operations(depot_path):
+    """Test edits, adds, deletes and reverts open the expected files."""
+    with open('a.txt', 'w') as file:
+        file.write('A edited\n')
+    with open('c.txt', 'w') as file:
+        file.write('C\n')
+
+    assert p4_utility._checkout_files_in_p4(['a.txt', 'b.txt', 'c.txt']) == \
+        ['c.txt']
+    p4_utility._add_files_to_p4(['c.txt'])
+    p4_utility._revert_unchanged_files_in_p4()
+    assert fake_p4.load_depot(depot_path)['opened'] == {'a.txt': 'edit',
+                                                        'c.txt': 'add'}
+
+    p4_utility._delete_files_from_p4(['b.txt'])
+    assert fake_p4.load_depot(depot_path)['opened']['b.txt'] == 'delete'
+    assert not os.path.exists('b.txt')
+
+
+@pytest.mark.skipif(sys.platform == 'win32',
+                    reason='the fake p4 is a shell script')
+def test_smart_sync_to_changelist(depot_path):
+    """Test syncing to a changelist updates the client files."""
+    change = fake_p4.add_change(depot_path, {'a.txt': 'A2\n', 'b.txt': None})
+
+    assert p4_utility._execute_p4_smart_sync_to_cl(str(change), '.')
+    with open('a.txt', 'r') as file:
+        assert file.read() == 'A2\n'
+    assert not os.path.exists('b.txt')
+
+
+@pytest.mark.skipif(sys.platform == 'win32',
+                    reason='the fake p4 is a shell script')
+def test_transient_errors_are_retried(depot_path, monkeypatch):
+    """Test p4 commands recover from dropped connections, within limits."""
+    monkeypatch.setattr(config, 'P4_RETRY',
+                        {'attempts': 3, 'base_delay': 0, 'max_delay': 0})
+    with open('a.txt', 'w') as file:
+        file.write('A edited\n')
+
+    fake_p4.fail_next_commands(depot_path, 2)
+    p4_utility._checkout_files_in_p4(['a.txt'])
+    assert fake_p4.load_depot(depot_path)['opened'] == {'a.txt': 'edit'}
+
+    fake_p4.fail_next_commands(depot_path, 3)
+    success, error = external_process_utility.run_command(
+        [project_utility.get_p4_tool_path(), 'revert', 'a.txt'])
+    assert not success
+    assert 'Connect to server failed' in error.output.decode()
+
+
+def test_unknown_results_name_the_file(caplog):
+    """Test unknown p4 answers are logged along with the file they concern."""
+    assert p4_utility._handle_checkout_results(
+        'a.txt', True, 'mystery') == (False, None)
+    p4_utility._handle_add_results('b.txt', True, 'mystery')
+    p4_utility._handle_delete_results('c.txt', True, 'mystery')
+
+    assert [x.getMessage() for x in caplog.records] == [
+        'An unknown error occurred when attempting to check out a.txt',
+        'An unknown error occurred when attempting to add  b.txt',
+        'An unknown error occurred when attempting to delete c.txt']
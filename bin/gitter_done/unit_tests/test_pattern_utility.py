@@ -0,0 +1,34 @@
+"""Unit Test Suite targetting pattern_utility.py."""
+from .. import pattern_utility
+
+MATCHER = pattern_utility.IgnoreMatcher([
+    "*.log", "*.csproj.user", "Thumbs.db", "*.py[cod]", "x64_v*", "lib/",
+    "/temp*", "**/packages/*", "source/generated"])
+
+
+def test_extension_and_basename_buckets():
+    """Test extensions and exact basenames match at any depth."""
+    assert MATCHER.match("a/b/Build.LOG") == "*.log"
+    assert MATCHER.match("game.csproj.user") == "*.csproj.user"
+    assert MATCHER.match("art/thumbs.db") == "Thumbs.db"
+    assert MATCHER.match("art/thumbs.dbx") is None
+    assert MATCHER.match("attempt.cpp") is None
+
+
+def test_fallback_regex():
+    """Test wildcard patterns are matched against the whole basename."""
+    assert MATCHER.match("./bin/module.pyc") == "*.py[cod]"
+    assert MATCHER.match("bin/module.py") is None
+    assert MATCHER.match("x64_v2", is_dir=True) == "x64_v*"
+
+
+def test_directory_only_and_anchored_patterns():
+    """Test trailing slashes and anchored patterns follow git conventions."""
+    assert MATCHER.match("source/lib", is_dir=True) == "lib/"
+    assert MATCHER.match("source/lib") is None
+    assert MATCHER.match("temp1") == "/temp*"
+    assert MATCHER.match("source/temp1") is None
+    assert MATCHER.match("a/b/packages/x") == "**/packages/*"
+    assert MATCHER.match("Source/Generated", is_dir=True) == \
+        "source/generated"
+    assert MATCHER.match("other/source/generated") is None
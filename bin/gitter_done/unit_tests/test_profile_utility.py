@@ -0,0 +1,30 @@
+"""Unit Test Suite targetting profile_utility.py."""
+import os
+import pstats
+
+import pytest
+
+from .. import profile_utility
+
+
+def _allocate_and_fail(size):
+    _allocate_and_fail.kept = [bytearray(size)]
+    raise ValueError('failed')
+
+
+def test_profile_call(tmp_path):
+    """Test the reports are saved even when the profiled call raises."""
+    prefix = str(tmp_path / 'gitter_done.py_2024-01-01_00-00-00')
+
+    with pytest.raises(ValueError):
+        profile_utility.profile_call(prefix, _allocate_and_fail, 4 * 1024 ** 2,
+                                     trace_memory=True)
+
+    stats = pstats.Stats(prefix + profile_utility.PROFILE_SUFFIX)
+    assert any(x[2] == '_allocate_and_fail' for x in stats.stats)
+    with open(prefix + profile_utility.PROFILE_REPORT_SUFFIX, 'r') as file:
+        assert '_allocate_and_fail' in file.read()
+    with open(prefix + profile_utility.ALLOCATIONS_REPORT_SUFFIX, 'r') as file:
+        report = file.read()
+    assert 'Peak traced memory: 4.' in report
+    assert os.path.basename(__file__) in report
@@ -0,0 +1,52 @@
+"""Unit Test Suite targetting query_cache_utility.py."""
+import subprocess
+
+import pytest
+
+from .. import external_process_utility
+from .. import query_cache_utility
+
+
+@pytest.fixture(name='query_cache')
+def fixture_query_cache():
+    """Answer the idempotent commands from a fresh query cache."""
+    query_cache = query_cache_utility.QueryCache()
+    external_process_utility.set_query_cache(query_cache)
+    yield query_cache
+    external_process_utility.set_query_cache(None)
+
+
+def test_queries_are_cached_until_invalidated(tmp_path, query_cache):
+    """Test repeated queries are served until a mutating command runs."""
+    repository = str(tmp_path)
+    subprocess.check_call(['git', 'init', '-q', '-b', 'main', repository])
+    for command in (['config', 'user.name', 'test'],
+                    ['config', 'user.email', 'test@example.com'],
+                    ['commit', '-q', '--allow-empty', '-m', 'first']):
+        subprocess.check_call(['git', '-C', repository, *command])
+    log = ['git', 'log', '-1', '--format=%s']
+
+    def _query():
+        return external_process_utility.run_command(log, cwd=repository,
+                                                    idempotent=True)
+
+    assert _query() == (True, 'first')
+    assert _query() == (True, 'first')
+    assert (query_cache.hits, query_cache.misses) == (1, 1)
+
+    # Reading the index leaves the cached log alone.
+    external_process_utility.run_command(['git', 'add', '-A'],
+                                         cwd=repository)
+    assert _query() == (True, 'first')
+    assert query_cache.hits == 2
+
+    external_process_utility.run_command(
+        ['git', 'commit', '-q', '--allow-empty', '-m', 'second'],
+        cwd=repository)
+    assert query_cache.invalidations == 1
+    assert _query() == (True, 'second')
+    assert (query_cache.hits, query_cache.misses) == (2, 2)
+
+    # Commands not declared idempotent always run.
+    external_process_utility.run_command(log, cwd=repository)
+    assert (query_cache.hits, query_cache.misses) == (2, 2)
@@ -1,4 +1,6 @@
 """Unit Test Suite targetting StringUtilities.py."""
+import logging
+
 from .. import string_utility
 
 
@@ -14,3 +16,29 @@ def test_normalize_wildcards():
     expect = "abc"
     actual = string_utility.normalize_string("abc*", remove_wildcards=True)
     assert expect == actual
+
+
+def test_friendly_list_to_str():
+    """Test lists are rendered one indented, quoted entry per line."""
+    expected = '\n[\n\t"a"\n\t"b"\n]'
+    actual = string_utility.friendly_list_to_str(['a', 'b'])
+    assert expected == actual
+
+
+def test_lazy_string(caplog):
+    """Test lazy strings are only rendered once, and only when emitted."""
+    calls = []
+
+    def render(some_list):
+        calls.append(some_list)
+        return string_utility.friendly_list_to_str(some_list)
+
+    caplog.set_level(logging.INFO)
+    logging.debug('Skipped: %s', string_utility.LazyString(render, ['a']))
+    assert not calls
+
+    lazy = string_utility.LazyString(render, ['b'])
+    logging.info('Emitted: %s', lazy)
+    assert str(lazy) == '\n[\n\t"b"\n]'
+    assert calls == [['b']]
+    assert 'Emitted: \n[\n\t"b"\n]' in caplog.text
@@ -0,0 +1,36 @@
+"""Unit Test Suite targetting timing_utility.py."""
+import sys
+
+from .. import async_process_utility
+from .. import external_process_utility
+from .. import timing_utility
+
+
+def test_commands_are_timed_per_phase():
+    """Test commands are timed and tagged with their nested phase."""
+    command_timer = timing_utility.CommandTimer()
+    external_process_utility.set_command_timer(command_timer)
+    try:
+        with timing_utility.phase('outer'):
+            external_process_utility.run_command(
+                [sys.executable, '-c', 'print("x" * 99)'])
+            with timing_utility.phase('inner'):
+                async_process_utility.run_commands(
+                    [[sys.executable, '-c', 'exit(2)']] * 2)
+        external_process_utility.run_command([sys.executable, '-V'])
+    finally:
+        external_process_utility.set_command_timer(None)
+
+    timings = command_timer.timings
+    assert [(x.phase, x.exit_code, x.output_bytes) for x in timings] == [
+        ('outer', 0, 99), ('outer/inner', 2, 0), ('outer/inner', 2, 0),
+        (timing_utility.UNTAGGED_PHASE, 0, len(sys.version.split()[0]) + 7)]
+    assert all(x.wall_seconds > 0 for x in timings)
+    assert timings[1].cpu_seconds is None
+    assert 0 < command_timer.get_command_seconds() <= \
+        sum(x.wall_seconds for x in timings)
+
+    report = command_timer.build_report(slowest=2)
+    assert 'outer/inner' in report
+    assert timing_utility.PYTHON_LABEL in report
+    assert 'Top 2 slowest commands' in report
@@ -0,0 +1,47 @@
+"""Unit Test Suite targetting trace_utility.py."""
+import json
+import sys
+
+from .. import async_process_utility
+from .. import external_process_utility
+from .. import timing_utility
+from .. import trace_utility
+
+
+def test_trace_events(tmp_path):
+    """Test phases, commands and counters end up in a loadable trace."""
+    tracer = trace_utility.Tracer(str(tmp_path / 'trace.json'))
+    trace_utility.set_tracer(tracer)
+    try:
+        with timing_utility.phase('outer'):
+            external_process_utility.run_command([sys.executable, '-V'])
+            with timing_utility.phase('inner'):
+                async_process_utility.run_commands(
+                    [[sys.executable, '-c', 'import time; time.sleep(0.3)']]
+                    * 2)
+            trace_utility.add_count('files', 'edit', 2)
+            trace_utility.add_count('files', 'edit', 3)
+    finally:
+        trace_utility.set_tracer(None)
+    tracer.write()
+
+    with open(tracer.path, 'r') as file:
+        events = json.load(file)['traceEvents']
+    spans = {}
+    for event in events:
+        if event['ph'] == 'X':
+            spans.setdefault(event['cat'], []).append(event)
+
+    outer, inner = sorted(spans[trace_utility.PHASE_CATEGORY],
+                          key=lambda x: x['ts'])
+    assert (outer['name'], inner['args']['phase']) == ('outer', 'outer/inner')
+    commands = sorted(spans[trace_utility.COMMAND_CATEGORY],
+                      key=lambda x: x['ts'])
+    assert len(commands) == 3
+    for command in commands:
+        assert outer['ts'] <= command['ts']
+        assert command['ts'] + command['dur'] <= outer['ts'] + outer['dur']
+    # The overlapping commands are spread over two lanes.
+    assert {x['tid'] for x in commands[1:]} == {0, 1}
+    assert [x['args'] for x in events if x['ph'] == 'C'] == [{'edit': 2},
+                                                             {'edit': 5}]
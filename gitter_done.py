@@ -21,13 +21,19 @@ import os
 import sys
 
 import bin.GitterDone.config as config
-import bin.GitterDone.git_utility as git
+import bin.GitterDone.gitignore_utility as gitignore
 import bin.GitterDone.string_utility as str_utility
 import bin.GitterDone.console_utility as console_utility
 import bin.GitterDone.arg_parser_utility as arg_parser_utility
 import bin.GitterDone.logging_utility as logging_utility
 import bin.GitterDone.python_utility as python_utility
 import bin.GitterDone.p4_utility as p4_utility
+import bin.GitterDone.profile_utility as profile_utility
+import bin.GitterDone.external_process_utility as external_process_utility
+import bin.GitterDone.query_cache_utility as query_cache_utility
+import bin.GitterDone.timing_utility as timing_utility
+import bin.GitterDone.trace_utility as trace_utility
+import bin.GitterDone.transcript_utility as transcript_utility
 
 # ============================================================================
 # Global Variables.
@@ -72,22 +78,40 @@ def _execute_user_process(args):
 
     # First handle if at least one operation is available.
     if (args.changelist is None and args.git is None
-            and args.update_trunk is None):
+            and args.update_trunk is None and args.why is None):
         logging.error('No actionable arguments received.')
         python_utility.terminate(True)
         return
 
     if args.git:
         logging.info('Requested .gitignore update')
-        git.generate_git_ignore(GIT_FILE_WISHLIST, GIT_FILE_IGNORE_LIST)
+        with timing_utility.phase('gitignore'):
+            gitignore.generate_git_ignore(
+                GIT_FILE_WISHLIST,
+                GIT_FILE_IGNORE_LIST,
+                options=gitignore.GitIgnoreOptions(
+                    use_walk_cache=not args.no_walk_cache,
+                    walk_workers=args.walk_workers,
+                    discovery_backend=args.discovery,
+                    compact=args.compact_ignore,
+                    output_layout=args.ignore_layout,
+                    size_limit_mb=args.size_limit_mb,
+                    explain_top=args.explain))
+
+    if args.why is not None:
+        console_utility.console_prompt(gitignore.explain_git_ignore(
+            args.why, GIT_FILE_WISHLIST, GIT_FILE_IGNORE_LIST))
 
     if args.changelist is not None:
         logging.info('Performing a Perforce Operation.')
-        p4_utility.execute_p4_offline_sync(
-            args.changelist, args.include_trunk, args.ignored_branches)
+        with timing_utility.phase('offline sync'):
+            p4_utility.execute_p4_offline_sync(
+                args.changelist, args.include_trunk, args.ignored_branches)
     elif args.update_trunk is not None:
-        p4_utility.execute_git_sync_with_p4(args.update_trunk, args.force,
-                                            args.force_all)
+        with timing_utility.phase('update trunk'):
+            p4_utility.execute_git_sync_with_p4(args.update_trunk,
+                                                args.force,
+                                                args.force_all)
 
 
 # ============================================================================
@@ -142,6 +166,92 @@ def _add_parser_options(parser):
         action='store_true',
         default=None)
 
+    # Rescan the whole tree instead of only the directories that changed.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--no_walk_cache',
+        help=('Ignore the walk cache and rescan every directory when '
+              'regenerating the .gitignore file.'),
+        action='store_true',
+        default=None)
+
+    # Number of threads walking the tree, useful on network shares.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--walk_workers',
+        help=('Number of threads listing directories when regenerating the '
+              '.gitignore file. Defaults to the value in config.py.'),
+        type=int,
+        action='store',
+        default=None,
+        metavar='Workers')
+
+    # Pick how the entries of the tree are discovered.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--discovery',
+        help=('Backend discovering the entries of the tree when regenerating '
+              'the .gitignore file. Defaults to the value in config.py.'),
+        type=str,
+        choices=gitignore.DISCOVERY_BACKENDS,
+        default=None)
+
+    # Fold sibling entries of the .gitignore into wildcards and negations.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--compact_ignore',
+        help=('Compact the regenerated .gitignore file by ignoring whole '
+              'directories and negating the entries to keep when shorter. '
+              'Defaults to the value in config.py.'),
+        action='store_true',
+        default=None)
+
+    # Pick which .gitignore files the generated entries are written to.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--ignore_layout',
+        help=('Write the regenerated entries to the root .gitignore file or '
+              'to a .gitignore next to the entries they affect. Defaults to '
+              'the value in config.py.'),
+        type=str,
+        choices=gitignore.IGNORE_LAYOUTS,
+        default=None)
+
+    # Leave large binaries out of git even when the wishlist tracks them.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--size_limit_mb',
+        help=('Ignore files larger than this many megabytes when '
+              'regenerating the .gitignore file, 0 to keep them all. '
+              'Defaults to the value in config.py.'),
+        type=float,
+        action='store',
+        default=None,
+        metavar='Megabytes')
+
+    # Profile the ignore rules while regenerating the .gitignore.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--explain',
+        help=('Report the ignore rules costing the most time and the '
+              'wishlist entries pruning the most directories while '
+              'regenerating the .gitignore file. Defaults to the top 10.'),
+        type=int,
+        nargs='?',
+        const=10,
+        default=None,
+        metavar='Top')
+
+    # Explain why a path is ignored or kept by the .gitignore generation.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--why',
+        help='Explain whether the .gitignore generation ignores a path.',
+        type=str,
+        action='store',
+        default=None,
+        metavar='Path')
+
     # Update the master branch to either existing CL or new CL from P4.
     arg_parser_utility.add_parser_option(
         parser,
@@ -178,6 +288,66 @@ def _add_parser_options(parser):
     arg_parser_utility.add_parser_option(
         parser, '-ig', '--ignored_branches', nargs='+', default=None)
 
+    # Profile the python side of the run.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--profile',
+        help=('Profile the run with cProfile and save the reports next to '
+              'its log file in the GitterDoneLogs folder.'),
+        action='store_true',
+        default=None)
+
+    # Also trace the memory allocations when profiling.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--profile_memory',
+        help=('With --profile, also trace the memory allocations with '
+              'tracemalloc, at the expense of a much slower run.'),
+        action='store_true',
+        default=None)
+
+    # Export a timeline of the run, to open in a trace viewer.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--trace',
+        help=('Write a timeline of the phases and git and p4 commands of the '
+              'run to a Trace Event Format file, to open in chrome://tracing '
+              'or ui.perfetto.dev.'),
+        type=str,
+        action='store',
+        default=None,
+        metavar='Path')
+
+    # Run every git and p4 query, even when asked again with the same answer.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--no_query_cache',
+        help=('Run repeated read-only git and p4 queries again instead of '
+              'reusing their answer within the run.'),
+        action='store_true',
+        default=None)
+
+    # Record every external command with its output to a transcript.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--record_transcript',
+        help='Record every git and p4 command and its output to a file.',
+        type=str,
+        action='store',
+        default=None,
+        metavar='Path')
+
+    # Serve the external commands from a transcript instead of running them.
+    arg_parser_utility.add_parser_option(
+        parser,
+        full_name='--replay_transcript',
+        help=('Replay the git and p4 commands from a recorded transcript '
+              'instead of running them.'),
+        type=str,
+        action='store',
+        default=None,
+        metavar='Path')
+
 
 # ============================================================================
 # MAIN
@@ -190,7 +360,7 @@ if __name__ == '__main__':
     _add_parser_options(PARSER)
     ARGS = PARSER.parse_args()
 
-    logging_utility.set_log_level(
+    LOG_PATH = logging_utility.set_log_level(
         desired_log_level=ARGS.loglevel,
         log_to_file=True,
         log_output_path=(
@@ -199,7 +369,49 @@ if __name__ == '__main__':
         log_output_filename=os.path.basename(__file__))
 
     python_utility.verify_python_version()
-    _execute_user_process(ARGS)
+
+    TRANSCRIPT = None
+    if ARGS.replay_transcript:
+        TRANSCRIPT = transcript_utility.Transcript(
+            ARGS.replay_transcript, transcript_utility.MODE_REPLAY)
+    elif ARGS.record_transcript:
+        TRANSCRIPT = transcript_utility.Transcript(
+            ARGS.record_transcript, transcript_utility.MODE_RECORD)
+    external_process_utility.set_transcript(TRANSCRIPT)
+
+    QUERY_CACHE = None
+    if not ARGS.no_query_cache:
+        QUERY_CACHE = query_cache_utility.QueryCache()
+    external_process_utility.set_query_cache(QUERY_CACHE)
+
+    COMMAND_TIMER = timing_utility.CommandTimer()
+    external_process_utility.set_command_timer(COMMAND_TIMER)
+
+    TRACER = None
+    if ARGS.trace:
+        TRACER = trace_utility.Tracer(ARGS.trace)
+    trace_utility.set_tracer(TRACER)
+
+    try:
+        if ARGS.profile:
+            profile_utility.profile_call(os.path.splitext(LOG_PATH)[0],
+                                         _execute_user_process,
+                                         ARGS,
+                                         trace_memory=ARGS.profile_memory)
+        else:
+            _execute_user_process(ARGS)
+    finally:
+        if COMMAND_TIMER.timings:
+            REPORT = COMMAND_TIMER.build_report()
+            logging.info('Command timings:\n%s', REPORT)
+            console_utility.console_prompt(REPORT)
+        if QUERY_CACHE is not None:
+            QUERY_CACHE.log_summary()
+        if TRACER is not None:
+            TRACER.write()
+            logging.info('Wrote the trace of the run to: %s', TRACER.path)
+        if TRANSCRIPT is not None:
+            TRANSCRIPT.close()
 
     # Exit if we are done.
     python_utility.terminate(False)